@@ -0,0 +1,31 @@
+"""task reminder sent at
+
+Adds tasks.reminder_sent_at, set when the reminder email is queued.
+Reminders that were already due are marked as sent, so the reminder loop
+does not email every overdue task at once after the upgrade.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 07:33:05.112407
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('reminder_sent_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE tasks SET reminder_sent_at = reminder_date WHERE reminder_date <= CURRENT_TIMESTAMP")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('reminder_sent_at')
@@ -0,0 +1,50 @@
+"""content-addressed blobs
+
+Adds blobs, one row per stored file with its reference count and preview
+status, and attachments.content_hash pointing at it. Attachments uploaded
+before this revision keep a NULL content_hash: their files were stored
+under file_path by the old upload code and are not moved into blob
+storage here.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 07:33:06.430981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('preview_status', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('unreferenced_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index(op.f('ix_blobs_unreferenced_at'), 'blobs', ['unreferenced_at'], unique=False)
+
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64),
+                                      sa.ForeignKey('blobs.sha256', name='attachments_content_hash_fkey'),
+                                      nullable=True))
+        batch_op.create_index(batch_op.f('ix_attachments_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_attachments_content_hash'))
+        batch_op.drop_column('content_hash')
+    op.drop_index(op.f('ix_blobs_unreferenced_at'), table_name='blobs')
+    op.drop_table('blobs')
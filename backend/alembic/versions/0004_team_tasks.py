@@ -0,0 +1,36 @@
+"""team tasks
+
+Adds tasks.team_id for tasks on a team board, and an index on
+team_members (user_id, team_id) for looking up a user's teams; the
+primary key leads with team_id.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 07:33:07.857214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('team_id', sa.Integer(),
+                                      sa.ForeignKey('teams.id', ondelete='SET NULL', name='tasks_team_id_fkey'),
+                                      nullable=True))
+        batch_op.create_index(batch_op.f('ix_tasks_team_id'), ['team_id'], unique=False)
+    op.create_index('ix_team_members_user_id_team_id', 'team_members', ['user_id', 'team_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_team_members_user_id_team_id', table_name='team_members')
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tasks_team_id'))
+        batch_op.drop_column('team_id')
@@ -0,0 +1,64 @@
+"""delta sync
+
+Adds change_seq to tasks and team_members, the sync_state counter row and
+task_tombstones. Existing rows get change_seq 0, so clients pick them up
+in their first full sync.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 07:33:09.204776
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('sync_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('purged_seq', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Delta sync draws change sequence numbers from this single row
+    op.execute("INSERT INTO sync_state (id, change_seq, purged_seq) VALUES (1, 0, 0)")
+
+    op.create_table('task_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('team_id', sa.Integer(), nullable=True),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_task_tombstones_created_at'), 'task_tombstones', ['created_at'], unique=False)
+    op.create_index('ix_task_tombstones_team_id_change_seq', 'task_tombstones', ['team_id', 'change_seq'], unique=False)
+    op.create_index('ix_task_tombstones_user_id_change_seq', 'task_tombstones', ['user_id', 'change_seq'], unique=False)
+
+    op.add_column('tasks', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index(op.f('ix_tasks_change_seq'), 'tasks', ['change_seq'], unique=False)
+    op.create_index('ix_tasks_owner_id_change_seq', 'tasks', ['owner_id', 'change_seq'], unique=False)
+    op.add_column('team_members', sa.Column('change_seq', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('team_members') as batch_op:
+        batch_op.drop_column('change_seq')
+    op.drop_index('ix_tasks_owner_id_change_seq', table_name='tasks')
+    op.drop_index(op.f('ix_tasks_change_seq'), table_name='tasks')
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('change_seq')
+
+    op.drop_index('ix_task_tombstones_user_id_change_seq', table_name='task_tombstones')
+    op.drop_index('ix_task_tombstones_team_id_change_seq', table_name='task_tombstones')
+    op.drop_index(op.f('ix_task_tombstones_created_at'), table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    op.drop_table('sync_state')
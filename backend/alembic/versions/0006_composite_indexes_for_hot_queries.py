@@ -0,0 +1,71 @@
+"""composite indexes for hot queries
+
+Adds indexes shaped like the task list, team board, share lookup, reminder
+and audit queries, and drops the ones no query uses: duplicates of primary
+keys, tasks.title (searched only with ILIKE '%...%'), and single-column
+indexes superseded by a composite.
+
+On PostgreSQL the indexes are built and dropped CONCURRENTLY, outside a
+transaction, so writes to the tables continue during the migration. New
+indexes are created before old ones are dropped, and every step is
+idempotent: if the migration is interrupted, run it again (after dropping
+any index left INVALID by an interrupted concurrent build).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 08:04:39.707618
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+PENDING_REMINDER = sa.text('reminder_sent_at IS NULL')
+
+# (name, table, columns, options)
+ADDED = [
+    ('ix_tasks_owner_id_created_at', 'tasks', ['owner_id', 'created_at'], {}),
+    ('ix_tasks_owner_id_status_created_at', 'tasks', ['owner_id', 'status', 'created_at'], {}),
+    ('ix_tasks_team_id_created_at', 'tasks', ['team_id', 'created_at'], {}),
+    ('ix_tasks_reminder_date_pending', 'tasks', ['reminder_date'],
+     {'sqlite_where': PENDING_REMINDER, 'postgresql_where': PENDING_REMINDER}),
+    ('ix_task_shares_user_id_task_id', 'task_shares', ['user_id', 'task_id'], {}),
+    ('ix_activity_logs_user_id_created_at', 'activity_logs', ['user_id', 'created_at'], {}),
+    ('ix_security_events_severity_created_at', 'security_events', ['severity', 'created_at'], {}),
+    ('ix_security_events_user_id_created_at', 'security_events', ['user_id', 'created_at'], {}),
+]
+
+DROPPED = [
+    ('ix_tasks_id', 'tasks', ['id']),
+    ('ix_tasks_title', 'tasks', ['title']),
+    ('ix_tasks_team_id', 'tasks', ['team_id']),  # Leading column of ix_tasks_team_id_created_at
+    ('ix_users_id', 'users', ['id']),
+    ('ix_activity_logs_id', 'activity_logs', ['id']),
+    ('ix_activity_logs_action', 'activity_logs', ['action']),
+    ('ix_activity_logs_entity_type', 'activity_logs', ['entity_type']),
+    ('ix_security_events_id', 'security_events', ['id']),
+    ('ix_security_events_severity', 'security_events', ['severity']),  # See ix_security_events_severity_created_at
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in ADDED:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True,
+                            postgresql_concurrently=True, **options)
+        for name, table, _ in DROPPED:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(DROPPED):
+            op.create_index(name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True)
+        for name, table, _, _ in reversed(ADDED):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
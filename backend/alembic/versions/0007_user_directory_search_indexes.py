@@ -0,0 +1,38 @@
+"""user directory search indexes
+
+Indexes lower(email), lower(username) and lower(full_name) for the
+case-insensitive prefix search in the admin user directory. PostgreSQL
+gets text_pattern_ops indexes, which serve LIKE 'prefix%' whatever the
+database collation, built CONCURRENTLY so sign-ups and logins continue
+during the migration; other databases get plain expression indexes.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 10:12:51.284103
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+COLUMNS = ['email', 'username', 'full_name']
+
+
+def upgrade() -> None:
+    opclass = ' text_pattern_ops' if op.get_bind().dialect.name == 'postgresql' else ''
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.create_index(f'ix_users_lower_{column}', 'users', [sa.text(f'lower({column}){opclass}')],
+                            unique=False, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in reversed(COLUMNS):
+            op.drop_index(f'ix_users_lower_{column}', table_name='users', if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,65 @@
+"""task visibility
+
+Adds task_visibility, one row per task a user can see (owned, shared or on
+one of their teams), and fills it from tasks, task_shares and team_members.
+From here on the application keeps it up to date; see app.core.visibility.
+On a large database the fill takes a while and holds write locks on the
+new table only; `python -m app.tools.visibility check` verifies it.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 11:37:02.518846
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+# The enum types already exist; tasks uses them
+TASK_STATUS = postgresql.ENUM('TODO', 'IN_PROGRESS', 'REVIEW', 'COMPLETED', 'CANCELLED',
+                              name='taskstatus', create_type=False)
+TASK_PRIORITY = postgresql.ENUM('LOW', 'MEDIUM', 'HIGH', 'CRITICAL', name='taskpriority', create_type=False)
+
+FILL = """
+INSERT INTO task_visibility (user_id, task_id, created_at, status, priority)
+SELECT owner_id, id, created_at, status, priority FROM tasks
+UNION
+SELECT task_shares.user_id, tasks.id, tasks.created_at, tasks.status, tasks.priority
+FROM task_shares JOIN tasks ON tasks.id = task_shares.task_id
+UNION
+SELECT team_members.user_id, tasks.id, tasks.created_at, tasks.status, tasks.priority
+FROM team_members JOIN tasks ON tasks.team_id = team_members.team_id
+"""
+
+
+def upgrade() -> None:
+    op.create_table('task_visibility',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('status', TASK_STATUS, nullable=False),
+    sa.Column('priority', TASK_PRIORITY, nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'task_id')
+    )
+    op.execute(FILL)
+    # Indexes after the fill, which is faster than maintaining them row by row
+    op.create_index('ix_task_visibility_user_id_created_at', 'task_visibility', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_task_visibility_user_id_status_created_at', 'task_visibility',
+                    ['user_id', 'status', 'created_at'], unique=False)
+    op.create_index('ix_task_visibility_task_id', 'task_visibility', ['task_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_visibility_task_id', table_name='task_visibility')
+    op.drop_index('ix_task_visibility_user_id_status_created_at', table_name='task_visibility')
+    op.drop_index('ix_task_visibility_user_id_created_at', table_name='task_visibility')
+    op.drop_table('task_visibility')
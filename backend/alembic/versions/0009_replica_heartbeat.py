@@ -0,0 +1,34 @@
+"""replica heartbeat
+
+Adds replica_heartbeat, a single-row counter the read replica probe
+advances on the primary every REPLICA_PROBE_INTERVAL_SECONDS. A replica's
+lag is how long ago the primary reached a beat the replica has not
+replayed, whatever else is or is not being written.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 14:02:40.318270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('replica_heartbeat',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('beat', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO replica_heartbeat (id, beat) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    op.drop_table('replica_heartbeat')
@@ -0,0 +1,37 @@
+"""task change sequence
+
+On PostgreSQL, delta sync sequence numbers come from the task_change_seq
+sequence instead of the sync_state row, whose lock serialized every
+transaction that wrote tasks. The sequence continues from the row's
+counter. Other databases keep using the row; see app.core.changes.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 15:21:08.604117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE SEQUENCE task_change_seq")
+    op.execute("SELECT setval('task_change_seq', change_seq) FROM sync_state WHERE id = 1 AND change_seq > 0")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        "UPDATE sync_state SET change_seq = "
+        "(SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM task_change_seq) WHERE id = 1"
+    )
+    op.execute("DROP SEQUENCE task_change_seq")
@@ -1,25 +1,24 @@
-from typing import Optional
+from typing import Dict, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, object_session
 from app.core.database import get_db
+from app.core.logging_config import set_log_user
+from app.core.memberships import load_memberships
+from app.core.revocation import revocations
+from app.core.visibility import visible_task_ids
 from app.core.security import security
-from app.models import User, UserRole
+from app.models import Task, TeamRole, User, UserRole
 from app.schemas.user import TokenPayload
 
 # Security scheme
 security_scheme = HTTPBearer()
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+def authenticate_token(token: str, db: Session) -> User:
     """
-    Get current authenticated user from JWT token.
+    Resolve an access token to its active user.
     """
-    token = credentials.credentials
-    
     # Decode token
     payload = security.decode_token(token)
     if not payload:
@@ -38,6 +37,14 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Logged out; an in-memory check, see app.core.revocation
+    if revocations.is_revoked(payload.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
     # Get user ID from token
     user_id: Optional[int] = payload.get("sub")
     if user_id is None:
@@ -61,9 +68,22 @@ async def get_current_user(
             detail="Inactive user"
         )
     
+    # Lets the session keep this user's reads on the primary after a write
+    db.info["user_id"] = user.id
+    set_log_user(user.id)
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Get current authenticated user from JWT token.
+    """
+    return authenticate_token(credentials.credentials, db)
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -114,3 +134,40 @@ def check_user_permissions(current_user: User, resource_owner_id: int) -> bool:
     if current_user.role == UserRole.ADMIN:
         return True
     return current_user.id == resource_owner_id
+
+
+def visible_tasks_filter(current_user: User):
+    """
+    SQL condition selecting the tasks a user can see: owned, shared with
+    them directly, or belonging to one of their teams. Answered from the
+    materialized task_visibility table (see app.core.visibility).
+    """
+    return Task.id.in_(visible_task_ids(current_user.id))
+
+
+def is_team_member(db: Session, user_id: int, team_id: int) -> bool:
+    return team_id in load_memberships(db, user_id)
+
+
+async def get_team_memberships(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+) -> Dict[int, TeamRole]:
+    """
+    The current user's role in each of their teams. Resolved once per
+    request and served from the membership cache across requests.
+    """
+    return load_memberships(db, current_user.id)
+
+
+def can_access_task(current_user: User, task) -> bool:
+    """
+    Check if user can view a task and update its status.
+    Owners, users the task is shared with, members of the task's team and
+    admins have access.
+    """
+    if current_user.role == UserRole.ADMIN or task.owner_id == current_user.id:
+        return True
+    if any(u.id == current_user.id for u in task.shared_with):
+        return True
+    return task.team_id is not None and is_team_member(object_session(task), current_user.id, task.team_id)
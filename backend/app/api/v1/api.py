@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, tasks, users, admin, teams
+from app.api.v1.endpoints import auth, tasks, users, admin, teams, attachments, stream
 
 api_router = APIRouter()
 
@@ -9,3 +9,5 @@ api_router.include_router(tasks.router, prefix="/tasks", tags=["Tasks"])
 api_router.include_router(users.router, prefix="/users", tags=["Users"])
 api_router.include_router(admin.router, prefix="/admin", tags=["Admin"])
 api_router.include_router(teams.router, prefix="/teams", tags=["Teams"])
+api_router.include_router(attachments.router, tags=["Attachments"])
+api_router.include_router(stream.router, prefix="/stream", tags=["Stream"])
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
 import math
 
-from app.core.database import get_db
-from app.models import User, Task, ActivityLog, SecurityEvent, TaskStatus, TaskPriority
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.user_directory import search_condition, user_prefix_index
+from app.models import User, Task, ActivityLog, SecurityEvent, TaskStatus, TaskPriority, UserRole
 from app.schemas import user as user_schemas
 from app.schemas.common import (
     DashboardStats, UserStats, TaskStats,
@@ -19,15 +22,26 @@ import logging
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+DASHBOARD_TAG = "admin:dashboard"
+
 
 @router.get("/dashboard", response_model=DashboardStats)
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_admin_user),
 ):
     """
-    Get dashboard statistics (admin only).
+    Get dashboard statistics (admin only), cached for ADMIN_DASHBOARD_CACHE_SECONDS.
     """
+    return await cache.get_or_compute(
+        DASHBOARD_TAG,
+        lambda: _dashboard_stats(db).model_dump(mode="json"),
+        ttl=settings.ADMIN_DASHBOARD_CACHE_SECONDS,
+        tags=[DASHBOARD_TAG],
+    )
+
+
+def _dashboard_stats(db: Session) -> DashboardStats:
     # User statistics
     total_users = db.query(func.count(User.id)).scalar()
     active_users = db.query(func.count(User.id)).filter(User.is_active == True).scalar()
@@ -97,18 +111,86 @@ async def get_dashboard_stats(
 
 @router.get("/users", response_model=List[user_schemas.User])
 async def get_all_users(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_admin_user),
-    skip: int = Query(0, ge=0),
+    q: Optional[str] = Query(None, min_length=1, max_length=255, description="Email, username or full name prefix"),
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    last_login_after: Optional[datetime] = None,
+    last_login_before: Optional[datetime] = None,
+    cursor: Optional[int] = Query(None, ge=0, description="X-Next-Cursor of the previous page"),
+    skip: int = Query(0, ge=0, deprecated=True, description="Use cursor instead"),
     limit: int = Query(100, ge=1, le=100),
 ):
     """
-    Get all users (admin only).
+    Search the user directory (admin only), ordered by id.
+    
+    `q` matches a case-insensitive prefix of the email, username or full
+    name. Pages are keyset-paginated: pass the X-Next-Cursor header of a
+    response as `cursor` to get the next page; the header is absent on the
+    last page. X-Total-Count counts the matching users up to
+    USER_DIRECTORY_COUNT_LIMIT, and X-Total-Count-Exact is false when the
+    count stopped there.
     """
-    users = db.query(User).offset(skip).limit(limit).all()
+    query = db.query(User)
+    if q:
+        query = query.filter(search_condition(q))
+    if role is not None:
+        query = query.filter(User.role == role)
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    if last_login_after is not None:
+        query = query.filter(User.last_login >= last_login_after)
+    if last_login_before is not None:
+        query = query.filter(User.last_login < last_login_before)
+    
+    # Counting stops after the limit, so a broad filter on a large tenant
+    # costs at most that many index entries
+    cap = settings.USER_DIRECTORY_COUNT_LIMIT
+    total = db.query(func.count()).select_from(
+        query.with_entities(User.id).limit(cap + 1).subquery()
+    ).scalar()
+    response.headers["X-Total-Count"] = str(min(total, cap))
+    if total > cap:
+        response.headers["X-Total-Count-Exact"] = "false"
+    
+    query = query.order_by(User.id)
+    if cursor is not None:
+        query = query.filter(User.id > cursor)
+    else:
+        query = query.offset(skip)
+    users = query.limit(limit + 1).all()
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers["X-Next-Cursor"] = str(users[-1].id)
     return users
 
 
+@router.get("/users/suggest", response_model=List[user_schemas.UserSuggestion])
+async def suggest_users(
+    q: str = Query(..., min_length=1, max_length=255),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """
+    Type-ahead suggestions for the user directory (admin only): users whose
+    email, username or full name starts with `q`. Served from the in-memory
+    index when it is enabled and built, which also matches later words of
+    the full name.
+    """
+    if settings.USER_SUGGEST_INDEX_ENABLED and user_prefix_index.ready:
+        return user_prefix_index.lookup(q, limit)
+    return (
+        db.query(User.id, User.username, User.email, User.full_name, User.is_active)
+        .filter(search_condition(q))
+        .order_by(User.username)
+        .limit(limit)
+        .all()
+    )
+
+
 @router.patch("/users/{user_id}/role", response_model=user_schemas.User)
 async def update_user_role(
     user_id: int,
@@ -130,8 +212,9 @@ async def update_user_role(
     user.role = role_update.role
     db.commit()
     db.refresh(user)
+    await cache.invalidate(DASHBOARD_TAG)
     
-    logger.info(f"User role updated: {user.username} -> {role_update.role}")
+    logger.info("User role updated: %s -> %s", user.username, role_update.role)
     return user
 
 
@@ -163,14 +246,15 @@ async def update_user_status(
     user.is_active = status_update.is_active
     db.commit()
     db.refresh(user)
+    await cache.invalidate(DASHBOARD_TAG)
     
-    logger.info(f"User status updated: {user.username} -> active={status_update.is_active}")
+    logger.info("User status updated: %s -> active=%s", user.username, status_update.is_active)
     return user
 
 
 @router.get("/audit-logs", response_model=ActivityLogList)
 async def get_audit_logs(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_auditor_or_admin),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -197,7 +281,7 @@ async def get_audit_logs(
 
 @router.get("/security-events", response_model=SecurityEventList)
 async def get_security_events(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_auditor_or_admin),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -0,0 +1,430 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Header, Query
+from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import Session, joinedload
+from typing import List
+import os
+import uuid
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.downloads import (
+    CACHE_CONTROL,
+    BlobFileResponse,
+    RangeNotSatisfiable,
+    blob_headers,
+    etag_for,
+    etag_matches,
+    parse_range,
+)
+from app.core.previews import previews
+from app.core.thumbnails import PREVIEW_MEDIA_TYPE
+from app.core.storage import blob_key, get_storage, store_blob
+from app.core.uploads import (
+    MultipartFileReceiver,
+    StagedFile,
+    UploadError,
+    append_chunk,
+    create_upload_session,
+    finalize_session,
+    load_upload_session,
+)
+from app.models import Attachment, Task, User
+from app.schemas.common import Attachment as AttachmentSchema, UploadSessionCreate, UploadStatus
+from app.api.deps import get_current_active_user, can_access_task
+from app.api.v1.endpoints.tasks import log_activity
+from starlette.concurrency import run_in_threadpool
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 16 * 1024
+
+MULTIPART_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+def get_accessible_task(db: Session, task_id: int, current_user: User) -> Task:
+    """Load a task and verify the user may attach files to it."""
+    task = db.query(Task).filter(Task.id == task_id).first()
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+
+    if not can_access_task(current_user, task):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return task
+
+
+def store_attachment(db: Session, task: Task, staged: StagedFile, current_user: User) -> Attachment:
+    """Store a staged upload (deduplicated by content) and record it."""
+    try:
+        blob = store_blob(db, staged)
+        attachment = Attachment(
+            filename=f"{uuid.uuid4().hex}.{staged.extension}",
+            original_filename=staged.original_filename,
+            file_path=blob_key(blob.sha256),
+            file_type=blob.content_type,
+            file_size=blob.size,
+            content_hash=blob.sha256,
+            task_id=task.id,
+        )
+        db.add(attachment)
+        db.commit()
+    except Exception:
+        db.rollback()
+        staged.discard()
+        raise
+    db.refresh(attachment)
+
+    log_activity(
+        db=db,
+        action="ATTACH",
+        entity_type="Task",
+        entity_id=task.id,
+        user_id=current_user.id,
+        description=f"Attached file: {staged.original_filename}"
+    )
+
+    logger.info("Attachment %s uploaded to task %s by user %s", attachment.id, task.id, current_user.username)
+    return attachment
+
+
+def upload_error(exc: UploadError) -> HTTPException:
+    return HTTPException(status_code=exc.status_code, detail=exc.detail)
+
+
+def schedule_preview(attachment: Attachment) -> None:
+    """Start rendering the preview of a newly stored blob."""
+    if attachment.blob.preview_status is None:
+        previews.schedule(attachment.content_hash, attachment.file_type)
+
+
+@router.get("/tasks/{task_id}/attachments", response_model=List[AttachmentSchema])
+async def list_attachments(
+    task_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    List the attachments of a task.
+    """
+    task = get_accessible_task(db, task_id, current_user)
+    return task.attachments
+
+
+@router.post(
+    "/tasks/{task_id}/attachments",
+    response_model=AttachmentSchema,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=MULTIPART_BODY,
+)
+async def upload_attachment(
+    task_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Upload a file to a task as multipart/form-data (field "file").
+    The body is streamed to disk; it is never held in memory.
+    """
+    task = get_accessible_task(db, task_id, current_user)
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds maximum size of {settings.MAX_UPLOAD_SIZE} bytes"
+        )
+
+    try:
+        receiver = MultipartFileReceiver(request.headers.get("content-type", ""), settings.MAX_UPLOAD_SIZE)
+        staged = await receiver.receive(request.stream())
+    except UploadError as exc:
+        raise upload_error(exc)
+
+    attachment = await run_in_threadpool(store_attachment, db, task, staged, current_user)
+    schedule_preview(attachment)
+    return attachment
+
+
+# Resumable uploads
+@router.post(
+    "/tasks/{task_id}/attachments/uploads",
+    response_model=UploadStatus,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_upload(
+    task_id: int,
+    upload_in: UploadSessionCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Start a resumable upload. Send the file with PATCH requests carrying an
+    Upload-Offset header; an interrupted upload resumes from the offset
+    returned by GET.
+    """
+    get_accessible_task(db, task_id, current_user)
+    try:
+        session = await run_in_threadpool(
+            create_upload_session, task_id, current_user.id, upload_in.filename, upload_in.size
+        )
+    except UploadError as exc:
+        raise upload_error(exc)
+
+    response.headers["Location"] = f"{settings.API_V1_STR}/tasks/{task_id}/attachments/uploads/{session.upload_id}"
+    response.headers["Upload-Offset"] = "0"
+    return UploadStatus(upload_id=session.upload_id, filename=session.filename, offset=0, size=session.size)
+
+
+def get_upload_session(upload_id: str, task_id: int, current_user: User):
+    session = load_upload_session(upload_id)
+    if not session or session.task_id != task_id or session.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload not found"
+        )
+    return session
+
+
+@router.get("/tasks/{task_id}/attachments/uploads/{upload_id}", response_model=UploadStatus)
+async def get_upload(
+    task_id: int,
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Get the current offset of a resumable upload.
+    """
+    session = get_upload_session(upload_id, task_id, current_user)
+    offset = session.offset
+    response.headers["Upload-Offset"] = str(offset)
+    return UploadStatus(upload_id=upload_id, filename=session.filename, offset=offset, size=session.size)
+
+
+@router.patch("/tasks/{task_id}/attachments/uploads/{upload_id}", response_model=UploadStatus)
+async def upload_chunk(
+    task_id: int,
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Append the raw request body to a resumable upload at Upload-Offset.
+    The attachment is created once the declared size has been received.
+    """
+    session = get_upload_session(upload_id, task_id, current_user)
+    task = get_accessible_task(db, task_id, current_user)
+
+    try:
+        offset = await append_chunk(session, upload_offset, request.stream())
+        response.headers["Upload-Offset"] = str(offset)
+        if offset < session.size:
+            return UploadStatus(upload_id=upload_id, filename=session.filename, offset=offset, size=session.size)
+        staged = await run_in_threadpool(finalize_session, session)
+    except UploadError as exc:
+        raise upload_error(exc)
+
+    attachment = await run_in_threadpool(store_attachment, db, task, staged, current_user)
+    schedule_preview(attachment)
+    return UploadStatus(
+        upload_id=upload_id,
+        filename=session.filename,
+        offset=offset,
+        size=session.size,
+        complete=True,
+        attachment=attachment,
+    )
+
+
+@router.delete("/tasks/{task_id}/attachments/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_upload(
+    task_id: int,
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Abandon a resumable upload and discard the received data.
+    """
+    session = get_upload_session(upload_id, task_id, current_user)
+    await run_in_threadpool(session.delete)
+    return None
+
+
+@router.api_route("/attachments/{attachment_id}", methods=["GET", "HEAD"], response_class=Response)
+async def download_attachment(
+    attachment_id: int,
+    request: Request,
+    inline: bool = Query(False, description="Display in the browser instead of downloading"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Download an attachment. Supports Range/If-Range and conditional requests;
+    the ETag is the content hash. The transfer itself is done with sendfile,
+    handed to nginx (X-Accel-Redirect) or redirected to the object store.
+    """
+    attachment = db.query(Attachment).options(
+        joinedload(Attachment.task)
+    ).filter(Attachment.id == attachment_id).first()
+
+    if not attachment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attachment not found"
+        )
+    if not can_access_task(current_user, attachment.task):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    digest = attachment.content_hash
+    headers = blob_headers(
+        digest,
+        attachment.original_filename,
+        attachment.file_type,
+        attachment.created_at.timestamp(),
+        "inline" if inline else "attachment",
+    )
+    if etag_matches(request.headers.get("if-none-match"), headers["etag"]):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"etag": headers["etag"], "cache-control": headers["cache-control"]},
+        )
+
+    storage = get_storage()
+    path = storage.local_path(digest)
+    if path is None:
+        url = storage.presigned_url(digest, attachment.original_filename, attachment.file_type,
+                                    "inline" if inline else "attachment")
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    if settings.ATTACHMENT_DOWNLOAD_MODE == "x-accel":
+        # nginx serves the file (including ranges) from its internal location
+        headers["x-accel-redirect"] = f"{settings.X_ACCEL_REDIRECT_PREFIX}{attachment.file_path}"
+        return Response(headers=headers)
+
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attachment content not found"
+        )
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range == headers["etag"] or if_range == headers["last-modified"]:
+        try:
+            byte_range = parse_range(request.headers.get("range"), stat_result.st_size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"content-range": f"bytes */{stat_result.st_size}"},
+            )
+
+    return BlobFileResponse(str(path), headers, byte_range, stat_result)
+
+
+@router.get("/attachments/{attachment_id}/preview", response_class=Response)
+async def get_attachment_preview(
+    attachment_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Get a WebP thumbnail of an image (or PDF) attachment. Previews are
+    generated in the background after upload; one that is missing is
+    generated on demand.
+    """
+    attachment = db.query(Attachment).options(
+        joinedload(Attachment.task), joinedload(Attachment.blob)
+    ).filter(Attachment.id == attachment_id).first()
+
+    if not attachment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attachment not found"
+        )
+    if not can_access_task(current_user, attachment.task):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+
+    headers = {
+        "etag": etag_for(f"{attachment.content_hash}-{previews.preview_name}"),
+        "cache-control": CACHE_CONTROL,
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    data = await previews.get(attachment.blob)
+    if data is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Preview not available"
+        )
+    return Response(content=data, media_type=PREVIEW_MEDIA_TYPE, headers=headers)
+
+
+@router.delete("/attachments/{attachment_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_attachment(
+    attachment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Remove an attachment from its task. The stored content is reclaimed by
+    the garbage collector once no other attachment references it.
+    """
+    attachment = db.query(Attachment).filter(Attachment.id == attachment_id).first()
+    if not attachment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attachment not found"
+        )
+    get_accessible_task(db, attachment.task_id, current_user)
+
+    filename = attachment.original_filename
+    task_id = attachment.task_id
+    db.delete(attachment)
+    db.commit()
+
+    log_activity(
+        db=db,
+        action="DETACH",
+        entity_type="Task",
+        entity_id=task_id,
+        user_id=current_user.id,
+        description=f"Removed attachment: {filename}"
+    )
+    return None
@@ -1,7 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Optional
+from app.api.deps import security_scheme
 from app.core.database import get_db
+from app.core.proxies import client_address
+from app.core.revocation import revocations
+from app.core.throttle import login_failures, login_retry_after, record_login_failure, reset_login_failures
 from app.core.security import security
 from app.models import User, SecurityEvent
 from app.schemas import user as schemas
@@ -80,11 +86,11 @@ async def register(
         severity="INFO",
         description=f"New user registered: {user_in.username}",
         user_id=new_user.id,
-        ip_address=request.client.host if request.client else None,
+        ip_address=client_address(request),
         user_agent=request.headers.get("user-agent")
     )
     
-    logger.info(f"New user registered: {user_in.username}")
+    logger.info("New user registered: %s", user_in.username)
     return new_user
 
 
@@ -97,20 +103,26 @@ async def login(
     """
     Login user and return access token.
     """
+    ip_address = client_address(request)
+    user_agent = request.headers.get("user-agent")
+    
+    # Throttled after repeated failures; checked before the lookup and bcrypt
+    retry_after = await login_retry_after(user_credentials.username, ip_address)
+    if retry_after:
+        login_failures.record(user_credentials.username, ip_address, user_agent, throttled=True)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+    
     # Find user
     user = db.query(User).filter(User.username == user_credentials.username).first()
     
     if not user or not security.verify_password(user_credentials.password, user.hashed_password):
-        # Log failed login
-        log_security_event(
-            db=db,
-            event_type="LOGIN_FAILED",
-            severity="WARNING",
-            description=f"Failed login attempt for username: {user_credentials.username}",
-            user_id=user.id if user else None,
-            ip_address=request.client.host if request.client else None,
-            user_agent=request.headers.get("user-agent")
-        )
+        # Summarized into one SecurityEvent per username, see app.core.throttle
+        login_failures.record(user_credentials.username, ip_address, user_agent, user_id=user.id if user else None)
+        await record_login_failure(user_credentials.username, ip_address)
         
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -124,11 +136,14 @@ async def login(
             detail="Inactive user account"
         )
     
+    await reset_login_failures(user.username)
+    
     # Create tokens
     access_token = security.create_access_token(data={"sub": user.id})
     refresh_token = security.create_refresh_token(data={"sub": user.id})
     
-    # Update last login
+    # Update last login; the user's next reads stay on the primary
+    db.info["user_id"] = user.id
     user.last_login = datetime.utcnow()
     db.commit()
     
@@ -139,11 +154,11 @@ async def login(
         severity="INFO",
         description=f"User logged in: {user.username}",
         user_id=user.id,
-        ip_address=request.client.host if request.client else None,
-        user_agent=request.headers.get("user-agent")
+        ip_address=ip_address,
+        user_agent=user_agent
     )
     
-    logger.info(f"User logged in: {user.username}")
+    logger.info("User logged in: %s", user.username)
     
     return {
         "access_token": access_token,
@@ -163,7 +178,7 @@ async def refresh_token(
     # Decode refresh token
     payload = security.decode_token(token_data.refresh_token)
     
-    if not payload or payload.get("type") != "refresh":
+    if not payload or payload.get("type") != "refresh" or revocations.is_revoked(payload.get("jti")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token",
@@ -199,13 +214,40 @@ async def refresh_token(
 
 @router.post("/logout", response_model=ResponseModel)
 async def logout(
-    request: Request,
-    db: Session = Depends(get_db)
+    token_data: Optional[schemas.TokenRefresh] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
 ):
     """
-    Logout user (client should delete tokens).
+    Logout user: revoke the access token, and the refresh token if given,
+    until they expire.
     """
-    # In a production app, you might want to blacklist the token
+    payload = security.decode_token(credentials.credentials)
+    if not payload or payload.get("type") != "access":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    revoked = [payload]
+    
+    if token_data is not None:
+        refresh_payload = security.decode_token(token_data.refresh_token)
+        if (
+            not refresh_payload
+            or refresh_payload.get("type") != "refresh"
+            or refresh_payload.get("sub") != payload.get("sub")
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid refresh token"
+            )
+        revoked.append(refresh_payload)
+    
+    for token_payload in revoked:
+        if token_payload.get("jti"):
+            await revocations.revoke(token_payload["jti"], token_payload["exp"])
+    
+    logger.info("User logged out: %s", payload.get("sub"))
     return ResponseModel(
         success=True,
         message="Successfully logged out",
@@ -0,0 +1,126 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.requests import HTTPConnection
+from typing import Optional
+import asyncio
+import json
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.memberships import load_memberships
+from app.core.realtime import hub
+from app.models import User, UserRole
+from app.api.deps import authenticate_token
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def bearer_token(connection: HTTPConnection, access_token: Optional[str]) -> Optional[str]:
+    """
+    Token from the Authorization header, or from the access_token query
+    parameter for browser EventSource/WebSocket clients that cannot set headers.
+    """
+    scheme, _, credentials = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials
+    return access_token
+
+
+def subscription_args(db: Session, user: User) -> dict:
+    """What a subscription needs from the database, read before going idle."""
+    return {
+        "user_id": user.id,
+        "team_ids": list(load_memberships(db, user.id)),
+        "is_admin": user.role == UserRole.ADMIN,
+    }
+
+
+def sse_message(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+@router.get("", response_class=StreamingResponse)
+async def stream_events(
+    request: Request,
+    access_token: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Server-sent events feed of changes to the tasks the user can see.
+    Events: task.created, task.updated, task.status, task.shared,
+    task.unshared (no longer visible to you), task.deleted and resync
+    (refetch task lists; sent when the client fell behind).
+    """
+    token = bearer_token(request, access_token)
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    args = subscription_args(db, authenticate_token(token, db))
+
+    async def events():
+        # Subscribed once streaming starts, so the finally clause always unsubscribes
+        subscription = hub.subscribe(**args)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = await subscription.get(timeout=settings.STREAM_HEARTBEAT_SECONDS)
+                # A comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n" if event is None else sse_message(event)
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("")
+async def stream_events_ws(
+    websocket: WebSocket,
+    access_token: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    WebSocket variant of the feed; each event is sent as a JSON text message.
+    """
+    token = bearer_token(websocket, access_token)
+    try:
+        if not token:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+        args = subscription_args(db, authenticate_token(token, db))
+    except HTTPException as exc:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
+        return
+    # Return the connection to the pool; the socket may stay open for hours
+    db.rollback()
+
+    await websocket.accept()
+    subscription = hub.subscribe(**args)
+    # Watch for the client closing while waiting for events
+    closed = asyncio.create_task(_wait_closed(websocket))
+    try:
+        while not closed.done():
+            next_event = asyncio.create_task(subscription.get(timeout=settings.STREAM_HEARTBEAT_SECONDS))
+            await asyncio.wait({next_event, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                next_event.cancel()
+                break
+            event = next_event.result()
+            await websocket.send_json(event if event is not None else {"type": "keepalive"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
+        hub.unsubscribe(subscription)
+
+
+async def _wait_closed(websocket: WebSocket) -> None:
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
@@ -1,15 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, desc, exists, func, or_, select
 from typing import Optional, List
 from datetime import datetime
 import math
 
-from app.core.database import get_db
-from app.models import Task, User, ActivityLog, TaskStatus
+from app.core.database import get_db, get_read_db
+from app.models import Task, User, ActivityLog, TaskStatus, Attachment, SyncState, TaskTombstone, TeamMember
+from app.models.task import task_visibility
 from app.schemas import task as schemas
-from app.api.deps import get_current_active_user, check_user_permissions
+from app.api.deps import (
+    get_current_active_user,
+    check_user_permissions,
+    can_access_task,
+    is_team_member,
+    visible_tasks_filter,
+)
 from app.core.config import settings
+from app.core.notifications import notifier
+from app.core.realtime import hub, task_event
+from app.core.changes import change_horizon, format_cursor, parse_cursor
+from app.core.memberships import load_memberships
 import logging
 
 router = APIRouter()
@@ -38,9 +49,20 @@ def log_activity(
     db.commit()
 
 
+def check_team_access(db: Session, team_id: Optional[int], current_user: User) -> None:
+    """Only members of a team (and admins) can put tasks on its board."""
+    if team_id is None or current_user.role == "admin":
+        return
+    if not is_team_member(db, current_user.id, team_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a member of this team"
+        )
+
+
 @router.get("", response_model=schemas.TaskList)
 async def get_tasks(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -48,27 +70,32 @@ async def get_tasks(
     priority: Optional[str] = None,
     category: Optional[str] = None,
     search: Optional[str] = None,
+    team_id: Optional[int] = None,
 ):
     """
-    Get paginated list of tasks for the current user (owned + shared).
-    Admins can see all tasks.
+    Get paginated list of tasks for the current user (owned, shared and
+    team tasks). Admins can see all tasks.
     """
-    query = db.query(Task)
-    
-    # Filter by owner or shared unless admin
-    if current_user.role != "admin":
-        query = query.filter(
-            or_(
-                Task.owner_id == current_user.id,
-                Task.shared_with.any(id=current_user.id)
-            )
-        )
+    is_admin = current_user.role == "admin"
+    if is_admin:
+        query = db.query(Task)
+        visible = Task.__table__.c
+        conditions = []
+    else:
+        # Read through the user's task_visibility rows, filtering and sorting
+        # on their copies of the task columns: one index range scan
+        visible = task_visibility.c
+        conditions = [visible.user_id == current_user.id]
+        query = db.query(Task).join(task_visibility, visible.task_id == Task.id)
     
     # Apply filters
     if status:
-        query = query.filter(Task.status == status)
+        conditions.append(visible.status == status)
     if priority:
-        query = query.filter(Task.priority == priority)
+        conditions.append(visible.priority == priority)
+    query = query.filter(*conditions)
+    if team_id is not None:
+        query = query.filter(Task.team_id == team_id)
     if category:
         query = query.filter(Task.category == category)
     if search:
@@ -80,12 +107,17 @@ async def get_tasks(
             )
         )
     
-    # Count total
-    total = query.count()
+    # Count total; when only copied columns are filtered on, the visibility rows suffice
+    if not is_admin and team_id is None and not category and not search:
+        total = db.query(func.count()).select_from(task_visibility).filter(*conditions).scalar()
+    else:
+        total = query.count()
     
     # Pagination
     offset = (page - 1) * page_size
-    tasks = query.order_by(desc(Task.created_at)).offset(offset).limit(page_size).all()
+    tasks = query.options(
+        selectinload(Task.attachments).selectinload(Attachment.blob)
+    ).order_by(desc(visible.created_at)).offset(offset).limit(page_size).all()
     
     total_pages = math.ceil(total / page_size) if total > 0 else 1
     
@@ -105,8 +137,10 @@ async def create_task(
     current_user: User = Depends(get_current_active_user),
 ):
     """
-    Create a new task.
+    Create a new task, optionally on a team board (team_id).
     """
+    check_team_access(db, task_in.team_id, current_user)
+    
     new_task = Task(
         **task_in.model_dump(),
         owner_id=current_user.id
@@ -126,10 +160,127 @@ async def create_task(
         description=f"Created task: {new_task.title}"
     )
     
-    logger.info(f"Task created: {new_task.id} by user {current_user.username}")
+    hub.publish(task_event("task.created", new_task))
+    
+    logger.info("Task created: %s by user %s", new_task.id, current_user.username)
     return new_task
 
 
+def memberships_changed(db: Session, user_id: int, since_seq: int) -> bool:
+    """Whether the user joined or left a team after the cursor."""
+    joined = exists().where(TeamMember.user_id == user_id, TeamMember.change_seq > since_seq)
+    left = exists().where(
+        TaskTombstone.task_id.is_(None),
+        TaskTombstone.user_id == user_id,
+        TaskTombstone.change_seq > since_seq,
+    )
+    return db.query(joined).scalar() or db.query(left).scalar()
+
+
+@router.get("/changes", response_model=schemas.TaskChanges)
+async def get_task_changes(
+    since: Optional[str] = Query(None, description="Cursor from the previous response; omit for a full sync"),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Get the tasks created or changed since a cursor, plus tombstones for
+    tasks that were deleted or are no longer visible. Keep requesting with
+    the returned cursor while has_more is true. If reset is true, discard
+    local tasks and sync again without a cursor.
+    """
+    if since:
+        try:
+            since_seq, since_id = parse_cursor(since)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    else:
+        since_seq, since_id = -1, 0
+    is_admin = current_user.role == "admin"
+
+    # Read before the changes so the final cursor can't pass an unread commit
+    state = db.get(SyncState, 1)
+    current_seq = change_horizon(db)
+    if since and (
+        (state and since_seq < state.purged_seq)
+        or (not is_admin and memberships_changed(db, current_user.id, since_seq))
+    ):
+        return {"items": [], "tombstones": [], "cursor": None, "has_more": False, "reset": True}
+
+    query = db.query(Task)
+    if not is_admin:
+        query = query.filter(visible_tasks_filter(current_user))
+    tasks = query.filter(
+        or_(Task.change_seq > since_seq, and_(Task.change_seq == since_seq, Task.id > since_id)),
+        # Later numbers may still be followed by earlier ones committing
+        Task.change_seq <= current_seq,
+    ).options(
+        selectinload(Task.attachments).selectinload(Attachment.blob)
+    ).order_by(Task.change_seq, Task.id).limit(limit + 1).all()
+
+    tombstones = []
+    if since:
+        visible = select(Task.id)
+        if not is_admin:
+            visible = visible.where(visible_tasks_filter(current_user))
+        tombstone_query = db.query(TaskTombstone).filter(
+            TaskTombstone.task_id.isnot(None),
+            TaskTombstone.change_seq > since_seq,
+            TaskTombstone.change_seq <= current_seq,
+            # Still visible some other way (e.g. unshared but on a team board)
+            TaskTombstone.task_id.notin_(visible),
+        )
+        if not is_admin:
+            tombstone_query = tombstone_query.filter(or_(
+                TaskTombstone.user_id == current_user.id,
+                and_(
+                    TaskTombstone.user_id.is_(None),
+                    TaskTombstone.team_id.in_(list(load_memberships(db, current_user.id))),
+                ),
+            ))
+        tombstones = tombstone_query.order_by(TaskTombstone.change_seq).limit(limit + 1).all()
+
+    # Merge both streams in sequence order
+    entries = sorted(
+        [(task.change_seq, task.id, task) for task in tasks]
+        + [(tombstone.change_seq, 0, tombstone) for tombstone in tombstones],
+        key=lambda entry: entry[:2],
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    if has_more or (entries and entries[-1][0] >= current_seq):
+        last_seq, last_id, _ = entries[-1]
+        cursor = format_cursor(last_seq, last_id)
+    elif current_seq > since_seq:
+        # Nothing visible changed up to current_seq; skip past it
+        cursor = format_cursor(current_seq)
+    else:
+        cursor = format_cursor(since_seq, since_id)
+
+    # Several tombstones (e.g. unshare, then delete) can name the same task; report each id once
+    seen = set()
+    items, removed = [], []
+    for _, _, entry in reversed(entries):
+        task_id = entry.id if isinstance(entry, Task) else entry.task_id
+        if task_id in seen:
+            continue
+        seen.add(task_id)
+        (items if isinstance(entry, Task) else removed).append(entry)
+
+    return {
+        "items": items[::-1],
+        "tombstones": removed[::-1],
+        "cursor": cursor,
+        "has_more": has_more,
+        "reset": False,
+    }
+
+
 @router.get("/{task_id}", response_model=schemas.Task)
 async def get_task(
     task_id: int,
@@ -148,10 +299,7 @@ async def get_task(
         )
     
     # Check permissions (owner or shared)
-    is_owner = task.owner_id == current_user.id
-    is_shared = any(u.id == current_user.id for u in task.shared_with)
-    
-    if not (is_owner or is_shared or current_user.role == "admin"):
+    if not can_access_task(current_user, task):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
@@ -194,9 +342,15 @@ async def update_task(
     
     # Update fields
     update_data = task_update.model_dump(exclude_unset=True)
+    if "team_id" in update_data:
+        check_team_access(db, update_data["team_id"], current_user)
     for field, value in update_data.items():
         setattr(task, field, value)
     
+    # A new reminder date re-arms the reminder notification
+    if "reminder_date" in update_data:
+        task.reminder_sent_at = None
+    
     # Update completed_at timestamp
     if task_update.status == TaskStatus.COMPLETED and not task.completed_at:
         task.completed_at = datetime.utcnow()
@@ -223,7 +377,9 @@ async def update_task(
         changes={"before": old_values, "after": new_values}
     )
     
-    logger.info(f"Task updated: {task.id} by user {current_user.username}")
+    hub.publish(task_event("task.updated", task))
+    
+    logger.info("Task updated: %s by user %s", task.id, current_user.username)
     return task
 
 
@@ -246,10 +402,7 @@ async def update_task_status(
         )
     
     # Check permissions (owner or shared)
-    is_owner = task.owner_id == current_user.id
-    is_shared = any(u.id == current_user.id for u in task.shared_with)
-    
-    if not (is_owner or is_shared or current_user.role == "admin"):
+    if not can_access_task(current_user, task):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
@@ -278,6 +431,8 @@ async def update_task_status(
         changes={"before": {"status": old_status.value}, "after": {"status": task.status.value}}
     )
     
+    hub.publish(task_event("task.status", task))
+    
     return task
 
 
@@ -341,6 +496,69 @@ async def share_task(
         description=f"Shared task with {user_to_share.email}"
     )
     
+    notifier.notify(
+        user_to_share.email,
+        f"{current_user.full_name or current_user.username} shared a task with you",
+        f"\"{task.title}\" has been shared with you.",
+        kind="task_share",
+    )
+    
+    hub.publish(task_event("task.shared", task))
+    
+    return task
+
+
+@router.delete("/{task_id}/share/{user_id}", response_model=schemas.Task)
+async def unshare_task(
+    task_id: int,
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Stop sharing a task with a user. The owner can remove anyone; a user
+    can remove themselves.
+    """
+    task = db.query(Task).filter(Task.id == task_id).first()
+    
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    if task.owner_id != current_user.id and current_user.role != "admin" and current_user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the owner can unshare the task"
+        )
+    
+    user_to_unshare = next((user for user in task.shared_with if user.id == user_id), None)
+    if not user_to_unshare:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task is not shared with this user"
+        )
+    
+    task.shared_with.remove(user_to_unshare)
+    db.commit()
+    db.refresh(task)
+    
+    # Log activity
+    log_activity(
+        db=db,
+        action="UNSHARE",
+        entity_type="Task",
+        entity_id=task.id,
+        user_id=current_user.id,
+        description=f"Stopped sharing task with {user_to_unshare.email}"
+    )
+    
+    hub.publish(task_event("task.updated", task))
+    removed_event = task_event("task.unshared", task)
+    removed_event.user_ids, removed_event.team_id, removed_event.task = [user_id], None, None
+    hub.publish(removed_event)
+    
     return task
 
 
@@ -369,9 +587,12 @@ async def delete_task(
         )
     
     task_title = task.title
+    # Built before the delete, while the shares are still there
+    deleted_event = task_event("task.deleted", task)
     
     db.delete(task)
     db.commit()
+    hub.publish(deleted_event)
     
     # Log activity
     log_activity(
@@ -383,5 +604,5 @@ async def delete_task(
         description=f"Deleted task: {task_title}"
     )
     
-    logger.info(f"Task deleted: {task_id} by user {current_user.username}")
+    logger.info("Task deleted: %s by user %s", task_id, current_user.username)
     return None
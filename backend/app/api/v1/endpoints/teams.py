@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import desc
+from sqlalchemy.orm import Session, joinedload, noload, selectinload
+from typing import Dict, List, Optional
+import math
 
-from app.core.database import get_db
-from app.models import Team, TeamMember, User, TeamRole
+from app.core.database import get_db, get_read_db
+from app.models import Attachment, Task, Team, TeamMember, User, TeamRole, TaskStatus
 from app.schemas import team as schemas
-from app.api.deps import get_current_active_user
+from app.schemas import task as task_schemas
+from app.api.deps import get_current_active_user, get_team_memberships
+from app.core.memberships import load_memberships
+from app.core.notifications import notifier
 
 router = APIRouter()
 
+
+def team_loader_options(include_members: bool = True):
+    """Load members and their users with the teams: two queries in total, not two per team."""
+    if include_members:
+        return [selectinload(Team.members).joinedload(TeamMember.user)]
+    return [noload(Team.members)]
+
+
 @router.post("", response_model=schemas.Team, status_code=status.HTTP_201_CREATED)
 async def create_team(
     team_in: schemas.TeamCreate,
@@ -42,12 +55,15 @@ async def create_team(
 async def get_my_teams(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    include_members: bool = Query(True, description="Set to false to omit member lists; see GET /teams/{id}/members"),
 ):
     """
     Get all teams the current user is a member of.
     """
     # Query teams via the association
-    teams = db.query(Team).join(TeamMember).filter(TeamMember.user_id == current_user.id).all()
+    teams = db.query(Team).join(TeamMember).filter(
+        TeamMember.user_id == current_user.id
+    ).options(*team_loader_options(include_members)).order_by(Team.id).all()
     return teams
 
 @router.get("/{team_id}", response_model=schemas.Team)
@@ -55,42 +71,100 @@ async def get_team(
     team_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    memberships: Dict[int, TeamRole] = Depends(get_team_memberships),
+    include_members: bool = Query(True, description="Set to false to omit the member list"),
 ):
     """
     Get specific team details.
     """
-    team = db.query(Team).filter(Team.id == team_id).first()
-    if not team:
-        raise HTTPException(status_code=404, detail="Team not found")
-    
     # Check membership
-    member = db.query(TeamMember).filter(
-        TeamMember.team_id == team_id,
-        TeamMember.user_id == current_user.id
-    ).first()
-    
-    if not member and current_user.role != "admin":
+    if team_id not in memberships and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not a member of this team")
+    
+    team = db.query(Team).options(*team_loader_options(include_members)).filter(Team.id == team_id).first()
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
         
     return team
 
+
+@router.get("/{team_id}/members", response_model=schemas.TeamMemberList)
+async def get_team_members(
+    team_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    memberships: Dict[int, TeamRole] = Depends(get_team_memberships),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+):
+    """
+    Get the members of a team, page by page.
+    """
+    if team_id not in memberships and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not a member of this team")
+
+    query = db.query(TeamMember).filter(TeamMember.team_id == team_id)
+    total = query.count()
+    offset = (page - 1) * page_size
+    members = query.options(joinedload(TeamMember.user)).order_by(
+        TeamMember.joined_at, TeamMember.user_id
+    ).offset(offset).limit(page_size).all()
+
+    return {
+        "items": members,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": math.ceil(total / page_size) if total > 0 else 1
+    }
+
+@router.get("/{team_id}/tasks", response_model=task_schemas.TaskList)
+async def get_team_tasks(
+    team_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    status: Optional[TaskStatus] = None,
+    memberships: Dict[int, TeamRole] = Depends(get_team_memberships),
+):
+    """
+    Get the team's task board. Every member can see every task on it.
+    """
+    if current_user.role != "admin" and team_id not in memberships:
+        raise HTTPException(status_code=403, detail="Not a member of this team")
+
+    query = db.query(Task).filter(Task.team_id == team_id)
+    if status:
+        query = query.filter(Task.status == status)
+
+    total = query.count()
+    offset = (page - 1) * page_size
+    tasks = query.options(
+        selectinload(Task.attachments).selectinload(Attachment.blob)
+    ).order_by(desc(Task.created_at)).offset(offset).limit(page_size).all()
+
+    return {
+        "items": tasks,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": math.ceil(total / page_size) if total > 0 else 1
+    }
+
 @router.post("/{team_id}/members", response_model=schemas.TeamMember)
 async def add_member(
     team_id: int,
     member_in: schemas.TeamMemberCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    memberships: Dict[int, TeamRole] = Depends(get_team_memberships),
 ):
     """
     Add a member to the team by email. Only admins/owners can add.
     """
     # Check permissions
-    current_member = db.query(TeamMember).filter(
-        TeamMember.team_id == team_id,
-        TeamMember.user_id == current_user.id
-    ).first()
-    
-    if not current_member or current_member.role not in [TeamRole.OWNER, TeamRole.ADMIN]:
+    if memberships.get(team_id) not in [TeamRole.OWNER, TeamRole.ADMIN]:
         raise HTTPException(status_code=403, detail="Not authorized to add members")
         
     # Find user to add
@@ -99,11 +173,7 @@ async def add_member(
         raise HTTPException(status_code=404, detail="User not found")
         
     # Check if already member
-    existing = db.query(TeamMember).filter(
-        TeamMember.team_id == team_id,
-        TeamMember.user_id == user_to_add.id
-    ).first()
-    if existing:
+    if team_id in load_memberships(db, user_to_add.id):
         raise HTTPException(status_code=400, detail="User already in team")
         
     new_member = TeamMember(
@@ -115,6 +185,13 @@ async def add_member(
     db.commit()
     db.refresh(new_member)
     
+    notifier.notify(
+        user_to_add.email,
+        f"You have been added to {new_member.team.name}",
+        f"{current_user.full_name or current_user.username} added you to the team \"{new_member.team.name}\".",
+        kind="team_invite",
+    )
+    
     return new_member
 
 @router.delete("/{team_id}/members/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -123,32 +200,27 @@ async def remove_member(
     user_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
+    memberships: Dict[int, TeamRole] = Depends(get_team_memberships),
 ):
     """
     Remove a member from the team.
     """
     # Check permissions
-    current_member = db.query(TeamMember).filter(
-        TeamMember.team_id == team_id,
-        TeamMember.user_id == current_user.id
-    ).first()
-    
-    if not current_member or current_member.role not in [TeamRole.OWNER, TeamRole.ADMIN]:
+    if memberships.get(team_id) not in [TeamRole.OWNER, TeamRole.ADMIN]:
         # Allow users to leave themselves
         if current_user.id != user_id:
             raise HTTPException(status_code=403, detail="Not authorized to remove members")
             
-    member_to_remove = db.query(TeamMember).filter(
-        TeamMember.team_id == team_id,
-        TeamMember.user_id == user_id
-    ).first()
-    
-    if not member_to_remove:
+    role_to_remove = load_memberships(db, user_id).get(team_id)
+    if role_to_remove is None:
         raise HTTPException(status_code=404, detail="Member not found")
         
-    if member_to_remove.role == TeamRole.OWNER and db.query(TeamMember).filter(TeamMember.team_id == team_id, TeamMember.role == TeamRole.OWNER).count() == 1:
+    if role_to_remove == TeamRole.OWNER and db.query(TeamMember).filter(TeamMember.team_id == team_id, TeamMember.role == TeamRole.OWNER).count() == 1:
          raise HTTPException(status_code=400, detail="Cannot remove the only owner")
 
+    member_to_remove = db.get(TeamMember, (team_id, user_id))
+    if not member_to_remove:
+        raise HTTPException(status_code=404, detail="Member not found")
     db.delete(member_to_remove)
     db.commit()
     return None
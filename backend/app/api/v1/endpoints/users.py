@@ -49,7 +49,7 @@ async def update_current_user(
     db.commit()
     db.refresh(current_user)
     
-    logger.info(f"User profile updated: {current_user.username}")
+    logger.info("User profile updated: %s", current_user.username)
     return current_user
 
 
@@ -73,6 +73,6 @@ async def change_password(
     current_user.hashed_password = security.get_password_hash(password_data.new_password)
     db.commit()
     
-    logger.info(f"Password changed for user: {current_user.username}")
+    logger.info("Password changed for user: %s", current_user.username)
     
     return {"message": "Password changed successfully"}
@@ -0,0 +1,406 @@
+"""
+Application cache.
+
+`cache` stores values under string keys with a TTL, in this worker's
+memory (an LRU bounded by CACHE_MAX_ENTRIES) or in Redis, shared by every
+worker. Values must be JSON-serializable when Redis is used.
+
+Entries can carry tags such as "user:42" or "task:1001", and
+`invalidate("task:1001")` makes every entry tagged with it stale at once.
+Invalidation does not touch the entries: each tag records the value of a
+global clock at its last invalidation, every entry records the clock
+reading taken before its value was computed, and an entry is served only
+if none of its tags were invalidated after that reading. Tag records are
+kept for CACHE_MAX_TTL_SECONDS, the longest a tagged entry can live, so an
+entry is never older than the invalidations that concern it.
+
+`get_or_compute` protects the source from stampedes: concurrent misses for
+a key in one worker share a single computation, and with Redis a short
+lock makes other workers wait for the first one's result instead of
+computing it again.
+
+Backend failures are logged and counted, never raised: a read becomes a
+miss and a write is skipped.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Sequence, Union
+
+from prometheus_client import Counter
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups", ["cache", "result"])
+CACHE_COMPUTATIONS = Counter("cache_computations_total", "Values computed after a miss", ["cache"])
+CACHE_COALESCED = Counter("cache_coalesced_total", "Misses that waited for a computation already running", ["cache"])
+CACHE_INVALIDATIONS = Counter("cache_invalidations_total", "Tags invalidated", ["cache"])
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Entries evicted to stay within the size limit", ["cache"])
+CACHE_ERRORS = Counter("cache_errors_total", "Failed cache backend operations", ["cache"])
+
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Storage for cache entries, counters and tag invalidations."""
+
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """Stored values of the keys that exist."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        """Store only if the key does not exist; whether it was stored."""
+
+    @abstractmethod
+    async def delete(self, keys: Sequence[str]) -> None:
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Add to an integer (0 if missing) and return it; `ttl` applies when the key is created."""
+
+    @abstractmethod
+    async def clock(self) -> int:
+        """Current value of the invalidation clock."""
+
+    @abstractmethod
+    async def tag_versions(self, tags: Sequence[str]) -> Dict[str, int]:
+        """Clock value at the last invalidation of each tag, 0 if never (or long ago)."""
+
+    @abstractmethod
+    async def invalidate(self, tags: Sequence[str], ttl: float) -> None:
+        """Advance the clock and record it for the tags, for `ttl` seconds."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """Per-worker LRU; entries past max_entries are evicted oldest use first."""
+
+    def __init__(self, max_entries: int = 10000, name: str = "default"):
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._tags: "OrderedDict[str, tuple]" = OrderedDict()  # tag -> (expires_at, version), oldest first
+        self._clock = 0
+
+    def _get(self, key: str, now: float) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        if entry[0] <= now:
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _put(self, key: str, value: Any, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            CACHE_EVICTIONS.labels(self.name).inc()
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            value = self._get(key, now)
+            if value is not MISSING:
+                found[key] = value
+        return found
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._put(key, value, time.monotonic() + ttl)
+
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        now = time.monotonic()
+        if self._get(key, now) is not MISSING:
+            return False
+        self._put(key, value, now + ttl)
+        return True
+
+    async def delete(self, keys: Sequence[str]) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        now = time.monotonic()
+        value = self._get(key, now)
+        if value is MISSING:
+            self._put(key, amount, now + ttl if ttl else float("inf"))
+            return amount
+        value += amount
+        self._entries[key] = (self._entries[key][0], value)
+        return value
+
+    async def clock(self) -> int:
+        return self._clock
+
+    async def tag_versions(self, tags: Sequence[str]) -> Dict[str, int]:
+        now = time.monotonic()
+        versions = {}
+        for tag in tags:
+            record = self._tags.get(tag)
+            versions[tag] = record[1] if record is not None and record[0] > now else 0
+        return versions
+
+    async def invalidate(self, tags: Sequence[str], ttl: float) -> None:
+        now = time.monotonic()
+        self._clock += 1
+        for tag in tags:
+            self._tags[tag] = (now + ttl, self._clock)
+            self._tags.move_to_end(tag)
+        # Every record has the same lifetime, so expired ones are at the front
+        while self._tags and next(iter(self._tags.values()))[0] <= now:
+            self._tags.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Entries in Redis, shared by all workers. Every key written has a TTL,
+    so a volatile-* maxmemory policy evicts entries without ever dropping
+    the clock; with allkeys-* a tag record could be evicted early.
+    """
+
+    def __init__(self, url: str, prefix: str = "cache", client=None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        values = await self.client.mget([self._key(key) for key in keys])
+        return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self.client.set(self._key(key), json.dumps(value), px=max(1, int(ttl * 1000)))
+
+    async def add(self, key: str, value: Any, ttl: float) -> bool:
+        return bool(await self.client.set(self._key(key), json.dumps(value), px=max(1, int(ttl * 1000)), nx=True))
+
+    async def delete(self, keys: Sequence[str]) -> None:
+        if keys:
+            await self.client.delete(*(self._key(key) for key in keys))
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        value = await self.client.incrby(self._key(key), amount)
+        if ttl and value == amount:
+            await self.client.pexpire(self._key(key), max(1, int(ttl * 1000)))
+        return value
+
+    async def clock(self) -> int:
+        return int(await self.client.get(self._key("clock:")) or 0)
+
+    async def tag_versions(self, tags: Sequence[str]) -> Dict[str, int]:
+        if not tags:
+            return {}
+        values = await self.client.mget([self._key(f"tag:{tag}") for tag in tags])
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    async def invalidate(self, tags: Sequence[str], ttl: float) -> None:
+        version = await self.client.incr(self._key("clock:"))
+        for tag in tags:
+            await self.client.set(self._key(f"tag:{tag}"), version, px=max(1, int(ttl * 1000)))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class Cache:
+    """Tagged entries with TTLs and single-flight computation on top of a backend."""
+
+    def __init__(self, backend: CacheBackend, name: str = "default", default_ttl: float = 300,
+                 max_ttl: float = 86400, lock_timeout: float = 10.0):
+        self.backend = backend
+        self.name = name
+        self.default_ttl = default_ttl
+        self.max_ttl = max_ttl
+        self.lock_timeout = lock_timeout
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_settings(cls) -> "Cache":
+        if settings.CACHE_BACKEND == "redis":
+            backend = RedisBackend(settings.REDIS_URL)
+        else:
+            backend = MemoryBackend(settings.CACHE_MAX_ENTRIES)
+        return cls(
+            backend,
+            default_ttl=settings.CACHE_DEFAULT_TTL_SECONDS,
+            max_ttl=settings.CACHE_MAX_TTL_SECONDS,
+            lock_timeout=settings.CACHE_LOCK_SECONDS,
+        )
+
+    def _ttl(self, ttl: Optional[float], tags: Sequence[str]) -> float:
+        ttl = self.default_ttl if ttl is None else ttl
+        return min(ttl, self.max_ttl) if tags else ttl
+
+    async def _fresh(self, entries: Dict[str, list]) -> Dict[str, Any]:
+        """Values of the entries none of whose tags were invalidated since they were computed."""
+        tags = {tag for _, _, entry_tags in entries.values() for tag in entry_tags}
+        versions = await self.backend.tag_versions(sorted(tags)) if tags else {}
+        return {
+            key: value for key, (value, stamp, entry_tags) in entries.items()
+            if all(versions.get(tag, 0) <= stamp for tag in entry_tags)
+        }
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Cached values of the keys that have one."""
+        keys = list(keys)
+        try:
+            found = await self._fresh(await self.backend.get_many(keys))
+        except Exception:
+            CACHE_ERRORS.labels(self.name).inc()
+            logger.exception("Cache read failed")
+            found = {}
+        CACHE_REQUESTS.labels(self.name, "hit").inc(len(found))
+        CACHE_REQUESTS.labels(self.name, "miss").inc(len(keys) - len(found))
+        return found
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        return (await self.get_many([key])).get(key, default)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Sequence[str] = (),
+                  stamp: Optional[int] = None) -> None:
+        """
+        Store a value. Pass the `stamp` read from `clock()` before the value
+        was computed, so an invalidation in between is not missed.
+        """
+        try:
+            if stamp is None:
+                stamp = await self.backend.clock()
+            await self.backend.set(key, [value, stamp, list(tags)], self._ttl(ttl, tags))
+        except Exception:
+            CACHE_ERRORS.labels(self.name).inc()
+            logger.exception("Cache write failed")
+
+    async def clock(self) -> int:
+        try:
+            return await self.backend.clock()
+        except Exception:
+            CACHE_ERRORS.labels(self.name).inc()
+            logger.exception("Cache read failed")
+            return 0
+
+    async def delete(self, *keys: str) -> None:
+        try:
+            await self.backend.delete(keys)
+        except Exception:
+            CACHE_ERRORS.labels(self.name).inc()
+            logger.exception("Cache delete failed")
+
+    async def invalidate(self, *tags: str) -> None:
+        """Make every entry tagged with any of `tags` stale."""
+        if not tags:
+            return
+        try:
+            await self.backend.invalidate(tags, self.max_ttl)
+            CACHE_INVALIDATIONS.labels(self.name).inc(len(tags))
+        except Exception:
+            CACHE_ERRORS.labels(self.name).inc()
+            logger.exception("Cache invalidation failed")
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add to a counter and return its value; unlike entries, errors propagate."""
+        return await self.backend.incr(key, amount, ttl)
+
+    async def get_counters(self, keys: Iterable[str]) -> Dict[str, int]:
+        """Current values of counters kept with `incr`, 0 when missing or unreadable."""
+        keys = list(keys)
+        try:
+            found = await self.backend.get_many(keys)
+        except Exception:
+            CACHE_ERRORS.labels(self.name).inc()
+            logger.exception("Cache read failed")
+            found = {}
+        return {key: int(found.get(key, 0)) for key in keys}
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Union[Any, Awaitable[Any]]],
+                             ttl: Optional[float] = None, tags: Sequence[str] = ()) -> Any:
+        """
+        The cached value, or the result of `compute()` (a function or a
+        coroutine function), which is then cached.
+        """
+        value = await self.get(key, MISSING)
+        if value is not MISSING:
+            return value
+
+        running = self._inflight.get(key)
+        if running is not None:
+            CACHE_COALESCED.labels(self.name).inc()
+            return await asyncio.shield(running)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._compute(key, compute, ttl, tags)
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # Retrieved here, so it is not reported when nobody else waited
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def _compute(self, key: str, compute, ttl: Optional[float], tags: Sequence[str]) -> Any:
+        lock = f"lock:{key}"
+        try:
+            locked = await self.backend.add(lock, 1, self.lock_timeout)
+        except Exception:
+            CACHE_ERRORS.labels(self.name).inc()
+            locked = True
+        if not locked:
+            # Another worker is computing it; wait for its result, then give up waiting
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                value = await self.get(key, MISSING)
+                if value is not MISSING:
+                    CACHE_COALESCED.labels(self.name).inc()
+                    return value
+
+        stamp = await self.clock()
+        CACHE_COMPUTATIONS.labels(self.name).inc()
+        try:
+            value = compute()
+            if inspect.isawaitable(value):
+                value = await value
+            await self.set(key, value, ttl, tags, stamp=stamp)
+        finally:
+            if locked:
+                await self.delete(lock)
+        return value
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+cache = Cache.from_settings()
@@ -0,0 +1,192 @@
+"""
+Change tracking for delta sync.
+
+Every flush that creates or modifies tasks, or removes a task from someone's
+view, draws sequence numbers, one per change. A client cursor must never
+pass a number whose change has not committed yet, or it would skip that
+change when it commits.
+
+On PostgreSQL the numbers come from the task_change_seq sequence, which
+does not serialize writers. They can commit out of order, so before taking
+numbers a transaction holds a shared advisory lock keyed by the sequence's
+last value, a lower bound for what it will get, until it ends.
+`change_horizon` reads the last number handed out and then the lowest such
+lock, and /tasks/changes returns nothing past either. The cost: one
+long-running write transaction holds back every client's changes until it
+ends, and another user of bigint advisory locks would hold them back too.
+
+Other databases draw the numbers from the single sync_state row. Updating
+that row locks it until commit, so numbers become visible in commit order;
+SQLite has a single writer anyway.
+
+Removals (deletes, unshares, tasks leaving a team, members leaving a team)
+are recorded as tombstones, purged after TOMBSTONE_RETENTION_DAYS.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import List, Optional, Tuple
+
+from sqlalchemy import DDL, event, func, insert, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import SyncState, Task, TaskTombstone, TeamMember
+from app.models.sync import TASK_CHANGE_SEQ
+
+logger = logging.getLogger(__name__)
+
+# The counter row exists from the moment the table does
+event.listen(
+    SyncState.__table__,
+    "after_create",
+    DDL("INSERT INTO sync_state (id, change_seq, purged_seq) VALUES (1, 0, 0)"),
+)
+
+
+LAST_ALLOCATED = "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM task_change_seq"
+
+OLDEST_IN_FLIGHT = """
+SELECT min((classid::bigint << 32) | objid::bigint) FROM pg_locks
+WHERE locktype = 'advisory' AND objsubid = 1
+AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+"""
+
+
+def allocate_sequence(connection, count: int) -> List[int]:
+    """Reserve `count` sequence numbers, in ascending order."""
+    if connection.dialect.name == "postgresql":
+        return _allocate_from_sequence(connection, count)
+    return _allocate_from_row(connection, count)
+
+
+def _allocate_from_sequence(connection, count: int) -> List[int]:
+    # Announce a lower bound before taking numbers; see change_horizon
+    connection.execute(text("SELECT pg_advisory_xact_lock_shared(last_value) FROM task_change_seq"))
+    numbers = connection.execute(
+        select(TASK_CHANGE_SEQ.next_value()).select_from(func.generate_series(1, count))
+    ).scalars()
+    return sorted(numbers)
+
+
+def _allocate_from_row(connection, count: int) -> List[int]:
+    updated = connection.execute(
+        update(SyncState).where(SyncState.id == 1).values(change_seq=SyncState.change_seq + count)
+    ).rowcount
+    if not updated:
+        connection.execute(insert(SyncState).values(id=1, change_seq=count, purged_seq=0))
+        return list(range(1, count + 1))
+    last = connection.execute(select(SyncState.change_seq).where(SyncState.id == 1)).scalar_one()
+    return list(range(last - count + 1, last + 1))
+
+
+def change_horizon(db: Session) -> int:
+    """
+    The highest sequence number whose change, and every change before it,
+    has committed or rolled back. Read it before reading changes.
+    """
+    # Ask as a plain read would, so a routing session stays off the writer
+    if db.get_bind(clause=select(SyncState.id)).dialect.name != "postgresql":
+        state = db.get(SyncState, 1)
+        return state.change_seq if state else 0
+    # In this order: a transaction holding a number up to `last` had
+    # announced its lower bound before `last` was read
+    last = db.execute(text(LAST_ALLOCATED)).scalar()
+    oldest = db.execute(text(OLDEST_IN_FLIGHT)).scalar()
+    return last if oldest is None else min(last, oldest - 1)
+
+
+def parse_cursor(cursor: str) -> Tuple[int, int]:
+    """Cursors are "<change_seq>-<task id>"; raises ValueError when malformed."""
+    seq, _, task_id = cursor.partition("-")
+    return int(seq), int(task_id or 0)
+
+
+def format_cursor(seq: int, task_id: int = 0) -> str:
+    return f"{seq}-{task_id}"
+
+
+def _removal_tombstones(session: Session, task: Task):
+    """Tombstones for a modified task that some users or a team can no longer see."""
+    state = inspect(task)
+    for user in state.attrs.shared_with.history.deleted:
+        yield TaskTombstone(task_id=task.id, user_id=user.id)
+    for team_id in state.attrs.team_id.history.deleted:
+        if team_id is not None and team_id != task.team_id:
+            yield TaskTombstone(task_id=task.id, team_id=team_id)
+
+
+def _deletion_tombstones(task: Task):
+    for user_id in {task.owner_id, *(user.id for user in task.shared_with)}:
+        yield TaskTombstone(task_id=task.id, user_id=user_id)
+    if task.team_id is not None:
+        yield TaskTombstone(task_id=task.id, team_id=task.team_id)
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_change_sequence(session, flush_context, instances):
+    with session.no_autoflush:
+        tasks = [obj for obj in session.new if isinstance(obj, Task)]
+        tombstones = []
+        for obj in session.dirty:
+            if isinstance(obj, Task) and session.is_modified(obj):
+                tasks.append(obj)
+                tombstones.extend(_removal_tombstones(session, obj))
+        for obj in session.deleted:
+            if isinstance(obj, Task):
+                tombstones.extend(_deletion_tombstones(obj))
+            elif isinstance(obj, TeamMember):
+                tombstones.append(TaskTombstone(user_id=obj.user_id, team_id=obj.team_id))
+        members = [obj for obj in session.new if isinstance(obj, TeamMember)]
+
+        count = len(tasks) + len(tombstones) + len(members)
+        if not count:
+            return
+        # One sequence number each keeps cursors unambiguous
+        numbers = allocate_sequence(session.connection(), count)
+        for seq, obj in zip(numbers, chain(tasks, tombstones, members)):
+            obj.change_seq = seq
+        session.add_all(tombstones)
+
+
+def purge_tombstones(db: Session, retention_days: Optional[int] = None) -> int:
+    """
+    Delete tombstones past the retention period. Cursors older than the
+    newest purged tombstone can no longer be served and must resync.
+    """
+    days = settings.TOMBSTONE_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    horizon = db.query(func.max(TaskTombstone.change_seq)).filter(TaskTombstone.created_at < cutoff).scalar()
+    if horizon is None:
+        return 0
+    db.execute(
+        update(SyncState)
+        .where(SyncState.id == 1, SyncState.purged_seq < horizon)
+        .values(purged_seq=horizon)
+    )
+    removed = db.query(TaskTombstone).filter(TaskTombstone.change_seq <= horizon).delete(synchronize_session=False)
+    db.commit()
+    if removed:
+        logger.info("Purged %d task tombstones", removed)
+    return removed
+
+
+def _run_purge() -> None:
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        purge_tombstones(db)
+    finally:
+        db.close()
+
+
+async def run_tombstone_purge_loop() -> None:
+    """Periodically purge expired tombstones."""
+    while True:
+        await asyncio.sleep(settings.TOMBSTONE_PURGE_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_run_purge)
+        except Exception:
+            logger.exception("Tombstone purge failed")
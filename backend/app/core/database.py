@@ -1,33 +1,201 @@
-from sqlalchemy import create_engine
+"""
+Database engine and sessions.
+
+The engine is created on first use rather than at import, so importing the
+application (workers booting, tests, --reload) does not touch the database.
+`engine` and `SessionLocal` remain importable names and resolve lazily.
+
+SQLite file databases get a tuned profile (WAL and the SQLITE_* pragmas).
+With SQLITE_SERIALIZE_WRITES, `engine` is a single writer connection that
+writers queue for, and sessions send plain reads to a separate read-only
+pool through RoutingSession. RoutingSession also sends the reads of
+`get_read_db` sessions to read replicas (see app.core.replicas).
+"""
+from functools import lru_cache
+from typing import Optional
+
+from fastapi import Depends
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
+from app.core.pool import InstrumentedQueuePool
+
+# Create Base class for models
+Base = declarative_base()
 
-# Determine if we're using SQLite
-is_sqlite = settings.DATABASE_URL.startswith('sqlite')
 
-# Create SQLAlchemy engine
-if is_sqlite:
-    engine = create_engine(
-        settings.DATABASE_URL,
-        connect_args={"check_same_thread": False},  # Needed for SQLite
-        pool_pre_ping=True,
-        echo=settings.DEBUG,
+def is_sqlite_file(url: str) -> bool:
+    """SQLite database stored in a file (not in memory)."""
+    parsed = make_url(url)
+    return (
+        parsed.get_backend_name() == "sqlite"
+        and parsed.database not in (None, "", ":memory:")
+        and parsed.query.get("mode") != "memory"
     )
-else:
-    engine = create_engine(
-        settings.DATABASE_URL,
-        pool_pre_ping=True,
-        pool_size=10,
-        max_overflow=20,
-        echo=settings.DEBUG,
+
+
+def sqlite_pragmas(read_only: bool = False) -> dict:
+    pragmas = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+    }
+    if read_only:
+        # A write routed here by mistake fails instead of bypassing the writer
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+def create_db_engine(url: str, name: str = "primary", read_only: bool = False, **overrides) -> Engine:
+    """
+    Engine with an instrumented connection pool sized from settings; keyword
+    arguments override create_engine options (pool_size, max_overflow,
+    pool_timeout, pool_recycle, pool_pre_ping, echo). SQLite files get the
+    SQLITE_* pragmas on every new connection.
+    """
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "echo": settings.DB_ECHO,
+        **overrides,
+    }
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}  # Needed for SQLite
+    engine = create_engine(url, poolclass=InstrumentedQueuePool, pool_logging_name=name, **options)
+    if is_sqlite_file(url):
+        pragmas = sqlite_pragmas(read_only)
+
+        @event.listens_for(engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+            cursor.close()
+
+    return engine
+
+
+def serialize_sqlite_writes() -> bool:
+    return settings.SQLITE_SERIALIZE_WRITES and is_sqlite_file(settings.DATABASE_URL)
+
+
+@lru_cache()
+def get_engine() -> Engine:
+    """Create the SQLAlchemy engine (the one that writes) on first use."""
+    if serialize_sqlite_writes():
+        # SQLite allows one writer at a time: writers queue for this single
+        # connection instead of retrying on "database is locked"
+        return create_db_engine(
+            settings.DATABASE_URL,
+            name="writer",
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        )
+    return create_db_engine(settings.DATABASE_URL)
+
+
+@lru_cache()
+def get_read_engine() -> Engine:
+    """Engine for plain reads; the writer engine unless reads are split off."""
+    if serialize_sqlite_writes():
+        return create_db_engine(settings.DATABASE_URL, name="reader", read_only=True)
+    return get_engine()
+
+
+class RoutingSession(Session):
+    """
+    Session that runs plain SELECTs on the reader engine and everything else
+    (flushes, DML, SELECT ... FOR UPDATE, raw SQL) on the writer. Once a
+    transaction has used the writer it stays there, so it reads its own
+    uncommitted changes.
+
+    Sessions marked with info["use_replica"] (see get_read_db) read from a
+    replica instead, unless their user (info["user_id"]) wrote recently.
+    """
+
+    def __init__(self, *args, writer: Engine, reader: Engine, replicas=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writer = writer
+        self.reader = reader
+        self.replicas = replicas
+        self.writing = False
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        if (
+            not self.writing
+            and not self._flushing
+            and getattr(clause, "is_select", False)
+            and getattr(clause, "_for_update_arg", None) is None
+        ):
+            return self.replica() or self.reader
+        self.writing = True
+        return self.writer
+
+    def replica(self) -> Optional[Engine]:
+        if self.replicas is None or not self.info.get("use_replica"):
+            return None
+        if self.replicas.wrote_recently(self.info.get("user_id")):
+            return None
+        # One replica per session, so a request reads a single snapshot source
+        if "replica" not in self.info:
+            self.info["replica"] = self.replicas.choose()
+        return self.info["replica"]
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.writing = False
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _note_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _record_write(session):
+    user_id = session.info.get("user_id")
+    if session.info.pop("wrote", False) and session.replicas is not None and user_id is not None:
+        # Read-your-writes: this user's reads stay on the primary for a while
+        session.replicas.record_write(user_id)
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _discard_write(session, previous_transaction):
+    session.info.pop("wrote", None)
+
+
+@lru_cache()
+def get_session_factory() -> sessionmaker:
+    """Session factory bound to the application engine(s)."""
+    from app.core.replicas import get_replica_set
+
+    engine, read_engine, replicas = get_engine(), get_read_engine(), get_replica_set()
+    if read_engine is engine and replicas is None:
+        return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return sessionmaker(
+        class_=RoutingSession, autocommit=False, autoflush=False,
+        writer=engine, reader=read_engine, replicas=replicas,
     )
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create Base class for models
-Base = declarative_base()
+def __getattr__(name):
+    # `from app.core.database import engine, SessionLocal` keeps working
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Dependency to get database session
@@ -36,8 +204,18 @@ def get_db():
     Database session dependency.
     Yields a database session and ensures it's closed after use.
     """
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db(db: Session = Depends(get_db)) -> Session:
+    """
+    Session dependency for read-only endpoints: its plain SELECTs may be
+    served by a read replica. It is the request's get_db session, so writes
+    still reach the primary and overrides of get_db apply here too.
+    """
+    db.info["use_replica"] = True
+    return db
@@ -0,0 +1,144 @@
+"""
+Attachment download responses.
+
+Blobs are immutable and named by their SHA-256 digest, so the digest is a
+strong ETag and responses can be cached indefinitely. Bodies are sent with
+the server's zero-copy extension when available, handed off to nginx with
+X-Accel-Redirect, or redirected to the object store, so workers only spend
+CPU on authorization.
+"""
+import os
+import stat
+from email.utils import formatdate
+from typing import Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised for a Range header that selects no bytes of the file."""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range into inclusive (start, end) offsets.
+
+    Returns None when the whole file should be sent: no header, a unit other
+    than bytes, or several ranges (which RFC 9110 lets servers ignore).
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                raise RangeNotSatisfiable()
+            start, end = max(size - length, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start < 0 or start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def etag_for(digest: str) -> str:
+    return f'"{digest}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def blob_headers(digest: str, filename: str, content_type: str, modified: float,
+                 disposition: str = "attachment") -> dict:
+    return {
+        "etag": etag_for(digest),
+        "cache-control": CACHE_CONTROL,
+        "last-modified": formatdate(modified, usegmt=True),
+        "content-disposition": content_disposition(filename, disposition),
+        "content-type": content_type,
+        "accept-ranges": "bytes",
+    }
+
+
+class BlobFileResponse(Response):
+    """
+    Serves a file, or a single byte range of it, from the local filesystem.
+
+    Uses the ASGI zero-copy send extension (sendfile) when the server offers
+    it; otherwise the file is read in chunks in a worker thread.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: str, headers: Mapping[str, str], byte_range: Optional[Tuple[int, int]] = None,
+                 stat_result: Optional[os.stat_result] = None):
+        self.path = path
+        self.stat_result = stat_result or os.stat(path)
+        if not stat.S_ISREG(self.stat_result.st_mode):
+            raise RuntimeError(f"File at path {path} is not a file.")
+        size = self.stat_result.st_size
+        self.start, self.end = byte_range if byte_range else (0, size - 1)
+        self.status_code = 206 if byte_range else 200
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(self.end - self.start + 1)
+        if byte_range:
+            self.headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        if scope["method"].upper() == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": file.wrapped.fileno(),
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+                return
+            await file.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
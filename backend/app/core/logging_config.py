@@ -1,37 +1,168 @@
+"""
+Application logging.
+
+Log calls only enqueue the record: a QueueHandler puts it on a bounded queue
+and a QueueListener thread formats and writes it, so a slow stdout pipe or
+log collector never stalls the event loop. When the queue is full, records
+below WARNING are dropped (and counted); a WARNING or worse replaces the
+oldest queued record instead.
+
+Request context (request id, user id, route) lives in a contextvar set by
+the request middleware and is attached to every record by a filter, so it
+appears as separate fields in JSON logs instead of inside messages.
+"""
+import atexit
 import logging
+import queue
 import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from prometheus_client import Counter
 from pythonjsonlogger import jsonlogger
 from app.core.config import settings
 
+LOG_RECORDS_DROPPED = Counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+
+class RequestContext:
+    """Logging context of the current request; fields may be filled in later."""
+
+    __slots__ = ("request_id", "user_id", "scope")
+
+    def __init__(self, request_id: str, scope: Optional[dict] = None):
+        self.request_id = request_id
+        self.user_id: Optional[int] = None
+        self.scope = scope
+
+    @property
+    def route(self) -> Optional[str]:
+        # The route template is only known once the router has matched
+        route = self.scope.get("route") if self.scope is not None else None
+        return getattr(route, "path", None)
+
+
+_request_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+
+def start_request_context(request_id: str, scope: Optional[dict] = None) -> RequestContext:
+    context = RequestContext(request_id, scope)
+    _request_context.set(context)
+    return context
+
+
+def set_log_user(user_id: int) -> None:
+    """Attach the authenticated user to the current request's log records."""
+    context = _request_context.get()
+    if context is not None:
+        context.user_id = user_id
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds request_id, user_id and route to every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _request_context.get()
+        if context is None:
+            record.request_id = "-"
+            record.user_id = record.route = None
+        else:
+            record.request_id = context.request_id
+            record.user_id = context.user_id
+            record.route = context.route
+        return True
+
+
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that never blocks and leaves formatting to the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The default prepare() formats the message on the calling thread;
+        # the queue never leaves the process, so formatting can wait. Only
+        # arguments that could change or touch the database later (ORM
+        # objects and the like) are turned into strings here.
+        if isinstance(record.args, tuple):
+            record.args = tuple(arg if isinstance(arg, _PLAIN_TYPES) else str(arg) for arg in record.args)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno >= logging.WARNING:
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+            else:
+                LOG_RECORDS_DROPPED.inc()
+                return
+        LOG_RECORDS_DROPPED.inc()
+
+
+class BlockingStopQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room rather than failing to stop when the queue is full
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def setup_logging():
-    """Configure application logging with JSON formatter."""
-    
+    """Configure application logging through a background queue."""
+    global _listener
+    stop_logging()
+
     # Create logger
     logger = logging.getLogger()
     logger.setLevel(getattr(logging, settings.LOG_LEVEL.upper()))
-    
+
     # Remove existing handlers
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
-    
-    # Create console handler
+
+    # Create console handler, run by the listener thread
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(getattr(logging, settings.LOG_LEVEL.upper()))
-    
+
     # Create JSON formatter
     if settings.ENVIRONMENT == "production":
         formatter = jsonlogger.JsonFormatter(
-            '%(asctime)s %(name)s %(levelname)s %(message)s',
+            '%(asctime)s %(name)s %(levelname)s %(message)s %(request_id)s %(user_id)s %(route)s',
             timestamp=True
         )
     else:
         # Use standard formatter for development
         formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
         )
-    
+
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
+
+    queue_handler = BoundedQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RequestContextFilter())
+    logger.addHandler(queue_handler)
+
+    _listener = BlockingStopQueueListener(queue_handler.queue, console_handler, respect_handler_level=True)
+    _listener.start()
+
     return logger
+
+
+atexit.register(stop_logging)
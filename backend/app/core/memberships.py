@@ -0,0 +1,100 @@
+"""
+Team membership cache.
+
+Team permission checks need the caller's role in a team. Each user's
+memberships are loaded as one team_id -> role map, kept in a process-wide
+LRU cache and invalidated whenever a session flushes or commits a change to
+that user's TeamMember rows. Entries also expire after a TTL, which bounds
+staleness from changes made by other worker processes.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import TeamMember, TeamRole
+
+
+class MembershipCache:
+    """Thread-safe LRU of user_id -> {team_id: role} with a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Dict[int, TeamRole]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, roles = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return roles
+
+    def set(self, user_id: int, roles: Dict[int, TeamRole]) -> None:
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, roles)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+membership_cache = MembershipCache(
+    maxsize=settings.TEAM_MEMBERSHIP_CACHE_SIZE,
+    ttl=settings.TEAM_MEMBERSHIP_CACHE_TTL_SECONDS,
+)
+
+
+def load_memberships(db: Session, user_id: int) -> Dict[int, TeamRole]:
+    """Roles of a user in all of their teams, keyed by team id."""
+    roles = membership_cache.get(user_id)
+    if roles is None:
+        roles = dict(db.execute(
+            select(TeamMember.team_id, TeamMember.role).where(TeamMember.user_id == user_id)
+        ).all())
+        membership_cache.set(user_id, roles)
+    return roles
+
+
+# Invalidation. Changed users are dropped when the flush happens and again
+# at commit, so a concurrent request cannot re-cache the pre-commit state.
+@event.listens_for(Session, "after_flush")
+def _collect_membership_changes(session, flush_context):
+    changed = session.info.setdefault("team_membership_changes", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, TeamMember) and obj.user_id is not None:
+            changed.add(obj.user_id)
+    for user_id in changed:
+        membership_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_memberships(session):
+    for user_id in session.info.pop("team_membership_changes", ()):
+        membership_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_membership_changes(session, previous_transaction):
+    # Rolled-back changes were already invalidated at flush; nothing to redo
+    session.info.pop("team_membership_changes", None)
@@ -0,0 +1,484 @@
+"""
+Email notification delivery.
+
+Notifications are queued in memory, coalesced per recipient into digests over
+a short window and sent over a small pool of persistent SMTP connections.
+"""
+import asyncio
+import logging
+import queue
+import re
+import smtplib
+import ssl
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from typing import Dict, List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Metrics
+NOTIFICATIONS_QUEUED = Counter(
+    "notifications_queued_total", "Notifications accepted for delivery", ["kind"]
+)
+NOTIFICATIONS_DROPPED = Counter(
+    "notifications_dropped_total", "Notifications dropped before delivery", ["reason"]
+)
+EMAILS_SENT = Counter("notification_emails_sent_total", "Emails accepted by the SMTP server")
+EMAILS_FAILED = Counter("notification_emails_failed_total", "Emails that could not be delivered", ["reason"])
+DIGEST_SIZE = Histogram(
+    "notification_digest_size", "Notifications coalesced into one email", buckets=(1, 2, 5, 10, 25, 50, 100)
+)
+SMTP_SEND_SECONDS = Histogram("notification_smtp_send_seconds", "Time spent sending one batch over SMTP")
+SMTP_CONNECTIONS_OPENED = Counter("notification_smtp_connections_opened_total", "SMTP connections opened")
+QUEUE_DEPTH = Gauge("notification_queue_depth", "Notifications waiting for the next digest window")
+
+_LEADING_DOT = re.compile(rb"(?m)^\.")
+_BARE_LINE_ENDING = re.compile(rb"\r\n|\r|\n")
+
+
+@dataclass
+class Notification:
+    """A single notification addressed to one recipient."""
+    recipient: str
+    subject: str
+    body: str
+    kind: str = "generic"
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class SMTPConnectionPool:
+    """
+    Small pool of persistent SMTP connections.
+
+    Connections are opened lazily, reused across batches and probed with
+    NOOP only after they have been idle for a while. When the server
+    advertises PIPELINING, the envelope commands of each message are written
+    in one round-trip.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        size: int = 2,
+        timeout: float = 10,
+        max_idle: float = 30,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        conn.ehlo()
+        if self.use_tls and conn.has_extn("starttls"):
+            conn.starttls(context=ssl.create_default_context())
+            conn.ehlo()
+        if self.username and self.password:
+            conn.login(self.username, self.password)
+        SMTP_CONNECTIONS_OPENED.inc()
+        return conn
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < self.max_idle:
+                return conn
+            try:
+                if conn.noop()[0] == 250:
+                    return conn
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(conn)
+
+    @staticmethod
+    def _discard(conn: Optional[smtplib.SMTP]) -> None:
+        if conn is None:
+            return
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; broken connections are discarded, not returned."""
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self._discard(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put((conn, time.monotonic()))
+            self._slots.release()
+
+    def send(self, messages: List[EmailMessage]) -> int:
+        """
+        Send a batch of messages over one connection.
+        Returns the number of messages the server accepted.
+        """
+        sent = 0
+        remaining = list(messages)
+        for attempt in range(2):
+            try:
+                with self.connection() as conn:
+                    while remaining:
+                        message = remaining[0]
+                        try:
+                            self._send_one(conn, message)
+                            sent += 1
+                            EMAILS_SENT.inc()
+                        except smtplib.SMTPResponseException as exc:
+                            EMAILS_FAILED.labels(reason=f"smtp_{exc.smtp_code // 100}xx").inc()
+                            logger.warning("SMTP rejected message to %s: %s", message['To'], exc.smtp_code)
+                            self._reset(conn)
+                        except smtplib.SMTPRecipientsRefused:
+                            EMAILS_FAILED.labels(reason="recipient_refused").inc()
+                            logger.warning("SMTP refused recipient %s", message['To'])
+                            self._reset(conn)
+                        remaining.pop(0)
+                return sent
+            except (smtplib.SMTPServerDisconnected, OSError) as exc:
+                # Stale pooled connection: retry the rest once on a fresh one
+                if attempt == 1:
+                    EMAILS_FAILED.labels(reason="connection").inc(len(remaining))
+                    logger.error("SMTP delivery failed for %d messages: %s", len(remaining), exc)
+        return sent
+
+    @staticmethod
+    def _reset(conn: smtplib.SMTP) -> None:
+        try:
+            conn.rset()
+        except smtplib.SMTPException:
+            pass
+
+    def _send_one(self, conn: smtplib.SMTP, message: EmailMessage) -> None:
+        if not conn.has_extn("pipelining"):
+            conn.send_message(message)
+            return
+
+        sender = message["From"]
+        recipients = [message["To"]]
+        payload = message.as_bytes(policy=message.policy.clone(linesep="\r\n"))
+
+        # RFC 2920: MAIL, RCPT and DATA go out together, replies are read in order
+        commands = [f"MAIL FROM:<{_address(sender)}>"]
+        commands.extend(f"RCPT TO:<{_address(rcpt)}>" for rcpt in recipients)
+        commands.append("DATA")
+        conn.send("".join(f"{command}\r\n" for command in commands))
+
+        code, resp = conn.getreply()
+        if code != 250:
+            self._drain_replies(conn, len(commands) - 1)
+            raise smtplib.SMTPSenderRefused(code, resp, sender)
+        accepted = 0
+        for _ in recipients:
+            code, resp = conn.getreply()
+            if code in (250, 251):
+                accepted += 1
+        code, resp = conn.getreply()
+        if code != 354:
+            if accepted == 0:
+                raise smtplib.SMTPRecipientsRefused({rcpt: (code, resp) for rcpt in recipients})
+            raise smtplib.SMTPDataError(code, resp)
+
+        data = _LEADING_DOT.sub(b"..", _BARE_LINE_ENDING.sub(b"\r\n", payload))
+        if not data.endswith(b"\r\n"):
+            data += b"\r\n"
+        conn.send(data + b".\r\n")
+        code, resp = conn.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, resp)
+
+    @staticmethod
+    def _drain_replies(conn: smtplib.SMTP, count: int) -> None:
+        for _ in range(count):
+            conn.getreply()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                conn.quit()
+            except (smtplib.SMTPException, OSError):
+                self._discard(conn)
+
+
+def _address(header_value: str) -> str:
+    """Extract the bare address from a header such as 'Name <a@b.c>'."""
+    if "<" in header_value and header_value.endswith(">"):
+        return header_value[header_value.rindex("<") + 1:-1]
+    return header_value
+
+
+class NotificationDispatcher:
+    """
+    Queues notifications and delivers them in digest batches.
+
+    Everything enqueued for the same recipient within one digest window is
+    coalesced into a single email; the batches are then spread over the
+    connections of the SMTP pool.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[SMTPConnectionPool],
+        from_address: str,
+        from_name: Optional[str] = None,
+        digest_window: float = 30.0,
+        max_queue: int = 10000,
+        batch_size: int = 50,
+    ):
+        self.pool = pool
+        self.from_address = from_address
+        self.from_name = from_name
+        self.digest_window = digest_window
+        self.batch_size = batch_size
+        self._queue: "asyncio.Queue[Notification]" = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._collecting: Dict[str, List[Notification]] = {}  # Taken off the queue, waiting for the window
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_settings(cls) -> "NotificationDispatcher":
+        pool = None
+        if settings.SMTP_HOST:
+            pool = SMTPConnectionPool(
+                host=settings.SMTP_HOST,
+                port=settings.SMTP_PORT or 587,
+                username=settings.SMTP_USER,
+                password=settings.SMTP_PASSWORD,
+                use_tls=settings.SMTP_USE_TLS,
+                size=settings.SMTP_POOL_SIZE,
+                timeout=settings.SMTP_TIMEOUT,
+            )
+        return cls(
+            pool=pool,
+            from_address=settings.EMAILS_FROM_EMAIL or "noreply@localhost",
+            from_name=settings.EMAILS_FROM_NAME or settings.APP_NAME,
+            digest_window=settings.NOTIFICATION_DIGEST_WINDOW_SECONDS,
+            max_queue=settings.NOTIFICATION_QUEUE_SIZE,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.pool is not None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def notify(self, recipient: str, subject: str, body: str, kind: str = "generic") -> bool:
+        """
+        Queue a notification without blocking the caller.
+        Returns False if delivery is disabled or the queue is full.
+        """
+        if not self.enabled or not self.running:
+            return False
+        try:
+            self._queue.put_nowait(Notification(recipient=recipient, subject=subject, body=body, kind=kind))
+        except asyncio.QueueFull:
+            NOTIFICATIONS_DROPPED.labels(reason="queue_full").inc()
+            logger.warning("Notification queue full, dropping %s notification", kind)
+            return False
+        NOTIFICATIONS_QUEUED.labels(kind=kind).inc()
+        QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    async def start(self) -> None:
+        if not self.enabled or self.running:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="smtp")
+        self._task = asyncio.create_task(self._run())
+        logger.info("Notification delivery started (%s:%s)", self.pool.host, self.pool.port)
+
+    async def stop(self) -> None:
+        """Stop the dispatcher, delivering whatever is still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        pending = self._drain(self._collecting)
+        self._collecting = {}
+        if pending:
+            await self._deliver(pending)
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.pool.close)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def _drain(self, collected: Dict[str, List[Notification]]) -> Dict[str, List[Notification]]:
+        pending: Dict[str, List[Notification]] = defaultdict(list, collected)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return pending
+            pending[item.recipient].append(item)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            pending = self._collecting = defaultdict(list)
+            pending[first.recipient].append(first)
+
+            # Coalesce everything that arrives within the digest window
+            deadline = loop.time() + self.digest_window
+            while True:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending[item.recipient].append(item)
+            QUEUE_DEPTH.set(self._queue.qsize())
+
+            self._collecting = {}
+            try:
+                await self._deliver(pending)
+            except Exception:
+                logger.exception("Notification delivery batch failed")
+
+    async def _deliver(self, pending: Dict[str, List[Notification]]) -> None:
+        messages = [self.build_message(recipient, items) for recipient, items in pending.items()]
+        batches = [messages[i:i + self.batch_size] for i in range(0, len(messages), self.batch_size)]
+        loop = asyncio.get_running_loop()
+        with SMTP_SEND_SECONDS.time():
+            await asyncio.gather(*(loop.run_in_executor(self._executor, self.pool.send, batch) for batch in batches))
+
+    def build_message(self, recipient: str, items: List[Notification]) -> EmailMessage:
+        """Build one email for a recipient, as a digest if there are several items."""
+        DIGEST_SIZE.observe(len(items))
+        message = EmailMessage()
+        message["From"] = formataddr((self.from_name, self.from_address)) if self.from_name else self.from_address
+        message["To"] = recipient
+        message["Message-ID"] = make_msgid()
+        if len(items) == 1:
+            message["Subject"] = items[0].subject
+            message.set_content(items[0].body)
+        else:
+            message["Subject"] = f"{len(items)} new notifications from {settings.APP_NAME}"
+            sections = [f"{item.subject}\n{'-' * len(item.subject)}\n{item.body}" for item in items]
+            message.set_content("\n\n".join(sections))
+        return message
+
+
+async def send_due_reminders(dispatcher: Optional["NotificationDispatcher"] = None, session_factory=None) -> int:
+    """
+    Queue reminder notifications for tasks whose reminder date has passed.
+    Only the reminders actually queued are marked sent; the others are
+    picked up again by the next sweep. Returns the number queued.
+    """
+    dispatcher = dispatcher or notifier
+    due = await asyncio.to_thread(_due_reminders, session_factory)
+    # notify() puts on an asyncio.Queue, which must happen on the loop thread
+    queued = []
+    for task_id, email, title in due:
+        if not dispatcher.notify(
+            email,
+            f"Reminder: {title}",
+            f"This is a reminder for your task \"{title}\".",
+            kind="reminder",
+        ):
+            break
+        queued.append(task_id)
+    if queued:
+        await asyncio.to_thread(_mark_reminders_sent, queued, session_factory)
+    return len(queued)
+
+
+def _session(session_factory):
+    if session_factory is None:
+        from app.core.database import SessionLocal
+        session_factory = SessionLocal
+    return session_factory()
+
+
+def _due_reminders(session_factory=None) -> List[tuple]:
+    """(task id, owner email, title) of up to 500 tasks with a reminder due."""
+    from app.models import Task, TaskStatus, User
+
+    db = _session(session_factory)
+    try:
+        rows = (
+            db.query(Task.id, User.email, Task.title)
+            .join(User, User.id == Task.owner_id)
+            .filter(
+                Task.reminder_date <= datetime.utcnow(),
+                Task.reminder_sent_at.is_(None),
+                Task.status.notin_([TaskStatus.COMPLETED, TaskStatus.CANCELLED]),
+            )
+            .order_by(Task.reminder_date)
+            .limit(500)
+            .all()
+        )
+        return [tuple(row) for row in rows]
+    finally:
+        db.close()
+
+
+def _mark_reminders_sent(task_ids: List[int], session_factory=None) -> None:
+    from app.models import Task
+
+    db = _session(session_factory)
+    try:
+        now = datetime.utcnow()
+        # Through the ORM, so the change feed records the update
+        for task in db.query(Task).filter(Task.id.in_(task_ids), Task.reminder_sent_at.is_(None)):
+            task.reminder_sent_at = now
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_reminder_loop() -> None:
+    """Periodically queue due task reminders while delivery is running."""
+    while True:
+        await asyncio.sleep(settings.NOTIFICATION_REMINDER_INTERVAL_SECONDS)
+        try:
+            await send_due_reminders()
+        except Exception:
+            logger.exception("Reminder sweep failed")
+
+
+# Process-wide dispatcher
+notifier = NotificationDispatcher.from_settings()
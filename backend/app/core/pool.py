@@ -0,0 +1,92 @@
+"""
+Instrumented database connection pool.
+
+InstrumentedQueuePool is a QueuePool that times every checkout and counts
+checkouts that gave up after DB_POOL_TIMEOUT. Its size, checked-out and
+overflow connections are reported by a collector on the default Prometheus
+registry, labelled with the pool's name (the engine's pool_logging_name),
+so they show up on /metrics next to the request metrics.
+
+A growing checkout wait with checked_out pinned at size + max_overflow
+means requests are queueing for connections: the pool, not the database,
+is the bottleneck.
+"""
+import threading
+import time
+import weakref
+from typing import Dict
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that timed out waiting for a pooled database connection",
+    ["pool"],
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout wait times and timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics_name = self._orig_logging_name or "default"
+        self._wait = POOL_CHECKOUT_WAIT.labels(self.metrics_name)
+        self._timeouts = POOL_TIMEOUTS.labels(self.metrics_name)
+        pool_collector.register(self)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self._timeouts.inc()
+            raise
+        finally:
+            self._wait.observe(time.perf_counter() - start)
+
+
+class PoolCollector:
+    """Reports the state of every live instrumented pool at scrape time."""
+
+    def __init__(self):
+        self._pools: Dict[str, "weakref.ref[InstrumentedQueuePool]"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, pool: InstrumentedQueuePool) -> None:
+        # A disposed engine recreates its pool under the same name
+        with self._lock:
+            self._pools[pool.metrics_name] = weakref.ref(pool)
+
+    def collect(self):
+        size = GaugeMetricFamily("db_pool_size", "Configured connections kept in the pool", labels=["pool"])
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections currently in use", labels=["pool"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Connections open beyond the pool size", labels=["pool"])
+        with self._lock:
+            pools = [(name, ref()) for name, ref in self._pools.items()]
+        for name, pool in pools:
+            if pool is None:
+                continue
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], pool.checkedout())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+        yield size
+        yield checked_out
+        yield overflow
+
+    def describe(self):
+        # Registration must not call collect(): pools are created later
+        return []
+
+
+pool_collector = PoolCollector()
+REGISTRY.register(pool_collector)
@@ -0,0 +1,173 @@
+"""
+Attachment previews.
+
+Thumbnails are rendered in a process pool so image decoding neither blocks
+the event loop nor competes for the GIL with request handling. Previews are
+cached in the blob store next to the blob they were made from, so duplicate
+uploads share one preview and the preview is reclaimed with the blob. A
+missing preview (lost file, changed PREVIEW_MAX_DIMENSION) is regenerated
+lazily on the first request for it.
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Set
+
+from sqlalchemy import update
+
+from app.core import thumbnails
+from app.core.config import settings
+from app.core.storage import StorageBackend, get_storage
+from app.models import Blob
+
+logger = logging.getLogger(__name__)
+
+READY = "ready"
+FAILED = "failed"
+UNSUPPORTED = "unsupported"
+
+
+class PreviewPipeline:
+    """
+    Generates previews in the background.
+
+    Concurrent requests for the same blob share one rendering, and the
+    worker processes are only started once the first preview is needed.
+    """
+
+    def __init__(self, workers: int, max_dimension: int, enabled: bool = True):
+        self.workers = workers
+        self.max_dimension = max_dimension
+        self._enabled = enabled
+        self.session_factory = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_settings(cls) -> "PreviewPipeline":
+        return cls(
+            workers=settings.PREVIEW_WORKERS,
+            max_dimension=settings.PREVIEW_MAX_DIMENSION,
+            enabled=settings.PREVIEWS_ENABLED,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled and thumbnails.available()
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        self._enabled = value
+
+    @property
+    def preview_name(self) -> str:
+        return f"preview-{self.max_dimension}.webp"
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: workers must not inherit the parent's sockets and threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _new_session(self):
+        if self.session_factory is None:
+            from app.core.database import SessionLocal
+            return SessionLocal()
+        return self.session_factory()
+
+    def _set_status(self, digest: str, preview_status: str) -> None:
+        db = self._new_session()
+        try:
+            db.execute(
+                update(Blob)
+                .where(Blob.sha256 == digest)
+                .values(preview_status=preview_status)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def _render(self, digest: str, content_type: str, storage: StorageBackend) -> bytes:
+        path = storage.local_path(digest)
+        if path is not None:
+            # Workers read the file themselves; only the preview crosses the pipe
+            source = str(path)
+        else:
+            source = await asyncio.to_thread(lambda: storage.open(digest).read())
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(
+            self._get_executor(), thumbnails.render_thumbnail, source, content_type, self.max_dimension
+        )
+        await asyncio.to_thread(storage.write_derived, digest, self.preview_name, data)
+        return data
+
+    async def generate(self, digest: str, content_type: str,
+                       storage: Optional[StorageBackend] = None) -> Optional[bytes]:
+        """Render and store the preview of a blob, recording the outcome on the blob row."""
+        if not thumbnails.supports(content_type):
+            await asyncio.to_thread(self._set_status, digest, UNSUPPORTED)
+            return None
+
+        pending = self._inflight.get(digest)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        data = None
+        preview_status = FAILED
+        try:
+            data = await self._render(digest, content_type, storage or get_storage())
+            preview_status = READY
+        except Exception:
+            logger.exception("Preview generation failed for blob %s", digest)
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[digest]
+            if not future.done():
+                future.set_result(data)
+
+        await asyncio.to_thread(self._set_status, digest, preview_status)
+        return data
+
+    def schedule(self, digest: str, content_type: str) -> None:
+        """Generate a preview in the background, e.g. right after an upload."""
+        if not self.enabled:
+            return
+        task = asyncio.create_task(self.generate(digest, content_type))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def get(self, blob: Blob, storage: Optional[StorageBackend] = None) -> Optional[bytes]:
+        """Cached preview of a blob, regenerated when missing."""
+        if not self.enabled or blob.preview_status in (FAILED, UNSUPPORTED):
+            return None
+        storage = storage or get_storage()
+        data = await asyncio.to_thread(storage.read_derived, blob.sha256, self.preview_name)
+        if data is None:
+            data = await self.generate(blob.sha256, blob.content_type, storage)
+        return data
+
+    async def wait(self) -> None:
+        """Wait for scheduled previews to finish."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+previews = PreviewPipeline.from_settings()
@@ -0,0 +1,44 @@
+"""
+Client addresses behind reverse proxies.
+
+In the compose setup every /api/ request reaches the backend from the nginx
+frontend, so the socket peer is nginx's address for all clients. nginx
+appends the address it saw to X-Forwarded-For; `client_address` walks that
+header from the right, skipping hops in TRUSTED_PROXIES, and returns the
+first address no trusted proxy vouches for. A peer outside TRUSTED_PROXIES
+is the client itself and its X-Forwarded-For is ignored, since anyone can
+send one.
+"""
+import ipaddress
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from starlette.requests import HTTPConnection
+
+from app.core.config import settings
+
+
+@lru_cache(maxsize=4)
+def _networks(trusted: str) -> Tuple[ipaddress._BaseNetwork, ...]:
+    return tuple(ipaddress.ip_network(cidr.strip(), strict=False) for cidr in trusted.split(",") if cidr.strip())
+
+
+def is_trusted_proxy(address: Optional[str]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _networks(settings.TRUSTED_PROXIES))
+
+
+def client_address(connection: HTTPConnection) -> Optional[str]:
+    """The address of the client that made a request, or None if unknown."""
+    address = connection.client.host if connection.client else None
+    if not is_trusted_proxy(address):
+        return address
+    forwarded = [hop.strip() for hop in ",".join(connection.headers.getlist("x-forwarded-for")).split(",")]
+    for hop in reversed([hop for hop in forwarded if hop]):
+        address = hop
+        if not is_trusted_proxy(hop):
+            break
+    return address
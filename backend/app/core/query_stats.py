@@ -0,0 +1,107 @@
+"""
+Per-request SQL statistics.
+
+Engine event hooks count the statements a request executes and the time
+spent in them. The counters live in a contextvar set by the request
+middleware, so statements run outside a request (background loops,
+scripts) cost one contextvar lookup and are not counted.
+
+With DB_N_PLUS_ONE_DETECTION (meant for development), the statements of a
+request are also tallied by their SQL text. The same statement running
+DB_N_PLUS_ONE_THRESHOLD times in one request, typically a lazy load inside
+a loop, is logged once with the application stack that issued it.
+"""
+import logging
+import os
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL per request",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+class QueryStats:
+    """Statements executed and time spent in the database for one request."""
+
+    __slots__ = ("count", "duration", "statements", "label")
+
+    def __init__(self, detect_repeats: bool = False, label: str = ""):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Optional[Counter] = Counter() if detect_repeats else None
+        self.label = label
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats(label: str = "") -> QueryStats:
+    """Start counting statements for the current request."""
+    stats = QueryStats(settings.DB_N_PLUS_ONE_DETECTION, label)
+    _current.set(stats)
+    return stats
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def observe_request(stats: QueryStats, method: str, route: str) -> None:
+    REQUEST_DB_QUERIES.labels(method, route).observe(stats.count)
+    REQUEST_DB_TIME.labels(method, route).observe(stats.duration)
+
+
+def _application_stack() -> str:
+    frames = [
+        frame for frame in traceback.extract_stack()[:-1]
+        if frame.filename.startswith(APP_DIR) and frame.filename != __file__
+    ]
+    return "".join(traceback.format_list(frames))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None and context is not None:
+        context._query_stats_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    start = getattr(context, "_query_stats_start", None)
+    if start is not None:
+        stats.duration += time.perf_counter() - start
+    stats.count += 1
+    if stats.statements is not None:
+        stats.statements[statement] += 1
+        if stats.statements[statement] == settings.DB_N_PLUS_ONE_THRESHOLD:
+            logger.warning(
+                "Possible N+1 query: statement executed %d times in %s: %s\n%s",
+                settings.DB_N_PLUS_ONE_THRESHOLD, stats.label, " ".join(statement.split())[:300],
+                _application_stack(),
+            )
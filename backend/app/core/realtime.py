@@ -0,0 +1,307 @@
+"""
+Real-time task change feed.
+
+Task changes are published as events through a broker: in process for a
+single worker, or over Redis pub/sub so that every worker sees every event.
+Each worker fans events out to its own connections, indexed by user and by
+team so an event only touches the connections that can see the task.
+
+Every connection has a bounded queue of pending events keyed by task, so a
+burst of changes to one task collapses into its latest state. A client that
+falls further behind than the queue allows gets a single "resync" event
+telling it to refetch, instead of the worker buffering without bound.
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STREAM_CONNECTIONS = Gauge("stream_connections", "Open real-time feed connections")
+STREAM_EVENTS_PUBLISHED = Counter("stream_events_published_total", "Task events published")
+STREAM_EVENTS_DELIVERED = Counter("stream_events_delivered_total", "Task events queued for connections")
+STREAM_EVENTS_COALESCED = Counter("stream_events_coalesced_total", "Task events merged into a pending event")
+STREAM_EVENTS_DROPPED = Counter("stream_events_dropped_total", "Task events dropped by the broker")
+STREAM_RESYNCS = Counter("stream_resyncs_total", "Connections told to resync after falling behind")
+
+RESYNC = "resync"
+TASK_DELETED = "task.deleted"
+TASK_CREATED = "task.created"
+
+
+@dataclass
+class TaskEvent:
+    """A change to a task and the users it concerns."""
+    type: str  # task.created, task.updated, task.status, task.shared, task.unshared, task.deleted
+    task_id: int
+    user_ids: List[int] = field(default_factory=list)  # Owner and users the task is shared with
+    team_id: Optional[int] = None
+    task: Optional[dict] = None  # Summary of the task after the change
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), default=str)
+
+    @classmethod
+    def from_json(cls, message) -> "TaskEvent":
+        return cls(**json.loads(message))
+
+    @property
+    def payload(self) -> dict:
+        """What clients receive: the event without its audience."""
+        return {"type": self.type, "task_id": self.task_id, "task": self.task}
+
+
+def task_event(event_type: str, task) -> TaskEvent:
+    """Build the event for a task model instance."""
+    return TaskEvent(
+        type=event_type,
+        task_id=task.id,
+        user_ids=[task.owner_id, *(user.id for user in task.shared_with)],
+        team_id=task.team_id,
+        task=None if event_type == TASK_DELETED else {
+            "id": task.id,
+            "title": task.title,
+            "status": task.status.value,
+            "priority": task.priority.value,
+            "owner_id": task.owner_id,
+            "team_id": task.team_id,
+            "updated_at": task.updated_at or task.created_at,
+        },
+    )
+
+
+class Subscription:
+    """One connection's queue of pending events, coalesced by task."""
+
+    __slots__ = ("user_id", "team_ids", "is_admin", "max_pending", "_pending", "_wakeup", "_overflowed")
+
+    def __init__(self, user_id: int, team_ids: Iterable[int] = (), is_admin: bool = False,
+                 max_pending: int = 100):
+        self.user_id = user_id
+        self.team_ids = frozenset(team_ids)
+        self.is_admin = is_admin
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[int, TaskEvent]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._overflowed = False
+
+    def push(self, event: TaskEvent) -> None:
+        if self._overflowed:
+            return
+        pending = self._pending.get(event.task_id)
+        if pending is not None:
+            # Only the latest state matters; a create followed by updates is still a create
+            if pending.type == TASK_CREATED and event.type != TASK_DELETED:
+                event = TaskEvent(TASK_CREATED, event.task_id, event.user_ids, event.team_id, event.task)
+            self._pending[event.task_id] = event
+            STREAM_EVENTS_COALESCED.inc()
+        elif len(self._pending) >= self.max_pending:
+            # The client is too far behind; drop the backlog and ask it to refetch
+            self._pending.clear()
+            self._overflowed = True
+            STREAM_RESYNCS.inc()
+        else:
+            self._pending[event.task_id] = event
+            STREAM_EVENTS_DELIVERED.inc()
+        self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event payload, or None if nothing arrived within the timeout."""
+        if not self._pending and not self._overflowed:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self._overflowed:
+            self._overflowed = False
+            return {"type": RESYNC}
+        _, event = self._pending.popitem(last=False)
+        return event.payload
+
+
+class Broker(ABC):
+    """Carries serialized events between workers."""
+
+    @abstractmethod
+    async def start(self, handler: Callable[[str], None]) -> None:
+        """Start delivering published messages to the handler."""
+
+    @abstractmethod
+    def publish(self, message: str) -> None:
+        """Publish without waiting; must be called from the event loop."""
+
+    @abstractmethod
+    async def stop(self) -> None:
+        ...
+
+
+class LocalBroker(Broker):
+    """Delivers events within this process only."""
+
+    def __init__(self):
+        self._handler: Optional[Callable[[str], None]] = None
+
+    async def start(self, handler: Callable[[str], None]) -> None:
+        self._handler = handler
+
+    def publish(self, message: str) -> None:
+        if self._handler is not None:
+            self._handler(message)
+
+    async def stop(self) -> None:
+        self._handler = None
+
+
+class RedisBroker(Broker):
+    """
+    Delivers events to every worker through a Redis pub/sub channel.
+
+    Publishing only enqueues the message; a background task sends it, so
+    request handlers never wait on Redis. If Redis falls behind and the
+    outbox fills, events are dropped (connections recover on their next
+    resync or reconnect).
+    """
+
+    def __init__(self, url: str, channel: str = "task-events", client=None, outbox_size: int = 10000):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url)
+        self.client = client
+        self.channel = channel
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=outbox_size)
+        self._pubsub = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, handler: Callable[[str], None]) -> None:
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._tasks = [
+            asyncio.create_task(self._listen(handler)),
+            asyncio.create_task(self._send()),
+        ]
+
+    async def _listen(self, handler: Callable[[str], None]) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message["type"] == "message":
+                        handler(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Task event subscription failed; retrying")
+                await asyncio.sleep(1)
+
+    async def _send(self) -> None:
+        while True:
+            message = await self._outbox.get()
+            try:
+                await self.client.publish(self.channel, message)
+            except Exception:
+                STREAM_EVENTS_DROPPED.inc()
+                logger.exception("Failed to publish task event")
+
+    def publish(self, message: str) -> None:
+        try:
+            self._outbox.put_nowait(message)
+        except asyncio.QueueFull:
+            STREAM_EVENTS_DROPPED.inc()
+            logger.warning("Task event outbox full; dropping event")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+
+class EventHub:
+    """Routes events from the broker to this worker's connections."""
+
+    def __init__(self, broker: Broker, max_pending: int = 100):
+        self.broker = broker
+        self.max_pending = max_pending
+        self._by_user: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._by_team: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._admins: Set[Subscription] = set()
+        self._count = 0
+
+    @classmethod
+    def from_settings(cls) -> "EventHub":
+        if settings.STREAM_BROKER == "redis":
+            broker = RedisBroker(settings.REDIS_URL)
+        else:
+            broker = LocalBroker()
+        return cls(broker, max_pending=settings.STREAM_QUEUE_SIZE)
+
+    @property
+    def connections(self) -> int:
+        return self._count
+
+    def subscribe(self, user_id: int, team_ids: Iterable[int] = (), is_admin: bool = False) -> Subscription:
+        subscription = Subscription(user_id, team_ids, is_admin, self.max_pending)
+        self._by_user[user_id].add(subscription)
+        for team_id in subscription.team_ids:
+            self._by_team[team_id].add(subscription)
+        if is_admin:
+            self._admins.add(subscription)
+        self._count += 1
+        STREAM_CONNECTIONS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        _discard(self._by_user, subscription.user_id, subscription)
+        for team_id in subscription.team_ids:
+            _discard(self._by_team, team_id, subscription)
+        self._admins.discard(subscription)
+        self._count -= 1
+        STREAM_CONNECTIONS.dec()
+
+    def publish(self, event: TaskEvent) -> None:
+        STREAM_EVENTS_PUBLISHED.inc()
+        self.broker.publish(event.to_json())
+
+    def dispatch(self, message) -> None:
+        """Deliver a broker message to every local connection that can see the task."""
+        event = TaskEvent.from_json(message)
+        targets = set(self._admins)
+        for user_id in event.user_ids:
+            targets.update(self._by_user.get(user_id, ()))
+        if event.team_id is not None:
+            targets.update(self._by_team.get(event.team_id, ()))
+        for subscription in targets:
+            subscription.push(event)
+
+    async def start(self) -> None:
+        await self.broker.start(self.dispatch)
+
+    async def stop(self) -> None:
+        await self.broker.stop()
+
+
+def _discard(index: Dict[int, Set[Subscription]], key: int, subscription: Subscription) -> None:
+    subscriptions = index.get(key)
+    if subscriptions is not None:
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del index[key]
+
+
+hub = EventHub.from_settings()
@@ -0,0 +1,182 @@
+"""
+Read replicas.
+
+Endpoints that only read declare `get_read_db` instead of `get_db`; plain
+SELECTs from their session may then be served by a replica from
+DATABASE_REPLICA_URLS. Everything else stays on the primary.
+
+Replica lag is measured with a heartbeat: every probe advances the counter
+in replica_heartbeat on the primary and notes when, and a replica's lag is
+how long ago the primary first reached a beat the replica has not replayed.
+The probe writes the beat itself, so a stalled replica is noticed even when
+nothing else is being written. With several workers probing, each keeps
+its own history; a beat from another worker is just a later one.
+Replicas further behind than REPLICA_MAX_LAG_SECONDS, or unreachable, are
+skipped until they catch up; with no usable replica, reads go to the
+primary.
+
+A user whose session committed a write reads from the primary for
+REPLICA_READ_YOUR_WRITES_SECONDS afterwards, so they see their own changes.
+This is tracked per worker process; other workers still serve that user
+from replicas that are at most REPLICA_MAX_LAG_SECONDS behind.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Deque, List, Optional, Tuple
+
+from prometheus_client import Gauge
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.models import ReplicaHeartbeat
+
+logger = logging.getLogger(__name__)
+
+REPLICA_LAG = Gauge("db_replica_lag_seconds", "Estimated replication lag", ["replica"])
+REPLICA_HEALTHY = Gauge("db_replica_healthy", "Whether reads are routed to the replica", ["replica"])
+
+
+class Replica:
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = False  # Until the first probe
+        self.lag: Optional[float] = None
+        self.beat = 0  # Last heartbeat seen replayed here
+
+
+class RecentWriters:
+    """User ids that committed a write recently, with an expiry each."""
+
+    def __init__(self, window: float, maxsize: int = 100000):
+        self.window = window
+        self.maxsize = maxsize
+        self._expiry: "OrderedDict[int, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, user_id: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._expiry[user_id] = now + self.window
+            self._expiry.move_to_end(user_id)
+            # Entries are in expiry order, so expired ones are at the front
+            while self._expiry and (next(iter(self._expiry.values())) < now or len(self._expiry) > self.maxsize):
+                self._expiry.popitem(last=False)
+
+    def __contains__(self, user_id) -> bool:
+        expiry = self._expiry.get(user_id)
+        return expiry is not None and expiry > time.monotonic()
+
+
+class ReplicaSet:
+    """Replica engines, their measured lag and the read-your-writes window."""
+
+    def __init__(self, primary: Engine, replicas: List[Replica], max_lag: float, read_your_writes: float):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.recent_writers = RecentWriters(read_your_writes)
+        self._history: Deque[Tuple[float, int]] = deque(maxlen=10000)
+        self._next = itertools.cycle(range(len(replicas)))
+
+    @classmethod
+    def from_settings(cls) -> Optional["ReplicaSet"]:
+        from app.core.database import create_db_engine, get_engine
+
+        urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+        if not urls:
+            return None
+        replicas = [
+            Replica(f"replica-{index}", create_db_engine(url, name=f"replica-{index}", read_only=True))
+            for index, url in enumerate(urls)
+        ]
+        return cls(get_engine(), replicas, settings.REPLICA_MAX_LAG_SECONDS, settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+
+    def choose(self) -> Optional[Engine]:
+        """A healthy replica in round-robin order, or None to use the primary."""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next)]
+            if replica.healthy:
+                return replica.engine
+        return None
+
+    def record_write(self, user_id: int) -> None:
+        self.recent_writers.add(user_id)
+
+    def wrote_recently(self, user_id: Optional[int]) -> bool:
+        return user_id is not None and user_id in self.recent_writers
+
+    def lag_for(self, replica_beat: int, now: float) -> float:
+        """Time since the primary first had a beat the replica lacks."""
+        for observed_at, primary_beat in self._history:
+            if primary_beat > replica_beat:
+                return now - observed_at
+        return 0.0
+
+    def beat(self) -> int:
+        """Advance the heartbeat on the primary and return the new beat."""
+        with self.primary.begin() as connection:
+            updated = connection.execute(
+                update(ReplicaHeartbeat).where(ReplicaHeartbeat.id == 1).values(beat=ReplicaHeartbeat.beat + 1)
+            ).rowcount
+            if not updated:
+                connection.execute(insert(ReplicaHeartbeat).values(id=1, beat=1))
+                return 1
+            return connection.execute(select(ReplicaHeartbeat.beat).where(ReplicaHeartbeat.id == 1)).scalar_one()
+
+    def probe(self) -> None:
+        """Measure every replica's lag and mark which ones may serve reads."""
+        self._history.append((time.monotonic(), self.beat()))
+        now = time.monotonic()
+
+        query = select(ReplicaHeartbeat.beat).where(ReplicaHeartbeat.id == 1)
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    replica.beat = connection.execute(query).scalar() or 0
+            except Exception as exc:
+                if replica.healthy:
+                    logger.warning("Read replica %s unavailable: %s", replica.name, exc)
+                replica.healthy, replica.lag = False, None
+                REPLICA_HEALTHY.labels(replica.name).set(0)
+                continue
+            replica.lag = self.lag_for(replica.beat, now)
+            healthy = replica.lag <= self.max_lag
+            if healthy != replica.healthy:
+                logger.warning(
+                    "Read replica %s %s rotation, lag %.1fs",
+                    replica.name, "back in" if healthy else "out of", replica.lag,
+                )
+            replica.healthy = healthy
+            REPLICA_LAG.labels(replica.name).set(replica.lag)
+            REPLICA_HEALTHY.labels(replica.name).set(int(healthy))
+
+        # Beats every replica has replayed no longer matter
+        replayed = min(replica.beat for replica in self.replicas)
+        while len(self._history) > 1 and self._history[0][1] <= replayed:
+            self._history.popleft()
+
+
+@lru_cache()
+def get_replica_set() -> Optional[ReplicaSet]:
+    """The configured replicas, or None when there are none."""
+    return ReplicaSet.from_settings()
+
+
+async def run_replica_probe_loop() -> None:
+    """Keep replica lag current."""
+    replica_set = get_replica_set()
+    if replica_set is None:
+        return
+    while True:
+        try:
+            await asyncio.to_thread(replica_set.probe)
+        except Exception:
+            logger.exception("Replica lag probe failed")
+        await asyncio.sleep(settings.REPLICA_PROBE_INTERVAL_SECONDS)
@@ -0,0 +1,179 @@
+"""
+Token revocation.
+
+Tokens carry a random `jti`. Logging out revokes it until the token would
+have expired: the jti and its expiry are kept in this worker's memory and
+authenticate_token refuses it. The check runs on every request, so it
+never touches the database or the cache. A Bloom filter of the revoked
+jtis answers the common "not revoked" case with a hash and a few bit
+tests; only a filter hit (a revoked token, or a false positive about 1%
+of the time) looks the jti up in the dict.
+
+Workers share revocations through the application cache: each one takes
+the next number of the "revoked:seq" counter and is stored under
+"revoked:<number>" until its token expires. run_revocation_sync_loop reads
+the entries past the last number this worker has seen every
+TOKEN_REVOCATION_SYNC_SECONDS, so the other workers refuse a revoked token
+within that delay. With CACHE_BACKEND=memory every worker has its own
+cache, and revocations only reach the worker that handled the logout.
+
+Tokens issued before jti was added cannot be revoked; they expire as usual.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+from app.core.cache import cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_KEY = "revoked:seq"
+ENTRY_PREFIX = "revoked:"
+SYNC_BATCH = 1000
+PRUNE_SECONDS = 60
+
+
+class BloomFilter:
+    """Bit array over str keys, about 1% false positives at `capacity` keys."""
+
+    HASHES = 7
+    BITS_PER_KEY = 10
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # A power of two, so positions are taken with a mask
+        self.size = 1 << max(6, (capacity * self.BITS_PER_KEY - 1).bit_length())
+        self.mask = self.size - 1
+        self.bits = bytearray(self.size // 8)
+
+    def add(self, key: str) -> None:
+        # Double hashing: the str hash is computed once and cached on the key
+        position = hash(key)
+        step = (position >> 32) | 1
+        for _ in range(self.HASHES):
+            index = position & self.mask
+            self.bits[index >> 3] |= 1 << (index & 7)
+            position += step
+
+    def __contains__(self, key: str) -> bool:
+        position = hash(key)
+        step = (position >> 32) | 1
+        bits = self.bits
+        mask = self.mask
+        for _ in range(self.HASHES):
+            index = position & mask
+            if not bits[index >> 3] & (1 << (index & 7)):
+                return False
+            position += step
+        return True
+
+
+class RevocationList:
+    """Revoked jtis with their expiry, in memory, synced through the cache."""
+
+    def __init__(self, capacity: int = 100000):
+        self._expiry: Dict[str, float] = {}
+        self._filter = BloomFilter(capacity)
+        self._removed = 0  # Pruned jtis whose bits are still set
+        self._seen = 0  # Last revocation number applied from the cache
+        self._retry: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not self._expiry or jti is None or jti not in self._filter:
+            return False
+        expires_at = self._expiry.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def add(self, jti: str, expires_at: float) -> None:
+        """Revoke a jti in this worker until `expires_at` (a Unix timestamp)."""
+        if jti in self._expiry or expires_at <= time.time():
+            return
+        self._expiry[jti] = expires_at
+        if len(self._expiry) > self._filter.capacity:
+            self._rebuild()
+        else:
+            self._filter.add(jti)
+
+    def prune(self) -> int:
+        """Forget expired jtis; the filter is rebuilt once most of its bits are stale."""
+        now = time.time()
+        expired = [jti for jti, expires_at in self._expiry.items() if expires_at <= now]
+        for jti in expired:
+            del self._expiry[jti]
+        self._removed += len(expired)
+        if self._removed > len(self._expiry):
+            self._rebuild()
+        return len(expired)
+
+    def _rebuild(self) -> None:
+        capacity = self._filter.capacity
+        while capacity < len(self._expiry):
+            capacity *= 2
+        bloom = BloomFilter(capacity)
+        for jti in self._expiry:
+            bloom.add(jti)
+        # Swapped in whole, so a check never sees a half-built filter
+        self._filter = bloom
+        self._removed = 0
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        """Revoke a jti here at once, and in the other workers at their next sync."""
+        self.add(jti, expires_at)
+        ttl = expires_at - time.time()
+        if ttl <= 0:
+            return
+        try:
+            number = await cache.incr(SEQUENCE_KEY)
+            await cache.set(f"{ENTRY_PREFIX}{number}", [jti, expires_at], ttl=ttl)
+        except Exception:
+            logger.exception("Could not share the revocation of token %s with other workers", jti)
+
+    async def sync(self) -> int:
+        """Apply the revocations other workers stored since the last sync; returns how many were read."""
+        latest = await cache.incr(SEQUENCE_KEY, 0)
+        if latest < self._seen:
+            # The cache was flushed and the sequence started over
+            self._seen = 0
+        # A number is taken before its entry is written, so the newest
+        # missing ones are read again once
+        retry, self._retry = self._retry, []
+        read = await self._read(retry)
+        while self._seen < latest:
+            numbers = range(self._seen + 1, min(latest, self._seen + SYNC_BATCH) + 1)
+            read += await self._read(numbers, missing=self._retry, recent=latest - SYNC_BATCH)
+            self._seen = numbers[-1]
+        return read
+
+    async def _read(self, numbers: Sequence[int], missing: Optional[List[int]] = None, recent: int = 0) -> int:
+        if not numbers:
+            return 0
+        found = await cache.get_many([f"{ENTRY_PREFIX}{number}" for number in numbers])
+        for number in numbers:
+            entry = found.get(f"{ENTRY_PREFIX}{number}")
+            if entry is not None:
+                self.add(*entry)
+            elif missing is not None and number > recent:
+                missing.append(number)
+        return len(found)
+
+
+revocations = RevocationList(settings.TOKEN_REVOCATION_CAPACITY)
+
+
+async def run_revocation_sync_loop() -> None:
+    """Pick up other workers' revocations, and forget expired ones now and then."""
+    pruned_at = time.monotonic()
+    while True:
+        try:
+            await revocations.sync()
+            if time.monotonic() - pruned_at >= PRUNE_SECONDS:
+                revocations.prune()
+                pruned_at = time.monotonic()
+        except Exception:
+            logger.exception("Token revocation sync failed")
+        await asyncio.sleep(settings.TOKEN_REVOCATION_SYNC_SECONDS)
@@ -0,0 +1,78 @@
+"""
+Database schema version check.
+
+The schema is managed by Alembic (backend/alembic). At startup the
+application reads the revision stamped in alembic_version, a single-row
+query, and compares it with the revision this code expects instead of
+inspecting every table. Bump SCHEMA_REVISION with every new migration.
+"""
+import logging
+import os
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DatabaseError, OperationalError
+
+from app.core.config import settings
+from app.core.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+# Head revision of alembic/versions this code was written against
+SCHEMA_REVISION = "0010"
+
+ALEMBIC_INI = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini"))
+
+
+class SchemaMismatchError(RuntimeError):
+    """The database is not at the revision the application expects."""
+
+
+def current_revision(engine: Engine) -> Optional[str]:
+    """
+    Revision stamped in the database, or None for an unmigrated database.
+    Raises OperationalError when the database cannot be reached.
+    """
+    with engine.connect() as connection:
+        try:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except DatabaseError:
+            return None
+
+
+def upgrade_schema() -> None:
+    """Run `alembic upgrade head` against settings.DATABASE_URL."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+
+def check_schema(engine: Optional[Engine] = None, mode: Optional[str] = None) -> Optional[str]:
+    """
+    Compare the database revision with SCHEMA_REVISION. In "error" mode a
+    mismatch raises SchemaMismatchError, in "warn" mode it is logged, and
+    "off" skips the check. An unreachable database is only logged, so a
+    worker can start while the database is briefly down.
+    """
+    mode = mode or settings.DB_SCHEMA_CHECK
+    if mode == "off":
+        return None
+    try:
+        revision = current_revision(engine or get_engine())
+    except OperationalError as exc:
+        logger.warning("Skipping schema check, database unavailable: %s", exc)
+        return None
+    if revision != SCHEMA_REVISION:
+        message = (
+            f"Database schema is at revision {revision or 'none'}, expected {SCHEMA_REVISION}; "
+            "run `alembic upgrade head`, or `alembic stamp 0001 && alembic upgrade head` "
+            "for a database created by an earlier version with create_all"
+        )
+        if mode == "error":
+            raise SchemaMismatchError(message)
+        logger.warning(message)
+    return revision
@@ -0,0 +1,393 @@
+"""
+Content-addressed attachment storage.
+
+Files are stored once per SHA-256 digest under fan-out keys
+(``blobs/ab/cd/abcd...``) and shared by every attachment with the same
+content. ``Blob`` rows carry a reference count maintained from the
+attachment rows; unreferenced blobs are reclaimed by a background collector.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from sqlalchemy import delete, exists, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.downloads import CACHE_CONTROL, content_disposition
+from app.core.uploads import StagedFile
+from app.models import Attachment, Blob
+
+logger = logging.getLogger(__name__)
+
+
+def blob_key(digest: str) -> str:
+    """Storage key of a blob: two levels of fan-out by digest prefix."""
+    return f"blobs/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+class StorageBackend(ABC):
+    """Interface of a blob store keyed by SHA-256 digest."""
+
+    @abstractmethod
+    def exists(self, digest: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put(self, staged: StagedFile) -> None:
+        """Store a staged file under its digest (replacing any existing copy), consuming the staging file."""
+
+    @abstractmethod
+    def open(self, digest: str) -> BinaryIO:
+        ...
+
+    @abstractmethod
+    def delete(self, digest: str) -> None:
+        ...
+
+    @abstractmethod
+    def iter_digests(self) -> Iterator[str]:
+        """Yield the digests of all stored blobs."""
+
+    @abstractmethod
+    def modified_at(self, digest: str) -> Optional[float]:
+        """Unix timestamp of when the blob was written, or None if missing."""
+
+    @abstractmethod
+    def write_derived(self, digest: str, name: str, data: bytes) -> None:
+        """Store a file derived from a blob (e.g. a preview); deleted along with the blob."""
+
+    @abstractmethod
+    def read_derived(self, digest: str, name: str) -> Optional[bytes]:
+        """Content of a derived file, or None if it has not been generated."""
+
+    def local_path(self, digest: str) -> Optional[Path]:
+        """Filesystem path of a blob, for backends that have one."""
+        return None
+
+    def presigned_url(self, digest: str, filename: str, content_type: str,
+                      disposition: str = "attachment") -> Optional[str]:
+        """Time-limited URL the client can download the blob from directly, if supported."""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Blob store on the local filesystem."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def local_path(self, digest: str) -> Path:
+        return self.root / blob_key(digest)
+
+    def exists(self, digest: str) -> bool:
+        return self.local_path(digest).exists()
+
+    def put(self, staged: StagedFile) -> None:
+        staged.commit(self.local_path(staged.sha256))
+
+    def open(self, digest: str) -> BinaryIO:
+        return open(self.local_path(digest), "rb")
+
+    def delete(self, digest: str) -> None:
+        path = self.local_path(digest)
+        path.unlink(missing_ok=True)
+        for derived in path.parent.glob(f"{digest}.*"):
+            derived.unlink(missing_ok=True)
+
+    def iter_digests(self) -> Iterator[str]:
+        blobs = self.root / "blobs"
+        if not blobs.exists():
+            return
+        for path in blobs.glob("*/*/*"):
+            # Derived files sit next to the blob as <digest>.<name>
+            if path.is_file() and "." not in path.name:
+                yield path.name
+
+    def _derived_path(self, digest: str, name: str) -> Path:
+        return self.local_path(digest).with_name(f"{digest}.{name}")
+
+    def write_derived(self, digest: str, name: str, data: bytes) -> None:
+        path = self._derived_path(digest, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def read_derived(self, digest: str, name: str) -> Optional[bytes]:
+        try:
+            return self._derived_path(digest, name).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def modified_at(self, digest: str) -> Optional[float]:
+        try:
+            return self.local_path(digest).stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+
+class S3Storage(StorageBackend):
+    """
+    Blob store on an S3-compatible service (AWS S3, MinIO, ...).
+
+    Takes a boto3-style client; one is created from the settings when not
+    given. boto3 is only required when this backend is used.
+    """
+
+    def __init__(self, bucket: str, client=None, prefix: str = ""):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as exc:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package") from exc
+            client = boto3.client(
+                "s3",
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                region_name=settings.S3_REGION,
+                aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            )
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, digest: str) -> str:
+        return f"{self.prefix}{blob_key(digest)}"
+
+    def _head(self, digest: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(digest))
+        except Exception as exc:
+            if _is_not_found(exc):
+                return None
+            raise
+
+    def exists(self, digest: str) -> bool:
+        return self._head(digest) is not None
+
+    def put(self, staged: StagedFile) -> None:
+        # upload_file streams from disk and switches to multipart for large files
+        self.client.upload_file(
+            str(staged.temp_path), self.bucket, self._key(staged.sha256),
+            ExtraArgs={"ContentType": staged.content_type},
+        )
+        staged.discard()
+
+    def open(self, digest: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(digest))["Body"]
+
+    def delete(self, digest: str) -> None:
+        key = self._key(digest)
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{key}."):
+            for item in page.get("Contents", []):
+                self.client.delete_object(Bucket=self.bucket, Key=item["Key"])
+
+    def iter_digests(self) -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}blobs/"):
+            for item in page.get("Contents", []):
+                name = item["Key"].rsplit("/", 1)[-1]
+                if "." not in name:
+                    yield name
+
+    def write_derived(self, digest: str, name: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=f"{self._key(digest)}.{name}", Body=data)
+
+    def read_derived(self, digest: str, name: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=f"{self._key(digest)}.{name}")
+        except Exception as exc:
+            if _is_not_found(exc):
+                return None
+            raise
+        return response["Body"].read()
+
+    def modified_at(self, digest: str) -> Optional[float]:
+        head = self._head(digest)
+        return head["LastModified"].timestamp() if head else None
+
+    def presigned_url(self, digest: str, filename: str, content_type: str,
+                      disposition: str = "attachment") -> Optional[str]:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(digest),
+                "ResponseContentDisposition": content_disposition(filename, disposition),
+                "ResponseContentType": content_type,
+                "ResponseCacheControl": CACHE_CONTROL,
+            },
+            ExpiresIn=settings.S3_PRESIGNED_URL_EXPIRE_SECONDS,
+        )
+
+
+def _is_not_found(exc: Exception) -> bool:
+    response = getattr(exc, "response", None) or {}
+    return str(response.get("Error", {}).get("Code")) in ("404", "NoSuchKey", "NotFound")
+
+
+@lru_cache()
+def get_storage() -> StorageBackend:
+    """Get the configured storage backend."""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(settings.S3_BUCKET, prefix=settings.S3_PREFIX)
+    return LocalStorage(Path(settings.UPLOAD_DIR))
+
+
+def store_blob(db: Session, staged: StagedFile, storage: Optional[StorageBackend] = None) -> Blob:
+    """
+    Get or create the blob for a staged upload.
+
+    The blob row is written before the content is checked, which locks it
+    against a concurrent garbage collection until the caller commits. The
+    reference itself is counted when the attachment row is inserted.
+    Duplicate content is discarded without touching the store.
+    """
+    storage = storage or get_storage()
+    for attempt in range(2):
+        claimed = db.execute(
+            update(Blob)
+            .where(Blob.sha256 == staged.sha256)
+            .values(unreferenced_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed:
+            blob = db.get(Blob, staged.sha256)
+            if storage.exists(staged.sha256):
+                staged.discard()
+            else:
+                storage.put(staged)
+            return blob
+
+        # Born unreferenced, so it is collectable if the attachment never commits
+        blob = Blob(
+            sha256=staged.sha256,
+            size=staged.size,
+            content_type=staged.content_type,
+            ref_count=0,
+            unreferenced_at=datetime.utcnow(),
+        )
+        savepoint = db.begin_nested()
+        try:
+            db.add(blob)
+            savepoint.commit()
+        except IntegrityError:
+            # Another request stored the same content first; claim its row
+            savepoint.rollback()
+            if attempt == 1:
+                raise
+            continue
+        storage.put(staged)
+        return blob
+
+
+def collect_garbage(db: Session, storage: Optional[StorageBackend] = None,
+                    grace_seconds: Optional[int] = None, limit: int = 1000) -> int:
+    """
+    Delete blobs that have had no references for longer than the grace period.
+
+    Each blob row is deleted conditionally (still unreferenced, no attachment
+    rows) before its content is removed, and the deletion is only committed
+    once the content is gone, so a concurrent upload of the same content
+    either waits for the collector or keeps the blob alive.
+    """
+    storage = storage or get_storage()
+    grace = settings.BLOB_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = datetime.utcnow() - timedelta(seconds=grace)
+    referenced = exists().where(Attachment.content_hash == Blob.sha256)
+
+    # Repair counts that drifted, e.g. rows removed by database-level cascades
+    db.execute(
+        update(Blob)
+        .where(Blob.ref_count > 0, ~referenced)
+        .values(ref_count=0, unreferenced_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    candidates = [
+        digest for (digest,) in db.query(Blob.sha256).filter(
+            Blob.ref_count <= 0,
+            Blob.unreferenced_at <= cutoff,
+        ).limit(limit).all()
+    ]
+
+    removed = 0
+    for digest in candidates:
+        deleted = db.execute(
+            delete(Blob)
+            .where(Blob.sha256 == digest, Blob.ref_count <= 0, ~referenced)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not deleted:
+            db.rollback()
+            continue
+        try:
+            storage.delete(digest)
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to delete blob %s", digest)
+            continue
+        db.commit()
+        removed += 1
+
+    if removed:
+        logger.info("Garbage collected %d unreferenced blobs", removed)
+    return removed
+
+
+def sweep_orphaned_files(db: Session, storage: Optional[StorageBackend] = None,
+                         grace_seconds: Optional[int] = None) -> int:
+    """Delete stored content that has no blob row, e.g. left by a crashed upload."""
+    storage = storage or get_storage()
+    grace = settings.BLOB_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    cutoff = time.time() - grace
+    removed = 0
+    for digest in storage.iter_digests():
+        modified = storage.modified_at(digest)
+        if modified is None or modified > cutoff:
+            continue
+        if db.get(Blob, digest) is None:
+            storage.delete(digest)
+            removed += 1
+    return removed
+
+
+def _run_gc() -> None:
+    from app.core.database import SessionLocal
+    from app.core.uploads import purge_stale_uploads
+
+    db = SessionLocal()
+    try:
+        collect_garbage(db)
+        sweep_orphaned_files(db)
+    finally:
+        db.close()
+    purge_stale_uploads()
+
+
+async def run_gc_loop() -> None:
+    """Periodically reclaim unreferenced blobs and abandoned uploads."""
+    while True:
+        await asyncio.sleep(settings.BLOB_GC_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(_run_gc)
+        except Exception:
+            logger.exception("Blob garbage collection failed")
+
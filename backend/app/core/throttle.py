@@ -0,0 +1,241 @@
+"""
+Login throttling.
+
+Failed logins are counted per username and per client address over a
+sliding window of LOGIN_THROTTLE_WINDOW_SECONDS (the current and previous
+fixed windows, the previous one weighted by how much of it still overlaps).
+Past the free failures, every further failure makes the next attempt wait:
+LOGIN_DELAY_BASE_SECONDS, doubled per failure, up to the whole window,
+which amounts to a lockout. The login endpoint checks for a pending delay
+before it looks the user up or verifies a password, so a brute-force run
+on a username costs one cache read per attempt instead of a query and a
+bcrypt hash. A successful login clears the username's failures; an
+address keeps its own, since many users may share it.
+
+A delayed address only holds back the usernames that failed recently, so
+the users behind a shared address can still log in. Past
+LOGIN_MAX_FAILURES_PER_IP it holds back every username, so credential
+stuffing (a new username per attempt) is refused before the user query and
+bcrypt as well. Addresses come from app.core.proxies.client_address, which
+believes X-Forwarded-For only from TRUSTED_PROXIES.
+
+Counters and delays live in the application cache, in this worker's memory
+by default and shared by every worker with CACHE_BACKEND=redis. If the
+cache fails, logins are not throttled.
+
+Failed logins are not written one row per attempt either: `login_failures`
+collects them per username and run_login_failure_flush_loop writes one
+LOGIN_FAILED SecurityEvent per username every LOGIN_FAILURE_SUMMARY_SECONDS,
+with the attempt count and the addresses they came from.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.models import SecurityEvent
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN = "unknown"  # Failed logins without a client address
+
+
+def _user_scope(username: str) -> str:
+    return f"user:{username.lower()}"
+
+
+def _ip_scope(ip_address: str) -> str:
+    return f"ip:{ip_address}"
+
+
+def _scopes(username: str, ip_address: Optional[str]) -> List[Tuple[str, int]]:
+    """(cache key suffix, free failures) for each counter a login attempt touches."""
+    scopes = [(_user_scope(username), settings.LOGIN_FREE_FAILURES_PER_USERNAME)]
+    if ip_address:
+        scopes.append((_ip_scope(ip_address), settings.LOGIN_FREE_FAILURES_PER_IP))
+    return scopes
+
+
+async def _failures(scope: str, now: float, add: int = 0) -> int:
+    """Failures in the sliding window ending now, after adding `add`."""
+    window = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+    bucket, elapsed = divmod(int(now), window)
+    current_key = f"login:failures:{scope}:{bucket}"
+    previous_key = f"login:failures:{scope}:{bucket - 1}"
+    if add:
+        current = await cache.incr(current_key, add, ttl=2 * window)
+        previous = (await cache.get_counters([previous_key]))[previous_key]
+    else:
+        counters = await cache.get_counters([current_key, previous_key])
+        current, previous = counters[current_key], counters[previous_key]
+    return int(current + previous * (1 - elapsed / window))
+
+
+async def login_retry_after(username: str, ip_address: Optional[str]) -> int:
+    """
+    Seconds before this username may try to log in from this address, 0 if
+    it may now. A delayed address only holds back usernames that failed
+    recently themselves: many users can share one address (NAT, a proxy we
+    do not trust), and a user who knows their password should not be locked
+    out by someone else's guesses. Past LOGIN_MAX_FAILURES_PER_IP failures
+    the address holds back every username.
+    """
+    now = time.time()
+    user_key = f"login:delay:{_user_scope(username)}"
+    keys = [f"login:delay:{scope}" for scope, _ in _scopes(username, ip_address)]
+    delays = await cache.get_many(keys)
+    until = delays.get(user_key, 0)
+    address_until = max((value for key, value in delays.items() if key != user_key), default=0)
+    if address_until > max(until, now):
+        try:
+            if (
+                await _failures(_ip_scope(ip_address), now) >= settings.LOGIN_MAX_FAILURES_PER_IP
+                or await _failures(_user_scope(username), now)
+            ):
+                until = address_until
+        except Exception:
+            logger.exception("Could not read failed logins for %s", username)
+    return max(0, math.ceil(until - now))
+
+
+async def record_login_failure(username: str, ip_address: Optional[str]) -> int:
+    """Count a failed login; returns the delay it imposes on the next attempt, in seconds."""
+    window = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+    now = time.time()
+    imposed = 0.0
+    try:
+        for scope, free in _scopes(username, ip_address):
+            excess = await _failures(scope, now, add=1) - free
+            if excess > 0:
+                delay = min(settings.LOGIN_DELAY_BASE_SECONDS * 2 ** (excess - 1), window)
+                await cache.set(f"login:delay:{scope}", now + delay, ttl=delay)
+                imposed = max(imposed, delay)
+    except Exception:
+        logger.exception("Could not count a failed login for %s", username)
+    return math.ceil(imposed)
+
+
+async def reset_login_failures(username: str) -> None:
+    """Forget a username's failures after it logged in."""
+    scope = _user_scope(username)
+    bucket = int(time.time()) // settings.LOGIN_THROTTLE_WINDOW_SECONDS
+    await cache.delete(
+        f"login:failures:{scope}:{bucket}", f"login:failures:{scope}:{bucket - 1}", f"login:delay:{scope}",
+    )
+
+
+@dataclass
+class FailureSummary:
+    """Failed logins for one username since the last flush."""
+    username: str
+    user_id: Optional[int] = None
+    attempts: int = 0  # Wrong passwords or unknown usernames
+    throttled: int = 0  # Refused before the password was checked
+    addresses: Counter = field(default_factory=Counter)
+    user_agent: Optional[str] = None
+    first_at: datetime = field(default_factory=datetime.utcnow)
+    last_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class LoginFailureLog:
+    """This worker's failed logins since the last flush, one summary per username."""
+
+    MAX_USERNAMES = 1000  # Beyond this, failures for further usernames share one summary
+    MAX_ADDRESSES = 20  # Per summary; further addresses are counted under "other"
+    OTHER = "*"
+
+    def __init__(self):
+        self._summaries: Dict[str, FailureSummary] = {}
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def record(self, username: str, ip_address: Optional[str], user_agent: Optional[str],
+               user_id: Optional[int] = None, throttled: bool = False) -> None:
+        key = username.lower()
+        if key not in self._summaries and len(self._summaries) >= self.MAX_USERNAMES:
+            key = username = self.OTHER
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self._summaries[key] = FailureSummary(username=username)
+        if throttled:
+            summary.throttled += 1
+        else:
+            summary.attempts += 1
+        address = ip_address or UNKNOWN
+        if address not in summary.addresses and len(summary.addresses) >= self.MAX_ADDRESSES:
+            address = self.OTHER
+        summary.addresses[address] += 1
+        summary.user_id = user_id if user_id is not None else summary.user_id
+        summary.user_agent = user_agent
+        summary.last_at = datetime.utcnow()
+
+    def take(self) -> List[FailureSummary]:
+        """The summaries so far; recording starts over."""
+        summaries, self._summaries = self._summaries, {}
+        return list(summaries.values())
+
+
+login_failures = LoginFailureLog()
+
+
+def save_login_failures(db: Session, summaries: List[FailureSummary]) -> int:
+    """Write one SecurityEvent per summary."""
+    for summary in summaries:
+        description = f"{summary.attempts} failed login attempts for username: {summary.username}"
+        if summary.throttled:
+            description += f" ({summary.throttled} more refused while throttled)"
+        address = summary.addresses.most_common(1)[0][0]
+        db.add(SecurityEvent(
+            event_type="LOGIN_FAILED",
+            # Reaching the throttle means repeated failures, not a typo
+            severity="CRITICAL" if summary.throttled else "WARNING",
+            description=description,
+            user_id=summary.user_id,
+            ip_address=address if address not in (UNKNOWN, LoginFailureLog.OTHER) else None,
+            user_agent=summary.user_agent[:500] if summary.user_agent else None,
+            event_metadata={
+                "attempts": summary.attempts,
+                "throttled": summary.throttled,
+                "addresses": dict(summary.addresses),
+                "first_at": summary.first_at.isoformat(),
+                "last_at": summary.last_at.isoformat(),
+            },
+        ))
+    db.commit()
+    return len(summaries)
+
+
+def _save(summaries: List[FailureSummary]) -> None:
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        save_login_failures(db, summaries)
+    finally:
+        db.close()
+
+
+async def flush_login_failures() -> None:
+    """Write the failed login summaries so far."""
+    summaries = login_failures.take()
+    if not summaries:
+        return
+    try:
+        await asyncio.to_thread(_save, summaries)
+    except Exception:
+        logger.exception("Writing %d failed login summaries failed", len(summaries))
+
+
+async def run_login_failure_flush_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.LOGIN_FAILURE_SUMMARY_SECONDS)
+        await flush_login_failures()
@@ -0,0 +1,78 @@
+"""
+Thumbnail rendering.
+
+This module runs inside the preview worker processes, so it only imports
+the imaging libraries. Pillow renders images; PDF first pages are rendered
+when the optional PyMuPDF package is installed.
+"""
+from io import BytesIO
+from typing import Union
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - previews are disabled without Pillow
+    Image = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+IMAGE_TYPES = {"image/png", "image/jpeg", "image/gif"}
+PDF_TYPE = "application/pdf"
+PREVIEW_FORMAT = "WEBP"
+PREVIEW_MEDIA_TYPE = "image/webp"
+
+# Refuse decompression bombs well before they exhaust worker memory
+MAX_SOURCE_PIXELS = 50_000_000
+
+
+def available() -> bool:
+    return Image is not None
+
+
+def supports(content_type: str) -> bool:
+    if Image is None:
+        return False
+    if content_type in IMAGE_TYPES:
+        return True
+    return content_type == PDF_TYPE and fitz is not None
+
+
+def _open_image(source: Union[str, bytes], max_dimension: int):
+    image = Image.open(source if isinstance(source, str) else BytesIO(source))
+    if image.width * image.height > MAX_SOURCE_PIXELS:
+        raise ValueError(f"Image too large for preview: {image.width}x{image.height}")
+    # Lets the JPEG decoder downscale while decoding
+    image.draft("RGB", (max_dimension, max_dimension))
+    return image
+
+
+def _render_pdf_page(source: Union[str, bytes], max_dimension: int):
+    document = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+    try:
+        page = document.load_page(0)
+        zoom = max_dimension / max(page.rect.width, page.rect.height)
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    finally:
+        document.close()
+
+
+def render_thumbnail(source: Union[str, bytes], content_type: str, max_dimension: int) -> bytes:
+    """
+    Render a preview that fits in a max_dimension square.
+    `source` is a file path or the file content.
+    """
+    if content_type == PDF_TYPE:
+        image = _render_pdf_page(source, max_dimension)
+    else:
+        image = _open_image(source, max_dimension)
+
+    image.thumbnail((max_dimension, max_dimension))
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    output = BytesIO()
+    image.save(output, PREVIEW_FORMAT, quality=80, method=4)
+    return output.getvalue()
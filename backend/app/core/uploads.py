@@ -0,0 +1,399 @@
+"""
+Streaming attachment uploads.
+
+Request bodies are parsed incrementally and written to a temporary file in
+fixed-size chunks while being hashed and size-checked, so memory per upload
+stays bounded regardless of file size. Finished files are moved into place
+with an atomic rename.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Magic bytes for the allowed extensions
+MAGIC_SIGNATURES = {
+    "pdf": (b"%PDF-",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "gif": (b"GIF87a", b"GIF89a"),
+}
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+}
+
+SNIFF_LENGTH = 16
+
+
+class UploadError(Exception):
+    """Raised when an upload is rejected."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def upload_root() -> Path:
+    return Path(settings.UPLOAD_DIR)
+
+
+def staging_dir() -> Path:
+    path = upload_root() / "tmp"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def file_extension(filename: str) -> str:
+    return Path(filename).suffix.lstrip(".").lower()
+
+
+def check_extension(filename: str) -> str:
+    """Return the extension of an upload filename, rejecting disallowed types."""
+    extension = file_extension(filename)
+    if extension not in settings.ALLOWED_EXTENSIONS:
+        raise UploadError(415, f"File type '.{extension}' is not allowed")
+    return extension
+
+
+def matches_signature(head: bytes, extension: str) -> bool:
+    signatures = MAGIC_SIGNATURES.get(extension)
+    if signatures is None:
+        # No known signature: trust the extension allow-list
+        return True
+    return any(head.startswith(signature) for signature in signatures)
+
+
+@dataclass
+class StagedFile:
+    """A validated upload waiting in the staging directory."""
+    temp_path: Path
+    original_filename: str
+    extension: str
+    size: int
+    sha256: str
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES.get(self.extension, "application/octet-stream")
+
+    def commit(self, destination: Path) -> None:
+        """Atomically move the file into place."""
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.temp_path, destination)
+
+    def discard(self) -> None:
+        self.temp_path.unlink(missing_ok=True)
+
+
+class StreamingFileWriter:
+    """
+    Writes an upload to a staging file chunk by chunk.
+
+    The content is hashed and size-checked as it arrives, and the first bytes
+    are compared against the magic signature of the declared extension.
+    """
+
+    def __init__(self, filename: str, max_size: int):
+        self.original_filename = filename
+        self.extension = check_extension(filename)
+        self.max_size = max_size
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._head = b""
+        fd, path = tempfile.mkstemp(dir=staging_dir(), suffix=".part")
+        self.temp_path = Path(path)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise UploadError(413, f"File exceeds maximum size of {self.max_size} bytes")
+        if len(self._head) < SNIFF_LENGTH:
+            self._head += data[:SNIFF_LENGTH - len(self._head)]
+            if len(self._head) >= SNIFF_LENGTH and not matches_signature(self._head, self.extension):
+                raise UploadError(415, "File content does not match its extension")
+        self._hash.update(data)
+        self._file.write(data)
+
+    def finish(self) -> StagedFile:
+        """Flush the staging file to disk and validate what was received."""
+        if self.size == 0:
+            raise UploadError(400, "Empty file")
+        if not matches_signature(self._head, self.extension):
+            raise UploadError(415, "File content does not match its extension")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        return StagedFile(
+            temp_path=self.temp_path,
+            original_filename=self.original_filename,
+            extension=self.extension,
+            size=self.size,
+            sha256=self._hash.hexdigest(),
+        )
+
+    def abort(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        self.temp_path.unlink(missing_ok=True)
+
+
+class MultipartFileReceiver:
+    """
+    Incremental multipart/form-data parser that streams the first file part
+    into a StreamingFileWriter. Other parts are ignored.
+    """
+
+    def __init__(self, content_type: str, max_size: int, field_name: str = "file"):
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise UploadError(400, "Missing multipart boundary")
+        self.max_size = max_size
+        self.field_name = field_name
+        self.writer: Optional[StreamingFileWriter] = None
+        self._in_file = False
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("latin-1")
+        filename = options.get(b"filename")
+        if self.writer is None and filename is not None and name == self.field_name:
+            self.writer = StreamingFileWriter(Path(filename.decode("utf-8", "replace")).name, self.max_size)
+            self._in_file = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self.writer.write(data[start:end])
+
+    def _on_part_end(self) -> None:
+        self._in_file = False
+
+    def feed(self, chunk: bytes) -> None:
+        self._parser.write(chunk)
+
+    async def receive(self, stream: AsyncIterator[bytes]) -> StagedFile:
+        """Consume the request stream; parsing and disk writes run off the event loop."""
+        try:
+            async for chunk in stream:
+                if chunk:
+                    await run_in_threadpool(self.feed, chunk)
+            self._parser.finalize()
+            if self.writer is None:
+                raise UploadError(400, f"No file provided in form field '{self.field_name}'")
+            return await run_in_threadpool(self.writer.finish)
+        except Exception:
+            if self.writer is not None:
+                self.writer.abort()
+            raise
+
+
+# Resumable uploads
+@dataclass
+class UploadSession:
+    """State of a resumable upload, persisted next to its staging file."""
+    upload_id: str
+    task_id: int
+    user_id: int
+    filename: str
+    size: int
+    created_at: float
+
+    @property
+    def data_path(self) -> Path:
+        return staging_dir() / f"{self.upload_id}.part"
+
+    @property
+    def meta_path(self) -> Path:
+        return staging_dir() / f"{self.upload_id}.json"
+
+    @property
+    def offset(self) -> int:
+        try:
+            return self.data_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def complete(self) -> bool:
+        return self.offset >= self.size
+
+    def save(self) -> None:
+        tmp = self.meta_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(asdict(self)))
+        os.replace(tmp, self.meta_path)
+        self.data_path.touch(exist_ok=True)
+
+    def delete(self) -> None:
+        self.data_path.unlink(missing_ok=True)
+        self.meta_path.unlink(missing_ok=True)
+
+
+def create_upload_session(task_id: int, user_id: int, filename: str, size: int) -> UploadSession:
+    filename = Path(filename).name
+    check_extension(filename)
+    if size <= 0:
+        raise UploadError(400, "Upload size must be positive")
+    if size > settings.MAX_RESUMABLE_UPLOAD_SIZE:
+        raise UploadError(413, f"File exceeds maximum size of {settings.MAX_RESUMABLE_UPLOAD_SIZE} bytes")
+    session = UploadSession(
+        upload_id=uuid.uuid4().hex,
+        task_id=task_id,
+        user_id=user_id,
+        filename=filename,
+        size=size,
+        created_at=time.time(),
+    )
+    session.save()
+    return session
+
+
+def load_upload_session(upload_id: str) -> Optional[UploadSession]:
+    # Upload ids are generated hex strings; anything else cannot name a session
+    if not upload_id.isalnum():
+        return None
+    try:
+        data = json.loads((staging_dir() / f"{upload_id}.json").read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    return UploadSession(**data)
+
+
+# Serializes concurrent PATCH requests for the same upload within a worker
+_session_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def append_chunk(session: UploadSession, offset: int, stream: AsyncIterator[bytes]) -> int:
+    """
+    Append a request body to a resumable upload at the given offset.
+    Returns the new offset.
+    """
+    lock = _session_locks.setdefault(session.upload_id, asyncio.Lock())
+    if lock.locked():
+        raise UploadError(409, "Another chunk for this upload is in progress")
+    async with lock:
+        try:
+            return await _append_chunk(session, offset, stream)
+        finally:
+            _session_locks.pop(session.upload_id, None)
+
+
+async def _append_chunk(session: UploadSession, offset: int, stream: AsyncIterator[bytes]) -> int:
+    if offset != session.offset:
+        raise UploadError(409, f"Upload offset mismatch, expected {session.offset}")
+
+    def write(handle, data: bytes) -> None:
+        handle.write(data)
+
+    written = offset
+    handle = await run_in_threadpool(open, session.data_path, "ab")
+    try:
+        async for chunk in stream:
+            if not chunk:
+                continue
+            written += len(chunk)
+            if written > session.size:
+                raise UploadError(413, "Chunk extends past the declared upload size")
+            await run_in_threadpool(write, handle, chunk)
+    except UploadError:
+        # Drop the partial chunk so the client can retry from the last good offset
+        handle.close()
+        os.truncate(session.data_path, offset)
+        raise
+    finally:
+        if not handle.closed:
+            handle.close()
+    return written
+
+
+def finalize_session(session: UploadSession) -> StagedFile:
+    """
+    Validate and hash a completed resumable upload in place, reading it in
+    fixed-size chunks. The staging file is handed over to the returned
+    StagedFile and the session metadata is removed.
+    """
+    digest = hashlib.sha256()
+    with open(session.data_path, "rb") as handle:
+        head = handle.read(SNIFF_LENGTH)
+        digest.update(head)
+        for chunk in iter(lambda: handle.read(settings.UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    extension = check_extension(session.filename)
+    if not matches_signature(head, extension):
+        session.delete()
+        raise UploadError(415, "File content does not match its extension")
+    session.meta_path.unlink(missing_ok=True)
+    return StagedFile(
+        temp_path=session.data_path,
+        original_filename=session.filename,
+        extension=extension,
+        size=session.size,
+        sha256=digest.hexdigest(),
+    )
+
+
+def purge_stale_uploads(max_age_hours: Optional[int] = None) -> int:
+    """Remove abandoned staging files older than the resumable upload expiry."""
+    max_age = (max_age_hours or settings.RESUMABLE_UPLOAD_EXPIRE_HOURS) * 3600
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in staging_dir().iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+    if removed:
+        logger.info("Purged %d stale upload files", removed)
+    return removed
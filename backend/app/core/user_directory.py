@@ -0,0 +1,145 @@
+"""
+Admin user directory search.
+
+Searches match a case-insensitive prefix of the email, username or full
+name. The users table has an index on lower() of each of those columns, and
+`prefix_match` phrases the condition so the index applies: LIKE 'prefix%'
+on PostgreSQL, where the indexes use text_pattern_ops, and a range between
+the prefix and its successor on SQLite, which never uses an index for LIKE.
+
+For type-ahead, UserPrefixIndex keeps every user's search keys in one
+sorted list in memory and answers with a binary search instead of a
+database round trip. It is optional (USER_SUGGEST_INDEX_ENABLED), rebuilt
+every USER_SUGGEST_INDEX_REFRESH_SECONDS, so new and renamed users show up
+after at most one period, and until the first build completes suggestions
+come from the database.
+"""
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core.config import settings
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLUMNS = (User.email, User.username, User.full_name)
+
+
+class Suggestion(NamedTuple):
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str]
+    is_active: bool
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _successor(prefix: str) -> str:
+    """Smallest string greater than every string that starts with `prefix`."""
+    return prefix[:-1] + chr(min(ord(prefix[-1]) + 1, 0x10FFFF))
+
+
+def prefix_match(column, prefix: str, backend: Optional[str] = None):
+    """Case-insensitive "column starts with prefix", served by the lower(column) index."""
+    backend = backend or make_url(settings.DATABASE_URL).get_backend_name()
+    prefix = prefix.lower()
+    lowered = func.lower(column)
+    if backend == "postgresql":
+        return lowered.like(_escape_like(prefix) + "%", escape="\\")
+    return and_(lowered >= prefix, lowered < _successor(prefix))
+
+
+def search_condition(prefix: str, backend: Optional[str] = None):
+    """Users whose email, username or full name starts with `prefix`."""
+    return or_(*(prefix_match(column, prefix, backend) for column in SEARCH_COLUMNS))
+
+
+def search_keys(username: str, email: str, full_name: Optional[str]) -> set:
+    """Strings a type-ahead prefix is matched against: every word of the name counts."""
+    keys = {username.lower(), email.lower()}
+    if full_name:
+        name = full_name.lower()
+        keys.add(name)
+        keys.update(name.split())
+    return keys
+
+
+class UserPrefixIndex:
+    """
+    Sorted (key, user id) pairs for prefix lookups. A rebuild replaces the
+    whole state in one assignment, so lookups never need a lock.
+    """
+
+    def __init__(self):
+        self._state: Tuple[List[str], List[int], Dict[int, Suggestion]] = ([], [], {})
+        self.built_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def build(self, rows: Iterable[tuple]) -> None:
+        """Replace the contents with `rows` of (id, username, email, full_name, is_active)."""
+        users = {}
+        entries = []
+        for row in rows:
+            user = Suggestion(*row)
+            users[user.id] = user
+            entries.extend((key, user.id) for key in search_keys(user.username, user.email, user.full_name))
+        entries.sort()
+        self._state = ([key for key, _ in entries], [user_id for _, user_id in entries], users)
+        self.built_at = time.monotonic()
+
+    def load(self, db: Session) -> None:
+        start = time.perf_counter()
+        self.build(db.execute(select(User.id, User.username, User.email, User.full_name, User.is_active)).all())
+        logger.info("User suggest index built: %d users in %.0fms", len(self), (time.perf_counter() - start) * 1000)
+
+    def lookup(self, prefix: str, limit: int = 10) -> List[Suggestion]:
+        """Users with a key starting with `prefix`, in key order."""
+        keys, ids, users = self._state
+        prefix = prefix.lower()
+        found: Dict[int, Suggestion] = {}
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and len(found) < limit and keys[position].startswith(prefix):
+            user_id = ids[position]
+            found.setdefault(user_id, users[user_id])
+            position += 1
+        return list(found.values())
+
+    def __len__(self) -> int:
+        return len(self._state[2])
+
+
+user_prefix_index = UserPrefixIndex()
+
+
+def _refresh_index() -> None:
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        user_prefix_index.load(db)
+    finally:
+        db.close()
+
+
+async def run_user_index_refresh_loop() -> None:
+    """Build the suggest index, then rebuild it periodically."""
+    while True:
+        try:
+            await asyncio.to_thread(_refresh_index)
+        except Exception:
+            logger.exception("User suggest index refresh failed")
+        await asyncio.sleep(settings.USER_SUGGEST_INDEX_REFRESH_SECONDS)
@@ -0,0 +1,160 @@
+"""
+Materialized task visibility.
+
+A user sees the tasks they own, the tasks shared with them and the tasks on
+their teams' boards. Evaluating that as owner_id = :me OR id IN (shares) OR
+team_id IN (teams) for every list request keeps the planner from using a
+single index, so the answer is stored instead: task_visibility holds one
+row per (user, task) pair, with the task's created_at, status and priority
+copied in, and a page of a user's tasks is a range scan of
+(user_id, created_at).
+
+The table is derived data. `visible_rows` is the definition, and after
+every flush the rows of each created, deleted or relevantly modified task,
+and of each user who joined or left a team, are deleted and inserted again
+from it, in the same transaction as the change. Writes that bypass the ORM
+session (bulk loads, manual SQL) must rebuild the affected rows;
+`python -m app.tools.visibility check` reports any drift and `rebuild`
+repairs it.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, event, func, insert, inspect, select, union
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import Task, TeamMember
+from app.models.task import task_shares, task_visibility
+
+COLUMNS = ["user_id", "task_id", "created_at", "status", "priority"]
+
+# Task attributes that decide who sees a task, or are copied into its rows
+TRACKED_ATTRIBUTES = ("owner_id", "team_id", "shared_with", "created_at", "status", "priority")
+
+
+def visible_rows(tasks_where, user_id: Optional[int] = None):
+    """
+    (user_id, task_id, created_at, status, priority) for every user who can
+    see a task matching `tasks_where`, optionally only for one user.
+    """
+    copied = (Task.id.label("task_id"), Task.created_at, Task.status, Task.priority)
+    owners = select(Task.owner_id.label("user_id"), *copied).where(tasks_where)
+    shares = select(task_shares.c.user_id, *copied).join(task_shares, task_shares.c.task_id == Task.id).where(tasks_where)
+    members = select(TeamMember.user_id, *copied).join(TeamMember, TeamMember.team_id == Task.team_id).where(tasks_where)
+    if user_id is not None:
+        owners = owners.where(Task.owner_id == user_id)
+        shares = shares.where(task_shares.c.user_id == user_id)
+        members = members.where(TeamMember.user_id == user_id)
+    return union(owners, shares, members)
+
+
+def visible_task_ids(user_id: int):
+    """Ids of the tasks a user can see, as a subquery."""
+    return select(task_visibility.c.task_id).where(task_visibility.c.user_id == user_id)
+
+
+def refresh_tasks(connection: Connection, task_ids: Iterable[int]) -> int:
+    """Recompute the rows of these tasks; deleted tasks lose theirs."""
+    task_ids = sorted(task_ids)
+    connection.execute(delete(task_visibility).where(task_visibility.c.task_id.in_(task_ids)))
+    return connection.execute(
+        insert(task_visibility).from_select(COLUMNS, visible_rows(Task.id.in_(task_ids)))
+    ).rowcount
+
+
+def refresh_membership(connection: Connection, user_id: int, team_id: int) -> int:
+    """Recompute a user's rows for a team's tasks after joining or leaving it."""
+    team_tasks = select(Task.id).where(Task.team_id == team_id)
+    connection.execute(delete(task_visibility).where(
+        task_visibility.c.user_id == user_id,
+        task_visibility.c.task_id.in_(team_tasks),
+    ))
+    return connection.execute(
+        insert(task_visibility).from_select(COLUMNS, visible_rows(Task.team_id == team_id, user_id))
+    ).rowcount
+
+
+def rebuild(connection: Connection, batch_size: int = 10000) -> int:
+    """
+    Recompute every row, one range of task ids per transaction so writers
+    are never blocked for long. Returns the number of rows written.
+    """
+    written = 0
+    last_id = 0
+    while True:
+        task_ids = connection.execute(
+            select(Task.id).where(Task.id > last_id).order_by(Task.id).limit(batch_size)
+        ).scalars().all()
+        if not task_ids:
+            break
+        # The range includes the ids of deleted tasks, so their rows go too
+        in_range = (last_id + 1, task_ids[-1])
+        connection.execute(delete(task_visibility).where(task_visibility.c.task_id.between(*in_range)))
+        written += connection.execute(
+            insert(task_visibility).from_select(COLUMNS, visible_rows(Task.id.between(*in_range)))
+        ).rowcount
+        connection.commit()
+        last_id = task_ids[-1]
+    # Rows of tasks past the last one, deleted without the table knowing
+    connection.execute(delete(task_visibility).where(task_visibility.c.task_id > last_id))
+    connection.commit()
+    return written
+
+
+def check(connection: Connection, sample: int = 10) -> Dict[str, Tuple[int, List[tuple]]]:
+    """
+    Differences between task_visibility and its definition: rows that are
+    missing, rows that should not exist, and rows whose copied columns are
+    stale. Each maps to (count, up to `sample` example rows).
+    """
+    expected = visible_rows(Task.id.isnot(None)).subquery("expected")
+    actual = task_visibility
+    same_pair = and_(actual.c.user_id == expected.c.user_id, actual.c.task_id == expected.c.task_id)
+    queries = {
+        "missing": select(expected).outerjoin(actual, same_pair).where(actual.c.task_id.is_(None)),
+        "unexpected": select(actual).outerjoin(expected, same_pair).where(expected.c.task_id.is_(None)),
+        "stale": select(actual).join(expected, same_pair).where(
+            (actual.c.created_at != expected.c.created_at)
+            | (actual.c.status != expected.c.status)
+            | (actual.c.priority != expected.c.priority)
+        ),
+    }
+    problems = {}
+    for name, query in queries.items():
+        count = connection.execute(select(func.count()).select_from(query.subquery())).scalar()
+        rows = connection.execute(query.limit(sample)).all() if count else []
+        problems[name] = (count, [tuple(row) for row in rows])
+    return problems
+
+
+def _visibility_changed(task: Task) -> bool:
+    state = inspect(task)
+    return any(state.attrs[name].history.has_changes() for name in TRACKED_ATTRIBUTES)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_visibility(session, flush_context):
+    # new, dirty and deleted still describe the flush that just happened
+    task_ids = set()
+    memberships = set()
+    for obj in session.new:
+        if isinstance(obj, Task):
+            task_ids.add(obj.id)
+        elif isinstance(obj, TeamMember):
+            memberships.add((obj.user_id, obj.team_id))
+    for obj in session.dirty:
+        if isinstance(obj, Task) and _visibility_changed(obj):
+            task_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            task_ids.add(obj.id)
+        elif isinstance(obj, TeamMember):
+            memberships.add((obj.user_id, obj.team_id))
+    if not task_ids and not memberships:
+        return
+
+    connection = session.connection()
+    if task_ids:
+        refresh_tasks(connection, task_ids)
+    for user_id, team_id in sorted(memberships):
+        refresh_membership(connection, user_id, team_id)
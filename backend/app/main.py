@@ -5,20 +5,77 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from prometheus_client import make_asgi_app
+from contextlib import asynccontextmanager
+import asyncio
 import time
+import uuid
 import logging
 
 from app.core.config import settings
-from app.core.logging_config import setup_logging
+from app.core.logging_config import setup_logging, start_request_context
 from app.api.v1.api import api_router
-from app.core.database import engine, Base
+from app.core.schema import check_schema, upgrade_schema
+from app.core.query_stats import observe_request, start_query_stats
+from app.core.notifications import notifier, run_reminder_loop
+from app.core.uploads import purge_stale_uploads
+from app.core.storage import run_gc_loop
+from app.core.previews import previews
+from app.core.realtime import hub
+from app.core.cache import cache
+from app.core.revocation import run_revocation_sync_loop
+from app.core.throttle import flush_login_failures, run_login_failure_flush_loop
+from app.core.changes import run_tombstone_purge_loop
+from app.core.replicas import run_replica_probe_loop
+from app.core.user_directory import run_user_index_refresh_loop
 
-# Setup logging
-setup_logging()
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Background tasks started with the application
+background_tasks = []
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup and shutdown. Nothing here runs at import time, so importing the
+    app (workers, tests, --reload) never connects to the database; the schema
+    itself is created by Alembic migrations, not by the application.
+    """
+    setup_logging()
+    logger.info("Starting %s in %s mode", settings.APP_NAME, settings.ENVIRONMENT)
+    logger.info("API documentation available at %s/docs", settings.API_V1_STR)
+    
+    if settings.DB_AUTO_MIGRATE:
+        await asyncio.to_thread(upgrade_schema)
+    await asyncio.to_thread(check_schema)
+    
+    await asyncio.to_thread(purge_stale_uploads)
+    background_tasks.append(asyncio.create_task(run_gc_loop()))
+    background_tasks.append(asyncio.create_task(run_tombstone_purge_loop()))
+    background_tasks.append(asyncio.create_task(run_replica_probe_loop()))
+    background_tasks.append(asyncio.create_task(run_revocation_sync_loop()))
+    background_tasks.append(asyncio.create_task(run_login_failure_flush_loop()))
+    if settings.USER_SUGGEST_INDEX_ENABLED:
+        background_tasks.append(asyncio.create_task(run_user_index_refresh_loop()))
+    
+    await hub.start()
+    await notifier.start()
+    if notifier.enabled:
+        background_tasks.append(asyncio.create_task(run_reminder_loop()))
+    
+    yield
+    
+    logger.info("Shutting down %s", settings.APP_NAME)
+    
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    await flush_login_failures()
+    await notifier.stop()
+    await previews.shutdown()
+    await hub.stop()
+    await cache.close()
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -28,6 +85,7 @@ app = FastAPI(
     docs_url=f"{settings.API_V1_STR}/docs",
     redoc_url=f"{settings.API_V1_STR}/redoc",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Security Middleware - Trusted Host
@@ -43,7 +101,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-Total-Count"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "X-Request-ID", "X-DB-Queries", "X-DB-Time", "Retry-After"],
 )
 
 
@@ -51,13 +109,31 @@ app.add_middleware(
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     start_time = time.time()
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    log_context = start_request_context(request_id, request.scope)
+    db_stats = start_query_stats(f"{request.method} {request.url.path}")
     response = await call_next(request)
     process_time = time.time() - start_time
     response.headers["X-Process-Time"] = str(process_time)
+    response.headers["X-Request-ID"] = request_id
+    response.headers["X-DB-Queries"] = str(db_stats.count)
+    response.headers["X-DB-Time"] = f"{db_stats.duration * 1000:.3f}"
+    
+    # Route template, not the raw path, keeps metric labels bounded
+    route = log_context.route or "unmatched"
+    observe_request(db_stats, request.method, route)
     
     # Log request
     logger.info(
-        f"{request.method} {request.url.path} - {response.status_code} - {process_time:.3f}s"
+        "%s %s - %s - %.3fs - %d queries %.1fms",
+        request.method, request.url.path, response.status_code, process_time,
+        db_stats.count, db_stats.duration * 1000,
+        extra={
+            "method": request.method,
+            "status_code": response.status_code,
+            "latency_ms": round(process_time * 1000, 3),
+            "db_queries": db_stats.count,
+        },
     )
     return response
 
@@ -79,7 +155,7 @@ async def add_security_headers(request: Request, call_next):
 # Exception handlers
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
-    logger.error(f"HTTP error: {exc.detail}")
+    logger.error("HTTP error: %s", exc.detail)
     return JSONResponse(
         status_code=exc.status_code,
         content={
@@ -87,12 +163,13 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
             "message": exc.detail,
             "data": None
         },
+        headers=getattr(exc, "headers", None),
     )
 
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    logger.error(f"Validation error: {exc.errors()}")
+    logger.error("Validation error: %s", exc.errors())
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
@@ -105,7 +182,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    logger.exception(f"Unhandled exception: {str(exc)}")
+    logger.exception("Unhandled exception: %s", exc)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
@@ -136,19 +213,6 @@ app.mount("/metrics", metrics_app)
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info(f"Starting {settings.APP_NAME} in {settings.ENVIRONMENT} mode")
-    logger.info(f"API documentation available at {settings.API_V1_STR}/docs")
-
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info(f"Shutting down {settings.APP_NAME}")
-
-
 # Root endpoint
 @app.get("/", tags=["Root"])
 async def root():
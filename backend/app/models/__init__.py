@@ -1,8 +1,11 @@
 from app.models.user import User, UserRole
 from app.models.task import Task, TaskPriority, TaskStatus
+from app.models.blob import Blob
 from app.models.attachment import Attachment
 from app.models.audit import ActivityLog, SecurityEvent
 from app.models.team import Team, TeamMember, TeamRole
+from app.models.sync import SyncState, TaskTombstone
+from app.models.replica import ReplicaHeartbeat
 
 __all__ = [
     "User",
@@ -11,9 +14,13 @@ __all__ = [
     "TaskPriority",
     "TaskStatus",
     "Attachment",
+    "Blob",
     "ActivityLog",
     "SecurityEvent",
     "Team",
     "TeamMember",
     "TeamRole",
+    "SyncState",
+    "TaskTombstone",
+    "ReplicaHeartbeat",
 ]
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, BigInteger, event, update, case
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from app.core.config import settings
 from app.core.database import Base
+from app.models.blob import Blob
 
 
 class Attachment(Base):
@@ -12,9 +14,10 @@ class Attachment(Base):
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
     original_filename = Column(String(255), nullable=False)
-    file_path = Column(String(500), nullable=False)
+    file_path = Column(String(500), nullable=False)  # Storage key of the blob
     file_type = Column(String(50), nullable=False)
     file_size = Column(BigInteger, nullable=False)  # Size in bytes
+    content_hash = Column(String(64), ForeignKey("blobs.sha256"), nullable=True, index=True)  # SHA-256 hex digest
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -24,6 +27,40 @@ class Attachment(Base):
     
     # Relationships
     task = relationship("Task", back_populates="attachments")
+    blob = relationship("Blob", back_populates="attachments")
     
+    @property
+    def preview_url(self):
+        """URL of the generated preview, once one is ready."""
+        if self.blob is not None and self.blob.preview_status == "ready":
+            return f"{settings.API_V1_STR}/attachments/{self.id}/preview"
+        return None
+
     def __repr__(self):
         return f"<Attachment {self.original_filename}>"
+
+
+# Blob reference counting. These run inside the flush, so the count changes
+# commit or roll back together with the attachment rows, including rows
+# removed through ORM cascades from tasks and users.
+@event.listens_for(Attachment, "after_insert")
+def _increment_blob_refs(mapper, connection, target):
+    if target.content_hash:
+        connection.execute(
+            update(Blob)
+            .where(Blob.sha256 == target.content_hash)
+            .values(ref_count=Blob.ref_count + 1, unreferenced_at=None)
+        )
+
+
+@event.listens_for(Attachment, "after_delete")
+def _decrement_blob_refs(mapper, connection, target):
+    if target.content_hash:
+        connection.execute(
+            update(Blob)
+            .where(Blob.sha256 == target.content_hash)
+            .values(
+                ref_count=Blob.ref_count - 1,
+                unreferenced_at=case((Blob.ref_count <= 1, func.now()), else_=None),
+            )
+        )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -8,10 +8,14 @@ class ActivityLog(Base):
     """Activity log model for audit trail."""
     
     __tablename__ = "activity_logs"
+    __table_args__ = (
+        # A user's activity, and SET NULL when the user is deleted
+        Index("ix_activity_logs_user_id_created_at", "user_id", "created_at"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    action = Column(String(100), nullable=False, index=True)  # CREATE, UPDATE, DELETE, etc.
-    entity_type = Column(String(50), nullable=False, index=True)  # Task, User, etc.
+    id = Column(Integer, primary_key=True)
+    action = Column(String(100), nullable=False)  # CREATE, UPDATE, DELETE, etc.
+    entity_type = Column(String(50), nullable=False)  # Task, User, etc.
     entity_id = Column(Integer, nullable=True)
     description = Column(Text, nullable=True)
     changes = Column(JSON, nullable=True)  # Store before/after values
@@ -35,10 +39,15 @@ class SecurityEvent(Base):
     """Security event model for tracking security-related activities."""
     
     __tablename__ = "security_events"
+    __table_args__ = (
+        # Events of some severities, newest first (dashboard alerts, event list)
+        Index("ix_security_events_severity_created_at", "severity", "created_at"),
+        Index("ix_security_events_user_id_created_at", "user_id", "created_at"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     event_type = Column(String(100), nullable=False, index=True)  # LOGIN_SUCCESS, LOGIN_FAILED, etc.
-    severity = Column(String(20), nullable=False, index=True)  # INFO, WARNING, CRITICAL
+    severity = Column(String(20), nullable=False)  # INFO, WARNING, CRITICAL
     description = Column(Text, nullable=True)
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(String(500), nullable=True)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class Blob(Base):
+    """Content-addressed file stored once and shared by attachments."""
+
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)  # Size in bytes
+    content_type = Column(String(100), nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)  # Attachments pointing at this blob
+    preview_status = Column(String(20), nullable=True)  # ready, failed, unsupported; NULL until generated
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    unreferenced_at = Column(DateTime(timezone=True), nullable=True, index=True)  # When ref_count dropped to 0
+
+    # Relationships
+    attachments = relationship("Attachment", back_populates="blob")
+
+    def __repr__(self):
+        return f"<Blob {self.sha256[:12]} refs={self.ref_count}>"
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, BigInteger
+from app.core.database import Base
+
+
+class ReplicaHeartbeat(Base):
+    """Single-row counter the replica probe advances on the primary to measure replication lag."""
+
+    __tablename__ = "replica_heartbeat"
+
+    id = Column(Integer, primary_key=True)
+    beat = Column(BigInteger, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<ReplicaHeartbeat beat={self.beat}>"
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, DateTime, BigInteger, Index, Sequence
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+# Delta sync sequence numbers on PostgreSQL; other databases count in sync_state.change_seq
+TASK_CHANGE_SEQ = Sequence("task_change_seq", metadata=Base.metadata)
+
+
+class SyncState(Base):
+    """Single-row counter that orders task changes for delta sync."""
+
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True)
+    change_seq = Column(BigInteger, default=0, nullable=False)  # Last sequence number handed out (not PostgreSQL)
+    purged_seq = Column(BigInteger, default=0, nullable=False)  # Tombstones up to here have been purged
+
+    def __repr__(self):
+        return f"<SyncState seq={self.change_seq}>"
+
+
+class TaskTombstone(Base):
+    """
+    Record that a task stopped being visible to a user or team: deleted,
+    unshared or moved off a team. A row without task_id records the user
+    leaving the team, which invalidates their synced team tasks.
+    """
+
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_user_id_change_seq", "user_id", "change_seq"),
+        Index("ix_task_tombstones_team_id_change_seq", "team_id", "change_seq"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=True)  # No foreign key: the task may be gone
+    user_id = Column(Integer, nullable=True)
+    team_id = Column(Integer, nullable=True)
+    change_seq = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<TaskTombstone task={self.task_id} seq={self.change_seq}>"
@@ -1,6 +1,6 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Enum as SQLEnum, ForeignKey, Table
+from sqlalchemy import Boolean, Column, Integer, BigInteger, String, DateTime, Text, Enum as SQLEnum, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.core.database import Base
 import enum
 
@@ -11,7 +11,9 @@ task_shares = Table(
     Base.metadata,
     Column('task_id', Integer, ForeignKey('tasks.id', ondelete="CASCADE"), primary_key=True),
     Column('user_id', Integer, ForeignKey('users.id', ondelete="CASCADE"), primary_key=True),
-    Column('created_at', DateTime(timezone=True), server_default=func.now())
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    # The primary key leads with task_id; task visibility looks shares up by user
+    Index("ix_task_shares_user_id_task_id", "user_id", "task_id"),
 )
 
 
@@ -36,9 +38,22 @@ class Task(Base):
     """Task model for task management."""
     
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_owner_id_change_seq", "owner_id", "change_seq"),
+        # Task lists: a user's or a team's tasks newest first, optionally by
+        # status (read backwards for ORDER BY created_at DESC)
+        Index("ix_tasks_owner_id_created_at", "owner_id", "created_at"),
+        Index("ix_tasks_owner_id_status_created_at", "owner_id", "status", "created_at"),
+        Index("ix_tasks_team_id_created_at", "team_id", "created_at"),
+        # The reminder loop only looks at reminders not sent yet
+        Index(
+            "ix_tasks_reminder_date_pending", "reminder_date",
+            sqlite_where=text("reminder_sent_at IS NULL"), postgresql_where=text("reminder_sent_at IS NULL"),
+        ),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    title = Column(String(255), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     priority = Column(SQLEnum(TaskPriority), default=TaskPriority.MEDIUM, nullable=False, index=True)
     status = Column(SQLEnum(TaskStatus), default=TaskStatus.TODO, nullable=False, index=True)
@@ -48,17 +63,21 @@ class Task(Base):
     # Dates
     due_date = Column(DateTime(timezone=True), nullable=True)
     reminder_date = Column(DateTime(timezone=True), nullable=True)
+    reminder_sent_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    change_seq = Column(BigInteger, default=0, server_default="0", nullable=False, index=True)  # Delta sync position
     
     # Foreign Keys
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    team_id = Column(Integer, ForeignKey("teams.id", ondelete="SET NULL"), nullable=True)
     
     # Relationships
     owner = relationship("User", back_populates="tasks")
+    team = relationship("Team", back_populates="tasks")
     attachments = relationship("Attachment", back_populates="task", cascade="all, delete-orphan")
     
     # Shared with users
@@ -70,3 +89,21 @@ class Task(Base):
     
     def __repr__(self):
         return f"<Task {self.title}>"
+
+
+# One row per task a user can see: owned, shared with them or on one of their
+# teams. Derived from tasks, task_shares and team_members and maintained by
+# app.core.visibility, so task lists are one index range scan per user.
+task_visibility = Table(
+    'task_visibility',
+    Base.metadata,
+    Column('user_id', Integer, ForeignKey('users.id', ondelete="CASCADE"), primary_key=True),
+    Column('task_id', Integer, ForeignKey('tasks.id', ondelete="CASCADE"), primary_key=True),
+    # Copies of the task's columns that lists filter and sort on
+    Column('created_at', DateTime(timezone=True), nullable=False),
+    Column('status', SQLEnum(TaskStatus), nullable=False),
+    Column('priority', SQLEnum(TaskPriority), nullable=False),
+    Index("ix_task_visibility_user_id_created_at", "user_id", "created_at"),
+    Index("ix_task_visibility_user_id_status_created_at", "user_id", "status", "created_at"),
+    Index("ix_task_visibility_task_id", "task_id"),
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Enum as SQLEnum, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -13,11 +13,16 @@ class TeamRole(str, enum.Enum):
 class TeamMember(Base):
     """Association model for Team and User with role."""
     __tablename__ = "team_members"
+    __table_args__ = (
+        # The primary key leads with team_id; task visibility looks teams up by user
+        Index("ix_team_members_user_id_team_id", "user_id", "team_id"),
+    )
 
     team_id = Column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
     role = Column(SQLEnum(TeamRole), default=TeamRole.MEMBER, nullable=False)
     joined_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    change_seq = Column(BigInteger, default=0, server_default="0", nullable=False)  # Delta sync position of the join
 
     # Relationships
     team = relationship("Team", back_populates="members")
@@ -35,6 +40,7 @@ class Team(Base):
 
     # Relationships
     members = relationship("TeamMember", back_populates="team", cascade="all, delete-orphan")
+    tasks = relationship("Task", back_populates="team", passive_deletes=True)
     
     def __repr__(self):
         return f"<Team {self.name}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -17,7 +17,7 @@ class User(Base):
     
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
     username = Column(String(100), unique=True, index=True, nullable=False)
     full_name = Column(String(255), nullable=True)
@@ -51,3 +51,13 @@ class User(Base):
     
     def __repr__(self):
         return f"<User {self.username}>"
+
+
+# Case-insensitive prefix search in the admin user directory; on PostgreSQL
+# text_pattern_ops lets LIKE 'prefix%' use the index under any collation
+Index("ix_users_lower_email", func.lower(User.email).label("lower_email"),
+      postgresql_ops={"lower_email": "text_pattern_ops"})
+Index("ix_users_lower_username", func.lower(User.username).label("lower_username"),
+      postgresql_ops={"lower_username": "text_pattern_ops"})
+Index("ix_users_lower_full_name", func.lower(User.full_name).label("lower_full_name"),
+      postgresql_ops={"lower_full_name": "text_pattern_ops"})
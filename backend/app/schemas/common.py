@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Any
 from datetime import datetime
 
@@ -72,6 +72,8 @@ class Attachment(BaseModel):
     original_filename: str
     file_type: str
     file_size: int
+    content_hash: Optional[str] = None
+    preview_url: Optional[str] = None
     created_at: datetime
     task_id: int
     
@@ -79,6 +81,22 @@ class Attachment(BaseModel):
         from_attributes = True
 
 
+class UploadSessionCreate(BaseModel):
+    """Schema for starting a resumable upload."""
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0)
+
+
+class UploadStatus(BaseModel):
+    """Schema for resumable upload progress."""
+    upload_id: str
+    filename: str
+    offset: int
+    size: int
+    complete: bool = False
+    attachment: Optional[Attachment] = None
+
+
 # Common response schema
 class ResponseModel(BaseModel):
     """Standard API response model."""
@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field, validator
 from typing import Optional, List
 from datetime import datetime
 from app.models.task import TaskPriority, TaskStatus
+from app.schemas.common import Attachment
 
 
 # Simple user schema for task owner/shared users
@@ -25,6 +26,7 @@ class TaskBase(BaseModel):
     tags: Optional[str] = None
     due_date: Optional[datetime] = None
     reminder_date: Optional[datetime] = None
+    team_id: Optional[int] = None
 
 
 # Request schemas
@@ -43,6 +45,7 @@ class TaskUpdate(BaseModel):
     tags: Optional[str] = None
     due_date: Optional[datetime] = None
     reminder_date: Optional[datetime] = None
+    team_id: Optional[int] = None
 
 
 class TaskStatusUpdate(BaseModel):
@@ -64,7 +67,9 @@ class Task(TaskBase):
     updated_at: Optional[datetime]
     completed_at: Optional[datetime]
     owner_id: int
+    change_seq: int = 0
     shared_with: List[UserSimple] = []
+    attachments: List[Attachment] = []
     
     class Config:
         from_attributes = True
@@ -84,5 +89,24 @@ class TaskList(BaseModel):
     total_pages: int
 
 
+class TaskTombstone(BaseModel):
+    """A task that was deleted or is no longer visible to the user."""
+    task_id: int
+    change_seq: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class TaskChanges(BaseModel):
+    """Schema for a page of delta sync changes."""
+    items: List[Task]
+    tombstones: List[TaskTombstone] = []
+    cursor: Optional[str] = None
+    has_more: bool = False
+    reset: bool = False  # The cursor can't be served; drop local state and sync from scratch
+
+
 # Update forward references
 TaskWithOwner.model_rebuild()
@@ -34,6 +34,13 @@ class TeamMember(TeamMemberBase):
     class Config:
         from_attributes = True
 
+class TeamMemberList(BaseModel):
+    items: List[TeamMember]
+    total: int
+    page: int
+    page_size: int
+    total_pages: int
+
 # Response schemas
 class Team(TeamBase):
     id: int
@@ -56,4 +63,5 @@ class UserSimple(BaseModel):
 
 # Update forward refs
 TeamMember.model_rebuild()
+TeamMemberList.model_rebuild()
 Team.model_rebuild()
@@ -89,6 +89,18 @@ class UserProfile(User):
     updated_at: Optional[datetime]
 
 
+class UserSuggestion(BaseModel):
+    """Schema for a user directory type-ahead suggestion."""
+    id: int
+    username: str
+    email: str
+    full_name: Optional[str]
+    is_active: bool
+    
+    class Config:
+        from_attributes = True
+
+
 # Token schemas
 class Token(BaseModel):
     """Schema for authentication token response."""
@@ -106,3 +118,4 @@ class TokenPayload(BaseModel):
     """Schema for token payload."""
     sub: Optional[int] = None
     type: Optional[str] = None
+    jti: Optional[str] = None
@@ -0,0 +1,3 @@
+"""
+Operational command-line tools, run as `python -m app.tools.<name>`.
+"""
@@ -0,0 +1,305 @@
+"""
+Query-plan checks for the hot queries.
+
+CATALOGUE names the queries the application runs most, built the same way
+the endpoints build them. For each one, `explain` asks the database for its
+plan (EXPLAIN QUERY PLAN on SQLite, EXPLAIN (FORMAT JSON) on PostgreSQL),
+reduces it to stable text lines without costs or row estimates, and lists
+the tables and indexes it touches. `check` then compares the plan with the
+query's expectations: every expected index is used, and no large table is
+scanned from end to end, except for an index the query walks in order to
+serve ORDER BY ... LIMIT.
+
+Run it against a seeded database (see app.tools.seed); planners choose
+differently on empty tables. Saving the plans and checking against them
+later prints a unified diff for every plan that changed:
+
+    python -m app.tools.explain --url sqlite:///./scale.db --save plans.json
+    python -m app.tools.explain --url sqlite:///./scale.db --baseline plans.json
+
+The exit status is 1 when an expectation fails or a plan differs from the
+baseline.
+"""
+import argparse
+import difflib
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+
+from app.api.deps import visible_tasks_filter
+from app.core.config import settings
+from app.core.database import create_db_engine
+from app.core.user_directory import search_condition
+from app.models import ActivityLog, Task, TeamMember, User
+from app.models.task import task_shares, task_visibility
+
+# Tables that grow with usage; scanning one of them is never acceptable
+LARGE_TABLES = {"users", "tasks", "task_shares", "team_members", "activity_logs", "security_events", "task_tombstones"}
+
+# Any of these serves "user_id = ?"; which one a planner picks depends on
+# its statistics and, between equals, on the order the indexes were created
+VISIBILITY_USER_INDEXES = (
+    "task_visibility_pkey", "ix_task_visibility_user_id_created_at", "ix_task_visibility_user_id_status_created_at",
+)
+
+
+@dataclass
+class NamedQuery:
+    name: str
+    description: str
+    build: Callable[[dict], object]  # Sample parameters -> SQLAlchemy statement
+    indexes: Tuple[Union[str, Tuple[str, ...]], ...] = ()  # Each must appear in the plan; a tuple lists alternatives
+    ordered_scan: Optional[str] = None  # Index the query may walk in order under a LIMIT
+
+
+@dataclass
+class Access:
+    table: str
+    index: Optional[str]  # None for a table scan
+    search: bool  # Looked up by key, as opposed to read from end to end
+
+
+@dataclass
+class Plan:
+    lines: List[str]
+    accesses: List[Access] = field(default_factory=list)
+
+    @property
+    def indexes(self) -> Set[str]:
+        return {access.index for access in self.accesses if access.index}
+
+
+CATALOGUE = [
+    NamedQuery(
+        "tasks_visible_page",
+        "GET /tasks first page: owned, shared and team tasks, newest first",
+        lambda p: select(Task).join(task_visibility, task_visibility.c.task_id == Task.id)
+        .where(task_visibility.c.user_id == p["user_id"])
+        .order_by(task_visibility.c.created_at.desc()).limit(20),
+        indexes=("ix_task_visibility_user_id_created_at", "tasks_pkey"),
+    ),
+    NamedQuery(
+        "tasks_visible_count",
+        "GET /tasks total count",
+        lambda p: select(func.count()).select_from(task_visibility).where(task_visibility.c.user_id == p["user_id"]),
+        indexes=(VISIBILITY_USER_INDEXES,),
+    ),
+    NamedQuery(
+        "tasks_visible_status_page",
+        "GET /tasks?status=... first page",
+        lambda p: select(Task).join(task_visibility, task_visibility.c.task_id == Task.id)
+        .where(task_visibility.c.user_id == p["user_id"], task_visibility.c.status == "TODO")
+        .order_by(task_visibility.c.created_at.desc()).limit(20),
+        indexes=("ix_task_visibility_user_id_status_created_at", "tasks_pkey"),
+    ),
+    NamedQuery(
+        "task_changes_page",
+        "GET /tasks/changes page: visible tasks changed after a cursor",
+        lambda p: select(Task).where(visible_tasks_filter(User(id=p["user_id"])), Task.change_seq > 0)
+        .order_by(Task.change_seq, Task.id).limit(100),
+        indexes=(VISIBILITY_USER_INDEXES,),
+    ),
+    NamedQuery(
+        "team_tasks_page",
+        "GET /teams/{id}/tasks first page",
+        lambda p: select(Task).where(Task.team_id == p["team_id"]).order_by(Task.created_at.desc()).limit(20),
+        indexes=("ix_tasks_team_id_created_at",),
+    ),
+    NamedQuery(
+        "shares_of_user",
+        "Tasks shared with a user, the semi-join inside the visibility filter",
+        lambda p: select(task_shares.c.task_id).where(task_shares.c.user_id == p["user_id"]),
+        indexes=("ix_task_shares_user_id_task_id",),
+    ),
+    NamedQuery(
+        "shared_with_of_tasks",
+        "Users a page of tasks is shared with (loading Task.shared_with)",
+        lambda p: select(User).join(task_shares, task_shares.c.user_id == User.id)
+        .where(task_shares.c.task_id.in_(p["task_ids"])),
+        indexes=("task_shares_pkey", "users_pkey"),
+    ),
+    NamedQuery(
+        "login_by_username",
+        "POST /auth/login user lookup",
+        lambda p: select(User).where(User.username == p["username"]),
+        indexes=("ix_users_username",),
+    ),
+    NamedQuery(
+        "user_directory_search",
+        "GET /admin/users?q=... first page, searching by prefix",
+        lambda p: select(User).where(search_condition(p["username"], p["backend"])).order_by(User.id).limit(100),
+        indexes=("ix_users_lower_email", "ix_users_lower_username", "ix_users_lower_full_name"),
+    ),
+    NamedQuery(
+        "audit_log_page",
+        "GET /admin/audit-logs third page, newest first",
+        lambda p: select(ActivityLog).order_by(ActivityLog.created_at.desc()).offset(40).limit(20),
+        ordered_scan="ix_activity_logs_created_at",
+    ),
+]
+
+
+def sample_parameters(connection: Connection) -> dict:
+    """Representative values from the data: the busiest user, team and tasks."""
+    user_id = connection.execute(
+        select(Task.owner_id).group_by(Task.owner_id).order_by(func.count().desc()).limit(1)
+    ).scalar() or 1
+    team_id = connection.execute(
+        select(TeamMember.team_id).group_by(TeamMember.team_id).order_by(func.count().desc()).limit(1)
+    ).scalar() or 1
+    task_ids = connection.execute(
+        select(Task.id).where(Task.owner_id == user_id).order_by(Task.id.desc()).limit(20)
+    ).scalars().all() or [1]
+    username = connection.execute(select(User.username).where(User.id == user_id)).scalar() or "user1"
+    return {
+        "user_id": user_id, "team_id": team_id, "task_ids": task_ids, "username": username,
+        "backend": connection.dialect.name,
+    }
+
+
+_SQLITE_ACCESS = re.compile(
+    r"^(SCAN|SEARCH) (?:TABLE )?(\w+)(?: AS \w+)?"
+    r"(?: USING (?:(?:COVERING )?INDEX (\w+)|INTEGER PRIMARY KEY))?"
+)
+
+
+def _index_name(table: str, index: Optional[str], detail: str) -> Optional[str]:
+    # Name primary key lookups the way PostgreSQL does, so expectations
+    # hold on both backends
+    if index is None:
+        return f"{table}_pkey" if "PRIMARY KEY" in detail else None
+    if index.startswith("sqlite_autoindex_"):
+        return f"{table}_pkey"
+    return index
+
+
+def _explain_sqlite(connection: Connection, sql: str) -> Plan:
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    depth = {0: -1}
+    plan = Plan(lines=[])
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        plan.lines.append("  " * depth[node_id] + detail)
+        match = _SQLITE_ACCESS.match(detail)
+        if match:
+            kind, table, index = match.groups()
+            plan.accesses.append(Access(table, _index_name(table, index, detail), kind == "SEARCH"))
+    return plan
+
+
+def _explain_postgresql(connection: Connection, sql: str) -> Plan:
+    document = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    if isinstance(document, str):
+        document = json.loads(document)
+    plan = Plan(lines=[])
+
+    def walk(node: dict, depth: int) -> None:
+        line = node["Node Type"]
+        table, index = node.get("Relation Name"), node.get("Index Name")
+        if table:
+            line += f" on {table}"
+        if index:
+            line += f" using {index}"
+        condition = node.get("Index Cond") or node.get("Recheck Cond")
+        if condition:
+            line += f" ({condition})"
+        plan.lines.append("  " * depth + line)
+        if node["Node Type"] == "Seq Scan":
+            plan.accesses.append(Access(table, None, False))
+        elif index and node["Node Type"] in ("Index Scan", "Index Only Scan", "Bitmap Index Scan"):
+            # Bitmap index scans name no relation; the heap scan above them does
+            plan.accesses.append(Access(table or _index_table(connection, index), index, bool(condition)))
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(document[0]["Plan"], 0)
+    return plan
+
+
+def _index_table(connection: Connection, index: str) -> Optional[str]:
+    return connection.exec_driver_sql(
+        "SELECT tablename FROM pg_indexes WHERE indexname = %(index)s", {"index": index}
+    ).scalar()
+
+
+def explain(connection: Connection, query: NamedQuery, parameters: dict) -> Plan:
+    statement = query.build(parameters)
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "postgresql":
+        return _explain_postgresql(connection, sql)
+    return _explain_sqlite(connection, sql)
+
+
+def check(query: NamedQuery, plan: Plan) -> List[str]:
+    """Ways in which `plan` breaks the query's expectations."""
+    problems = []
+    for expected in query.indexes:
+        alternatives = (expected,) if isinstance(expected, str) else expected
+        if not plan.indexes.intersection(alternatives):
+            problems.append(f"expected index {' or '.join(alternatives)} is not used")
+    for access in plan.accesses:
+        if access.search or access.table not in LARGE_TABLES:
+            continue
+        if access.index is not None and access.index == query.ordered_scan:
+            continue
+        how = f"index {access.index}" if access.index else "the table"
+        problems.append(f"full scan of {access.table} through {how}")
+    return problems
+
+
+def diff(name: str, baseline: List[str], current: List[str]) -> str:
+    return "".join(
+        line + "\n" for line in difflib.unified_diff(baseline, current, f"{name} (baseline)", f"{name} (current)", lineterm="")
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Database URL (default: DATABASE_URL)")
+    parser.add_argument("--query", action="append", help="Only this query; may be repeated")
+    parser.add_argument("--save", help="Write the plans to this file")
+    parser.add_argument("--baseline", help="Diff the plans against a file written with --save")
+    args = parser.parse_args(argv)
+
+    queries = [query for query in CATALOGUE if not args.query or query.name in args.query]
+    engine = create_db_engine(args.url or settings.DATABASE_URL, name="explain", echo=False)
+    with engine.connect() as connection:
+        parameters = sample_parameters(connection)
+        plans: Dict[str, Plan] = {query.name: explain(connection, query, parameters) for query in queries}
+        dialect = connection.dialect.name
+    engine.dispose()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["plans"]
+
+    failed = False
+    for query in queries:
+        plan = plans[query.name]
+        problems = check(query, plan)
+        print(f"{query.name}: {query.description}")
+        print("\n".join(f"    {line}" for line in plan.lines))
+        for problem in problems:
+            print(f"  FAIL {problem}")
+        if query.name in baseline and baseline[query.name] != plan.lines:
+            print(f"  CHANGED since {args.baseline}:")
+            print(diff(query.name, baseline[query.name], plan.lines), end="")
+            failed = True
+        failed = failed or bool(problems)
+        print()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"dialect": dialect, "plans": {name: plan.lines for name, plan in plans.items()}}, f, indent=2)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Synthetic dataset generator for scale testing.
+
+Fills a migrated database with users, teams, team memberships, tasks,
+shares and activity log rows, straight through SQLAlchemy Core bulk
+inserts (or COPY on PostgreSQL) rather than the ORM or the API:
+
+    python -m app.tools.seed --users 100000 --tasks 10000000
+    python -m app.tools.seed --url sqlite:///./scale.db --migrate --tasks 1000000
+    python -m app.tools.seed --url postgresql://... --method copy --seed 7
+
+The data is skewed the way real usage is:
+
+- tasks per user follow a Zipf law (--skew), so a few users own a large
+  share of all tasks and most own a handful;
+- team sizes and share fan-out are Pareto distributed;
+- status, priority, category and due dates follow fixed mixes, and every
+  task gets a CREATE activity row plus further rows up to --audit-rows.
+
+The same --seed, --now and options produce the same rows. Rows are
+appended after whatever the database already holds; every user can log in
+with --password (hashed once). Sequence numbers for delta sync are reserved
+up front, so synced clients see the new tasks, and reminders that are
+already due are marked as sent so the reminder loop does not wake up to
+millions of them. The task_visibility table is rebuilt at the end.
+"""
+import argparse
+import bisect
+import csv
+import io
+import itertools
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import JSON, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.changes import allocate_sequence
+from app.core.config import settings
+from app.core.database import create_db_engine
+from app.core.schema import SCHEMA_REVISION, current_revision, upgrade_schema
+from app.core.security import security
+from app.core.visibility import rebuild as rebuild_visibility
+from app.models import ActivityLog, Task, TaskPriority, TaskStatus, Team, TeamMember, TeamRole, User
+from app.models.task import task_shares, task_visibility
+
+STATUS_MIX = {
+    TaskStatus.TODO: 40, TaskStatus.IN_PROGRESS: 20, TaskStatus.REVIEW: 5,
+    TaskStatus.COMPLETED: 30, TaskStatus.CANCELLED: 5,
+}
+PRIORITY_MIX = {TaskPriority.LOW: 30, TaskPriority.MEDIUM: 45, TaskPriority.HIGH: 20, TaskPriority.CRITICAL: 5}
+CATEGORIES = [None, "work", "personal", "errands", "finance", "health", "learning", "home"]
+TAGS = [None, "urgent", "later", "blocked", "review,q3", "customer", "ops,oncall", "idea"]
+TITLES = [
+    "Write report", "Review pull request", "Call supplier", "Plan sprint", "Fix login bug",
+    "Update documentation", "Prepare slides", "Pay invoice", "Book flights", "Renew certificate",
+]
+DESCRIPTIONS = [
+    None, "Follow up by email afterwards.", "See the notes from the last meeting for details.",
+    "Blocked until the vendor replies. Check again on Monday and escalate if there is still no answer.",
+]
+ACTION_MIX = {"UPDATE": 50, "UPDATE_STATUS": 35, "SHARE": 10, "ATTACH": 5}
+
+# Parents before children, so foreign keys hold at every commit
+TABLE_ORDER = [User.__table__, Team.__table__, TeamMember.__table__, Task.__table__, task_shares, ActivityLog.__table__]
+
+
+def zipf_counts(total: int, n: int, skew: float, rng: random.Random) -> List[int]:
+    """Split `total` over `n` slots with Zipf weights, in random slot order."""
+    if n == 0:
+        return []
+    weights = [rank ** -skew for rank in range(1, n + 1)]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    for rank in range(total - sum(counts)):
+        counts[rank % n] += 1
+    rng.shuffle(counts)
+    return counts
+
+
+def mix_sampler(mix: dict, rng: random.Random):
+    values = list(mix)
+    cumulative = list(itertools.accumulate(mix.values()))
+    total = cumulative[-1]
+    return lambda: values[bisect.bisect_right(cumulative, rng.random() * total)]
+
+
+class InsertWriter:
+    """Core executemany INSERTs; works on every backend."""
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+
+    def write(self, table, rows: List[dict]) -> None:
+        self.connection.execute(table.insert(), rows)
+
+
+class CopyWriter:
+    """PostgreSQL COPY FROM STDIN in CSV format, several times faster than INSERT."""
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, datetime):
+            return value.isoformat(sep=" ")
+        if isinstance(value, dict):
+            return json.dumps(value)
+        return value
+
+    def write(self, table, rows: List[dict]) -> None:
+        columns = list(rows[0])
+        # INSERT stores None in a JSON column as JSON null, like the ORM does
+        json_columns = [column for column in columns if isinstance(table.c[column].type, JSON)]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            for column in json_columns:
+                if row[column] is None:
+                    row[column] = "null"
+            # Other Nones become unquoted empty fields, which COPY reads as NULL
+            writer.writerow([self._value(row[column]) for column in columns])
+        buffer.seek(0)
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+
+class Seeder:
+    """Buffers generated rows per table and writes them in batches."""
+
+    def __init__(self, connection: Connection, writer, batch_size: int):
+        self.connection = connection
+        self.writer = writer
+        self.batch_size = batch_size
+        self.buffers: Dict[object, List[dict]] = defaultdict(list)
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+
+    def add(self, table, row: dict) -> None:
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        for table in TABLE_ORDER:
+            rows = self.buffers.pop(table, None)
+            if rows:
+                self.writer.write(table, rows)
+                self.counts[table.name] += len(rows)
+        self.connection.commit()
+        total = sum(self.counts.values())
+        elapsed = time.perf_counter() - self.started
+        print(f"\r{total:,} rows, {total / elapsed:,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+
+def next_id(connection: Connection, table) -> int:
+    return (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def seed(engine: Engine, args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    now = args.now or datetime.utcnow()
+    span = args.days * 86400
+    status = mix_sampler(STATUS_MIX, rng)
+    priority = mix_sampler(PRIORITY_MIX, rng)
+    action = mix_sampler(ACTION_MIX, rng)
+
+    method = args.method
+    if method == "auto":
+        method = "copy" if engine.dialect.name == "postgresql" else "insert"
+    if method == "copy" and engine.dialect.name != "postgresql":
+        raise SystemExit("--method copy needs PostgreSQL")
+
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            # Durability of a throwaway dataset is not worth an fsync per batch
+            connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        first_user = next_id(connection, User.__table__)
+        first_team = next_id(connection, Team.__table__)
+        first_task = next_id(connection, Task.__table__)
+
+        # Team members are counted generously; unused numbers are harmless gaps
+        team_sizes = [min(args.max_team_size, args.users, 1 + int(rng.paretovariate(1.2))) for _ in range(args.teams)]
+        numbers = iter(allocate_sequence(connection, args.tasks + sum(team_sizes)))
+        connection.commit()
+
+        writer = (CopyWriter if method == "copy" else InsertWriter)(connection)
+        seeder = Seeder(connection, writer, args.batch_size)
+        password = security.get_password_hash(args.password)
+
+        # Users, created at random times over the last --days days
+        user_ids = range(first_user, first_user + args.users)
+        user_created = [now - timedelta(seconds=rng.random() * span) for _ in user_ids]
+        for user_id, created_at in zip(user_ids, user_created):
+            seeder.add(User.__table__, {
+                "id": user_id, "email": f"user{user_id}@example.com", "username": f"user{user_id}",
+                "full_name": f"User {user_id}", "hashed_password": password, "role": "USER",
+                "is_active": rng.random() > 0.01, "is_verified": rng.random() < 0.7,
+                "theme_preference": "system", "created_at": created_at,
+            })
+
+        # Teams with Pareto sizes; the first member owns the team
+        user_teams: Dict[int, List[int]] = defaultdict(list)
+        for offset, size in enumerate(team_sizes):
+            team_id = first_team + offset
+            seeder.add(Team.__table__, {"id": team_id, "name": f"Team {team_id}", "created_at": now - timedelta(seconds=rng.random() * span)})
+            for position, member in enumerate(rng.sample(user_ids, size)):
+                user_teams[member].append(team_id)
+                role = TeamRole.OWNER if position == 0 else TeamRole.ADMIN if rng.random() < 0.1 else TeamRole.MEMBER
+                seeder.add(TeamMember.__table__, {
+                    "team_id": team_id, "user_id": member, "role": role.name,
+                    "joined_at": now - timedelta(seconds=rng.random() * span), "change_seq": next(numbers),
+                })
+
+        # Tasks: Zipf counts per user, some on a team, some shared, with activity rows
+        audit_per_task = max(0.0, args.audit_rows / args.tasks - 1) if args.tasks else 0.0
+        task_id = first_task
+        for user_id, created, count in zip(user_ids, user_created, zipf_counts(args.tasks, args.users, args.skew, rng)):
+            teams = user_teams.get(user_id)
+            age = (now - created).total_seconds()
+            for _ in range(count):
+                created_at = created + timedelta(seconds=rng.random() * age)
+                task_status = status()
+                due_date = created_at + timedelta(seconds=3600 + rng.random() * 60 * 86400) if rng.random() < 0.6 else None
+                reminder_date = due_date - timedelta(days=1) if due_date is not None and rng.random() < 0.15 else None
+                seeder.add(Task.__table__, {
+                    "id": task_id,
+                    "title": f"{rng.choice(TITLES)} #{task_id}",
+                    "description": rng.choice(DESCRIPTIONS),
+                    "priority": priority().name,
+                    "status": task_status.name,
+                    "category": rng.choice(CATEGORIES),
+                    "tags": rng.choice(TAGS),
+                    "due_date": due_date,
+                    "reminder_date": reminder_date,
+                    "reminder_sent_at": reminder_date if reminder_date is not None and reminder_date < now else None,
+                    "completed_at": created_at + timedelta(seconds=rng.random() * (now - created_at).total_seconds())
+                    if task_status == TaskStatus.COMPLETED else None,
+                    "created_at": created_at,
+                    "updated_at": None,
+                    "change_seq": next(numbers),
+                    "owner_id": user_id,
+                    "team_id": rng.choice(teams) if teams and rng.random() < args.team_task_fraction else None,
+                })
+
+                if args.users > 1 and rng.random() < args.share_fraction:
+                    fan_out = min(args.max_share_fan_out, args.users - 1, int(rng.paretovariate(1.5)))
+                    recipients = set()
+                    while len(recipients) < fan_out:
+                        recipient = first_user + rng.randrange(args.users)
+                        if recipient != user_id:
+                            recipients.add(recipient)
+                    for recipient in recipients:
+                        seeder.add(task_shares, {"task_id": task_id, "user_id": recipient, "created_at": created_at})
+
+                extra = int(audit_per_task) + (rng.random() < audit_per_task % 1)
+                for number in range(1 + extra):
+                    name = "CREATE" if number == 0 else action()
+                    ip = rng.getrandbits(24)
+                    seeder.add(ActivityLog.__table__, {
+                        "action": name, "entity_type": "Task", "entity_id": task_id,
+                        "description": f"{name} Task {task_id}",
+                        "changes": {"status": {"old": "todo", "new": task_status.value}} if name == "UPDATE_STATUS" else None,
+                        "ip_address": f"10.{ip >> 16}.{(ip >> 8) & 255}.{ip & 255}",
+                        "user_agent": None, "user_id": user_id,
+                        "created_at": created_at + timedelta(seconds=number * rng.random() * 86400),
+                    })
+                task_id += 1
+        seeder.flush()
+        print(file=sys.stderr)
+
+        # Bulk inserts bypass the session hooks that maintain task_visibility;
+        # older schema revisions (as used by benchmarks) have no such table
+        if inspect(connection).has_table(task_visibility.name):
+            seeder.counts[task_visibility.name] = rebuild_visibility(connection, args.batch_size)
+
+        if engine.dialect.name == "postgresql":
+            # Rows were inserted with explicit ids; move the id sequences past them
+            for table in (User.__table__, Team.__table__, Task.__table__):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))"
+                ))
+        # Fresh planner statistics, so query plans reflect the new data
+        connection.exec_driver_sql("ANALYZE")
+        connection.commit()
+
+    elapsed = time.perf_counter() - seeder.started
+    total = sum(seeder.counts.values())
+    return {
+        "method": method,
+        "seed": args.seed,
+        "rows": dict(seeder.counts),
+        "total_rows": total,
+        "seconds": round(elapsed, 1),
+        "rows_per_second": round(total / elapsed),
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Database URL (default: DATABASE_URL)")
+    parser.add_argument("--migrate", action="store_true", help="Run alembic upgrade head first")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--teams", type=int, default=None, help="Default: one per 25 users")
+    parser.add_argument("--audit-rows", type=int, default=None, help="Activity log rows (default: 2 per task)")
+    parser.add_argument("--skew", type=float, default=0.8, help="Zipf exponent of tasks per user")
+    parser.add_argument("--share-fraction", type=float, default=0.1, help="Fraction of tasks shared")
+    parser.add_argument("--max-share-fan-out", type=int, default=50)
+    parser.add_argument("--team-task-fraction", type=float, default=0.3,
+                        help="Fraction of a team member's tasks put on one of their teams")
+    parser.add_argument("--max-team-size", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365, help="Spread creation times over this many days")
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None,
+                        help="UTC time the dataset is generated relative to (default: now)")
+    parser.add_argument("--password", default="Password123", help="Password of every generated user")
+    parser.add_argument("--method", choices=["auto", "insert", "copy"], default="auto",
+                        help="auto: COPY on PostgreSQL, INSERT elsewhere")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    if args.teams is None:
+        args.teams = args.users // 25
+    if args.audit_rows is None:
+        args.audit_rows = 2 * args.tasks
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    url = args.url or settings.DATABASE_URL
+    if args.migrate:
+        settings.DATABASE_URL = url
+        upgrade_schema()
+    engine = create_db_engine(url, name="seed", echo=False)
+    revision = current_revision(engine)
+    if revision != SCHEMA_REVISION:
+        raise SystemExit(
+            f"Database is at revision {revision}, expected {SCHEMA_REVISION}; "
+            "run `alembic upgrade head` or pass --migrate"
+        )
+    try:
+        print(json.dumps(seed(engine, args), indent=2))
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Check or rebuild the task_visibility table.
+
+task_visibility is derived from tasks, task_shares and team_members (see
+app.core.visibility). `check` compares it with that definition and prints
+the missing, unexpected and stale rows; the exit status is 1 when it finds
+any. `rebuild` recomputes every row, one range of task ids per short
+transaction; if a batch conflicts with a concurrent write, run it again.
+
+    python -m app.tools.visibility check --url sqlite:///./taskmanager.db
+    python -m app.tools.visibility rebuild --batch-size 5000
+"""
+import argparse
+import sys
+import time
+from typing import List, Optional
+
+from app.core.config import settings
+from app.core.database import create_db_engine
+from app.core.visibility import check, rebuild
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--url", default=None, help="Database URL (default: DATABASE_URL)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Tasks per rebuild transaction")
+    parser.add_argument("--sample", type=int, default=10, help="Example rows to print per problem")
+    args = parser.parse_args(argv)
+
+    engine = create_db_engine(args.url or settings.DATABASE_URL, name="visibility", echo=False)
+    start = time.perf_counter()
+    with engine.connect() as connection:
+        if args.command == "rebuild":
+            written = rebuild(connection, args.batch_size)
+            print(f"Rebuilt task_visibility: {written:,} rows in {time.perf_counter() - start:.1f}s")
+            problems = {}
+        else:
+            problems = check(connection, args.sample)
+    engine.dispose()
+
+    failed = False
+    for name, (count, rows) in problems.items():
+        print(f"{name}: {count:,} rows")
+        for row in rows:
+            print(f"    {row}")
+        failed = failed or bool(count)
+    if failed:
+        print("task_visibility is inconsistent; run `python -m app.tools.visibility rebuild`")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
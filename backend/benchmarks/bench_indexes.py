@@ -0,0 +1,118 @@
+"""
+Hot queries before and after the composite index migration (0006).
+
+Seeds a SQLite file at revision 0005 with app.tools.seed, times every query
+in the app.tools.explain catalogue plus a small write transaction (a task
+and its activity row), upgrades to 0006, refreshes planner statistics and
+times everything again. Each case reports latency and the plan before and
+after; "speedup" is the ratio of p50 latencies.
+
+    python -m benchmarks.bench_indexes --users 5000 --tasks 500000
+    python -m benchmarks.bench_indexes --url postgresql://... --tasks 1000000
+
+A --url database must be empty; it is migrated and seeded by the run.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from alembic import command
+from alembic.config import Config
+
+from app.core.config import settings
+from app.core.database import create_db_engine
+from app.core.schema import ALEMBIC_INI
+from app.models import ActivityLog, Task
+from app.tools import seed as seeder
+from app.tools.explain import CATALOGUE, explain, sample_parameters
+from benchmarks.report import summarize
+
+
+def migrate(revision: str) -> None:
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, revision)
+
+
+def time_case(operation, duration: float) -> dict:
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline or len(latencies) < 3:
+        start = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - start)
+    return {"runs": len(latencies), "latency_ms": summarize(latencies, digits=3)}
+
+
+def measure(engine, duration: float) -> dict:
+    results = {}
+    with engine.connect() as connection:
+        parameters = sample_parameters(connection)
+        for query in CATALOGUE:
+            statement = query.build(parameters)
+            results[query.name] = {
+                **time_case(lambda: connection.execute(statement).all(), duration),
+                "plan": explain(connection, query, parameters).lines,
+            }
+
+        owner_id = parameters["user_id"]
+
+        def write():
+            task_id = connection.execute(Task.__table__.insert().values(
+                title="Benchmark task", owner_id=owner_id, priority="MEDIUM", status="TODO",
+                created_at=datetime.utcnow(), change_seq=0,
+            )).inserted_primary_key[0]
+            connection.execute(ActivityLog.__table__.insert().values(
+                action="CREATE", entity_type="Task", entity_id=task_id, user_id=owner_id,
+                created_at=datetime.utcnow(),
+            ))
+            connection.commit()
+
+        results["create_task_write"] = time_case(write, duration)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Empty database to use (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=200000)
+    parser.add_argument("--duration", type=float, default=1.0, help="Seconds per case")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATABASE_URL = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        migrate("0005")
+        engine = create_db_engine(settings.DATABASE_URL, name="bench", echo=False)
+        seeder.seed(engine, seeder.parse_args(["--users", str(args.users), "--tasks", str(args.tasks), "--seed", str(args.seed)]))
+        before = measure(engine, args.duration)
+
+        migrate("0006")
+        with engine.connect() as connection:
+            connection.exec_driver_sql("ANALYZE")
+            connection.commit()
+        after = measure(engine, args.duration)
+        engine.dispose()
+
+    cases = {}
+    for name in before:
+        old, new = before[name]["latency_ms"]["p50"], after[name]["latency_ms"]["p50"]
+        cases[name] = {
+            "before": before[name],
+            "after": after[name],
+            "speedup": round(old / new, 2) if new else None,
+        }
+    print(json.dumps({
+        "benchmark": "composite_indexes",
+        "users": args.users,
+        "tasks": args.tasks,
+        "cases": cases,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+HTTP load generator for the main API endpoints.
+
+Closed-loop asyncio workers share one httpx client; each picks its next
+request from a weighted mix with a seeded random generator, so the request
+sequence is the same on every run. Per operation it reports throughput,
+latency p50/p95/p99 and the SQL statements the server ran for each request
+(the X-DB-Queries response header), plus error counts.
+
+Operations: list_tasks (GET /tasks, pages 1-3), get_task, create_task,
+update_status, me (GET /users/me) and login (bcrypt-bound by design). Set
+the mix with --mix, e.g. "list_tasks=70,get_task=20,create_task=10".
+
+In-process mode (default) migrates a temporary SQLite file and drives the
+app through httpx's ASGI transport: no network, no server, reproducible
+enough to compare releases on the same machine. With --url it drives a
+running server instead. Either way the setup phase registers --users users
+(existing ones are reused), creates --tasks-per-user tasks for each and
+shares --shares-per-user of them with the next user, all through the API.
+
+    python -m benchmarks.bench_load --concurrency 20 --duration 10
+    python -m benchmarks.bench_load --url http://localhost:8000 --mix list_tasks=80,get_task=20
+    python -m benchmarks.bench_load --save-baseline load.json
+    python -m benchmarks.bench_load --baseline load.json --tolerance 0.25 --min-delta 1
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+from app.core.config import settings
+from benchmarks.report import add_baseline_arguments, finish, summarize
+
+PASSWORD = "Benchmark1"
+DEFAULT_MIX = "list_tasks=50,get_task=20,create_task=10,update_status=10,me=8,login=2"
+STATUSES = ["todo", "in_progress", "completed"]
+
+
+class BenchUser:
+    def __init__(self, index: int):
+        self.username = f"bench{index}"
+        self.email = f"bench{index}@example.com"
+        self.headers: Dict[str, str] = {}
+        self.task_ids: List[int] = []
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+async def list_tasks(client, user, rng):
+    return await client.get("/tasks", params={"page": rng.randint(1, 3)}, headers=user.headers)
+
+
+async def get_task(client, user, rng):
+    return await client.get(f"/tasks/{rng.choice(user.task_ids)}", headers=user.headers)
+
+
+async def create_task(client, user, rng):
+    return await client.post(
+        "/tasks", json={"title": "Load test task", "priority": "medium"}, headers=user.headers,
+    )
+
+
+async def update_status(client, user, rng):
+    return await client.patch(
+        f"/tasks/{rng.choice(user.task_ids)}/status", json={"status": rng.choice(STATUSES)}, headers=user.headers,
+    )
+
+
+async def me(client, user, rng):
+    return await client.get("/users/me", headers=user.headers)
+
+
+async def login(client, user, rng):
+    return await client.post("/auth/login", json={"username": user.username, "password": PASSWORD})
+
+
+OPERATIONS = {
+    "list_tasks": list_tasks,
+    "get_task": get_task,
+    "create_task": create_task,
+    "update_status": update_status,
+    "me": me,
+    "login": login,
+}
+
+
+async def gather_limited(coroutines, limit: int):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+
+async def setup(client, users: int, tasks_per_user: int, shares_per_user: int, concurrency: int) -> List[BenchUser]:
+    bench_users = [BenchUser(index) for index in range(users)]
+
+    async def prepare(user):
+        response = await client.post("/auth/register", json={
+            "email": user.email, "username": user.username, "password": PASSWORD,
+        })
+        if response.status_code not in (201, 400):  # 400: registered by an earlier run
+            response.raise_for_status()
+        response = await client.post("/auth/login", json={"username": user.username, "password": PASSWORD})
+        response.raise_for_status()
+        user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def create(user, index):
+        response = await client.post("/tasks", json={
+            "title": f"Task {index}", "priority": random.choice(["low", "medium", "high"]),
+            "category": "benchmark", "tags": "load,test",
+        }, headers=user.headers)
+        response.raise_for_status()
+        user.task_ids.append(response.json()["id"])
+
+    async def share(user, task_id, other):
+        response = await client.post(f"/tasks/{task_id}/share", json={"email": other.email}, headers=user.headers)
+        response.raise_for_status()
+
+    await gather_limited([prepare(user) for user in bench_users], concurrency)
+    await gather_limited(
+        [create(user, index) for user in bench_users for index in range(tasks_per_user)], concurrency,
+    )
+    await gather_limited([
+        share(user, task_id, bench_users[(position + 1) % users])
+        for position, user in enumerate(bench_users)
+        for task_id in user.task_ids[:shares_per_user]
+        if users > 1
+    ], concurrency)
+    return bench_users
+
+
+async def run_load(client, users, weights: Dict[str, int], concurrency: int, duration: float, seed: int) -> dict:
+    names = list(weights)
+    samples = defaultdict(list)
+    queries = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.perf_counter() + duration
+
+    async def worker(number):
+        rng = random.Random(seed + number)
+        user = users[number % len(users)]
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights=[weights[name] for name in names])[0]
+            start = time.perf_counter()
+            try:
+                response = await OPERATIONS[name](client, user, rng)
+            except httpx.HTTPError:
+                errors[name] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                errors[name] += 1
+                continue
+            samples[name].append(elapsed)
+            if "X-DB-Queries" in response.headers:
+                queries[name].append(int(response.headers["X-DB-Queries"]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    cases = {}
+    for name in names:
+        case = {
+            "requests": len(samples[name]),
+            "errors": errors[name],
+            "per_second": round(len(samples[name]) / elapsed, 1),
+            "latency_ms": summarize(samples[name]),
+        }
+        if queries[name]:
+            case["db_queries"] = {
+                "mean": round(sum(queries[name]) / len(queries[name]), 2),
+                "max": max(queries[name]),
+            }
+        cases[name] = case
+    total = sum(len(values) for values in samples.values())
+    return {
+        "requests_per_second": round(total / elapsed, 1),
+        "latency_ms": summarize([value for values in samples.values() for value in values]),
+        "errors": sum(errors.values()),
+        "cases": cases,
+    }
+
+
+async def run(args) -> dict:
+    weights = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            base_url = args.url.rstrip("/") + settings.API_V1_STR
+            transport = None
+        else:
+            # Before anything builds an engine from the settings
+            settings.DATABASE_URL = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            from app.core.schema import upgrade_schema
+            from app.main import app
+
+            upgrade_schema()
+            base_url = "http://bench" + settings.API_V1_STR
+            transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=30) as client:
+            random.seed(args.seed)
+            users = await setup(client, args.users, args.tasks_per_user, args.shares_per_user, args.concurrency)
+            if args.warmup:
+                await run_load(client, users, weights, args.concurrency, args.warmup, args.seed)
+            return await run_load(client, users, weights, args.concurrency, args.duration, args.seed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server (default: the app in-process)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--tasks-per-user", type=int, default=50)
+    parser.add_argument("--shares-per-user", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    finish({
+        "benchmark": "http_load",
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "mix": parse_mix(args.mix),
+        **results,
+    }, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Micro-benchmarks for code that runs on every request.
+
+- token_encode / token_decode: SecurityUtils access tokens, as issued at
+  login and checked by every authenticated request.
+- tasklist_serialize_<n>: a TaskList response page of n ORM tasks, each
+  shared with two users, validated and dumped to JSON the way FastAPI
+  serializes a response_model.
+- can_access_<case>: can_access_task for an owner, a user the task is
+  shared with, a team member (membership cache warm) and a stranger.
+- visible_tasks_filter: building the get_tasks visibility condition.
+- user_suggest_<prefix>: a type-ahead lookup of 10 users in the in-memory
+  user directory index, filled with 200,000 users (--directory-users).
+- revocation_check_<case>: the logout check authenticate_token adds to
+  every request: a valid token with nothing revoked, and a valid and a
+  revoked token among 100,000 revoked ones (--revoked).
+- authenticate_token: the whole of get_current_user (decode, revocation
+  check, user lookup), with 100,000 revoked tokens.
+
+Each case runs for --duration seconds after a warm-up; latencies are per
+call, in microseconds.
+
+    python -m benchmarks.bench_micro --duration 1
+    python -m benchmarks.bench_micro --save-baseline micro.json
+    python -m benchmarks.bench_micro --baseline micro.json --min-delta 2
+"""
+import argparse
+import secrets
+import time
+from typing import Callable, Dict, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.deps import authenticate_token, can_access_task, visible_tasks_filter
+from app.core.database import Base
+from app.core.revocation import RevocationList, revocations
+from app.core.security import security
+from app.core.user_directory import UserPrefixIndex
+from app.models import Task, TaskPriority, TaskStatus, Team, TeamMember, TeamRole, User
+from app.schemas.task import TaskList
+from benchmarks.report import add_baseline_arguments, finish, summarize
+
+
+def measure(operation: Callable[[], object], duration: float, warmup: float) -> dict:
+    deadline = time.perf_counter() + warmup
+    while time.perf_counter() < deadline:
+        operation()
+
+    latencies = []
+    started = time.perf_counter()
+    deadline = started + duration
+    while True:
+        start = time.perf_counter()
+        operation()
+        end = time.perf_counter()
+        latencies.append(end - start)
+        if end >= deadline:
+            break
+    return {
+        "iterations": len(latencies),
+        "per_second": round(len(latencies) / (end - started), 1),
+        "latency_us": summarize(latencies, scale=1_000_000, digits=2),
+    }
+
+
+def seed_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+    # Password hashes are never checked here, so skip bcrypt
+    users = [
+        User(email=f"user{i}@example.com", username=f"user{i}", full_name=f"User {i}", hashed_password="x")
+        for i in range(4)
+    ]
+    owner, friend, teammate, stranger = users
+    db.add_all(users)
+    db.flush()
+    team = Team(name="Team")
+    db.add(team)
+    db.flush()
+    db.add_all([
+        TeamMember(team_id=team.id, user_id=owner.id, role=TeamRole.OWNER),
+        TeamMember(team_id=team.id, user_id=teammate.id, role=TeamRole.MEMBER),
+    ])
+    for i in range(100):
+        task = Task(
+            title=f"Task {i}", description="Write the quarterly report " * 4, owner_id=owner.id,
+            priority=TaskPriority.MEDIUM, status=TaskStatus.TODO, category="work", tags="report,q3",
+            team_id=team.id,
+        )
+        task.shared_with = [friend, teammate]
+        db.add(task)
+    db.commit()
+
+    tasks = (
+        db.query(Task)
+        .options(selectinload(Task.shared_with), selectinload(Task.attachments))
+        .order_by(Task.id)
+        .all()
+    )
+    return db, tasks, {"owner": owner, "shared": friend, "team": teammate, "stranger": stranger}
+
+
+def directory_index(count: int) -> UserPrefixIndex:
+    first_names = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi", "ivan", "judy"]
+    last_names = ["smith", "jones", "taylor", "brown", "wilson", "evans", "thomas", "johnson", "roberts", "walker"]
+    index = UserPrefixIndex()
+    index.build(
+        (i, f"user{i}", f"{first_names[i % 10]}.{last_names[i // 10 % 10]}{i}@example.com",
+         f"{first_names[i % 10].title()} {last_names[i // 10 % 10].title()}", True)
+        for i in range(count)
+    )
+    return index
+
+
+def revoke_tokens(count: int) -> List[str]:
+    """Fill the application's revocation list with `count` random jtis."""
+    jtis = [secrets.token_hex(16) for _ in range(count)]
+    expires_at = time.time() + 3600
+    for jti in jtis:
+        revocations.add(jti, expires_at)
+    return jtis
+
+
+def build_cases(db, tasks, users, directory: UserPrefixIndex, revoked: List[str]) -> Dict[str, Callable[[], object]]:
+    token = security.create_access_token(data={"sub": 1})
+    adapter = TypeAdapter(TaskList)
+
+    def serialize(page):
+        payload = {"items": page, "total": len(tasks), "page": 1, "page_size": len(page), "total_pages": 1}
+        return adapter.dump_json(adapter.validate_python(payload, from_attributes=True))
+
+    task = tasks[0]
+    cases = {
+        "token_encode": lambda: security.create_access_token(data={"sub": 1}),
+        "token_decode": lambda: security.decode_token(token),
+        "tasklist_serialize_20": lambda: serialize(tasks[:20]),
+        "tasklist_serialize_100": lambda: serialize(tasks),
+        "visible_tasks_filter": lambda: visible_tasks_filter(users["shared"]),
+    }
+    for name, user in users.items():
+        cases[f"can_access_{name}"] = lambda user=user: can_access_task(user, task)
+    # A common prefix (every user matches), a name and a nearly complete username
+    for prefix in ("u", "wal", "user1999"):
+        cases[f"user_suggest_{prefix}"] = lambda prefix=prefix: directory.lookup(prefix, 10)
+
+    jti = security.decode_token(token)["jti"]
+    empty = RevocationList()
+    cases["revocation_check_empty"] = lambda: empty.is_revoked(jti)
+    cases["revocation_check_valid"] = lambda: revocations.is_revoked(jti)
+    cases["revocation_check_revoked"] = lambda: revocations.is_revoked(revoked[0])
+    cases["authenticate_token"] = lambda: authenticate_token(token, db)
+    return cases
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=1.0, help="Seconds per case")
+    parser.add_argument("--warmup", type=float, default=0.2, help="Warm-up seconds per case")
+    parser.add_argument("--only", help="Comma-separated case names to run")
+    parser.add_argument("--directory-users", type=int, default=200000, help="Users in the suggest index")
+    parser.add_argument("--revoked", type=int, default=100000, help="Revoked tokens")
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+
+    db, tasks, users = seed_session()
+    cases = build_cases(db, tasks, users, directory_index(args.directory_users), revoke_tokens(args.revoked))
+    if args.only:
+        wanted = set(args.only.split(","))
+        cases = {name: operation for name, operation in cases.items() if name in wanted}
+
+    results = {name: measure(operation, args.duration, args.warmup) for name, operation in cases.items()}
+    db.close()
+
+    finish({"benchmark": "micro", "duration_seconds": args.duration, "cases": results}, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Connection pool saturation.
+
+Runs a closed-loop load at increasing concurrency. Each simulated request
+checks out a connection, runs a query and keeps the connection for
+--hold-ms, like a request that keeps its session open while it works.
+Throughput grows with concurrency until every connection is busy
+(pool_size + max_overflow); beyond that, extra workers only queue for a
+connection, so checkout wait grows while throughput stays flat, and once
+the wait passes --timeout checkouts fail. Waits are uneven because the
+pool queue is not fair, so watch the mean and p99 rather than the median.
+
+    python -m benchmarks.bench_pool --pool-size 5 --max-overflow 5 --concurrency 2,5,10,20,40
+    python -m benchmarks.bench_pool --url postgresql://... --hold-ms 20
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import exc, text
+
+from app.core.database import create_db_engine
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_level(engine, concurrency: int, duration: float, hold: float) -> dict:
+    waits, timeouts, completed = [], [0], [0]
+    max_checked_out = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    wait = time.perf_counter() - start
+                    connection.execute(text("SELECT 1")).scalar()
+                    checked_out = engine.pool.checkedout()
+                    time.sleep(hold)
+            except exc.TimeoutError:
+                with lock:
+                    timeouts[0] += 1
+                continue
+            with lock:
+                waits.append(wait)
+                completed[0] += 1
+                max_checked_out[0] = max(max_checked_out[0], checked_out)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests_per_second": round(completed[0] / elapsed, 1),
+        "checkout_wait_ms": {
+            "mean": round(statistics.fmean(waits) * 1000, 2) if waits else 0.0,
+            "p50": round(percentile(waits, 0.50) * 1000, 2),
+            "p95": round(percentile(waits, 0.95) * 1000, 2),
+            "p99": round(percentile(waits, 0.99) * 1000, 2),
+        },
+        "timeouts": timeouts[0],
+        "max_checked_out": max_checked_out[0],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Database URL (default: a temporary SQLite file)")
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--max-overflow", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=2.0, help="Pool checkout timeout in seconds")
+    parser.add_argument("--pre-ping", action="store_true")
+    parser.add_argument("--hold-ms", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per concurrency level")
+    parser.add_argument("--concurrency", default="1,5,10,20,40")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_db_engine(
+            url,
+            name="bench",
+            pool_size=args.pool_size,
+            max_overflow=args.max_overflow,
+            pool_timeout=args.timeout,
+            pool_pre_ping=args.pre_ping,
+            echo=False,
+        )
+        levels = [
+            run_level(engine, int(concurrency), args.duration, args.hold_ms / 1000)
+            for concurrency in args.concurrency.split(",")
+        ]
+        engine.dispose()
+
+    capacity = args.pool_size + args.max_overflow
+    print(json.dumps({
+        "benchmark": "db_pool_saturation",
+        "pool_size": args.pool_size,
+        "max_overflow": args.max_overflow,
+        "pre_ping": args.pre_ping,
+        "hold_ms": args.hold_ms,
+        # Throughput ceiling once every connection is busy
+        "saturation_requests_per_second": round(capacity / (args.hold_ms / 1000), 1),
+        "levels": levels,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Preview regeneration throughput.
+
+Renders previews for a batch of synthetic photos serially and through the
+preview process pool, and prints the throughput of each as JSON:
+
+    python -m benchmarks.bench_previews --count 200 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from app.core.thumbnails import render_thumbnail
+
+
+def make_images(directory: Path, count: int, size: tuple) -> list:
+    rng = random.Random(42)
+    paths = []
+    for i in range(count):
+        # Noise compresses like a photo, unlike a flat colour
+        image = Image.frombytes("RGB", size, rng.randbytes(size[0] * size[1] * 3))
+        path = directory / f"{i}.jpg"
+        image.save(path, "JPEG", quality=85)
+        paths.append(str(path))
+    return paths
+
+
+def run_serial(paths: list, max_dimension: int) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        render_thumbnail(path, "image/jpeg", max_dimension)
+    return time.perf_counter() - start
+
+
+def run_pool(paths: list, max_dimension: int, workers: int) -> float:
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Warm the workers so process start-up is not measured
+        list(pool.map(render_thumbnail, paths[:workers], ["image/jpeg"] * workers, [max_dimension] * workers))
+        start = time.perf_counter()
+        list(pool.map(
+            render_thumbnail, paths, ["image/jpeg"] * len(paths), [max_dimension] * len(paths),
+            chunksize=max(1, len(paths) // (workers * 4)),
+        ))
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--width", type=int, default=2048)
+    parser.add_argument("--height", type=int, default=1536)
+    parser.add_argument("--max-dimension", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_images(Path(directory), args.count, (args.width, args.height))
+        serial = run_serial(paths, args.max_dimension)
+        pooled = run_pool(paths, args.max_dimension, args.workers)
+
+    print(json.dumps({
+        "benchmark": "preview_regeneration",
+        "images": args.count,
+        "source_size": f"{args.width}x{args.height}",
+        "workers": args.workers,
+        "serial_seconds": round(serial, 3),
+        "serial_per_second": round(args.count / serial, 1),
+        "pool_seconds": round(pooled, 3),
+        "pool_per_second": round(args.count / pooled, 1),
+        "speedup": round(serial / pooled, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Mixed read/write throughput on SQLite: the tuned profile against the
+previous setup.
+
+"default" is how database.py used to open SQLite: one pool, rollback
+journal, no pragmas. "tuned" is the SQLite profile: WAL and the SQLITE_*
+pragmas, a single serialized writer connection and a read-only reader pool
+behind RoutingSession. Reader threads page through a user's tasks while
+writer threads create tasks, each in its own session like a request.
+
+    python -m benchmarks.bench_sqlite --readers 8 --writers 2 --duration 5
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+
+from app.core import changes  # noqa: F401  (change sequence assignment, as in the app)
+from app.core.config import settings
+from app.core.database import Base, RoutingSession, create_db_engine
+from app.core.security import security
+from app.models import Task, TaskPriority, TaskStatus, User
+
+USERS = 20
+
+
+def default_factory(url: str):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine), [engine]
+
+
+def tuned_factory(url: str):
+    writer = create_db_engine(
+        url, name="bench-writer", pool_size=1, max_overflow=0,
+        pool_timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000, echo=False,
+    )
+    reader = create_db_engine(url, name="bench-reader", read_only=True, echo=False)
+    factory = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, writer=writer, reader=reader)
+    return factory, [writer, reader]
+
+
+def seed(factory, tasks: int) -> None:
+    db = factory()
+    password = security.get_password_hash("benchmark")
+    users = [User(email=f"user{i}@example.com", username=f"user{i}", hashed_password=password) for i in range(USERS)]
+    db.add_all(users)
+    db.flush()
+    db.add_all(
+        Task(title=f"Task {i}", owner_id=users[i % USERS].id, priority=TaskPriority.MEDIUM, status=TaskStatus.TODO)
+        for i in range(tasks)
+    )
+    db.commit()
+    db.close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))] * 1000, 2)
+
+
+def run(factory, readers: int, writers: int, duration: float) -> dict:
+    latencies = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def read(db):
+        owner_id = random.randint(1, USERS)
+        db.query(Task).filter(Task.owner_id == owner_id).order_by(Task.created_at.desc()).limit(20).all()
+
+    def write(db):
+        db.add(Task(title="New task", owner_id=random.randint(1, USERS),
+                    priority=TaskPriority.LOW, status=TaskStatus.TODO))
+        db.commit()
+
+    def worker(kind, operation):
+        while time.perf_counter() < deadline:
+            db = factory()
+            start = time.perf_counter()
+            try:
+                operation(db)
+                elapsed = time.perf_counter() - start
+            except (OperationalError, PoolTimeoutError):
+                # "database is locked", or no writer connection within the busy timeout
+                with lock:
+                    errors[kind] += 1
+                continue
+            finally:
+                db.close()
+            with lock:
+                latencies[kind].append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(readers + writers) as executor:
+        for _ in range(readers):
+            executor.submit(worker, "read", read)
+        for _ in range(writers):
+            executor.submit(worker, "write", write)
+    elapsed = time.perf_counter() - started
+
+    return {
+        kind: {
+            "per_second": round(len(latencies[kind]) / elapsed, 1),
+            "errors": errors[kind],
+            "latency_ms": {
+                "p50": percentile(latencies[kind], 0.50),
+                "p95": percentile(latencies[kind], 0.95),
+                "p99": percentile(latencies[kind], 0.99),
+            },
+        }
+        for kind in ("read", "write")
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--tasks", type=int, default=5000, help="Tasks seeded before the run")
+    parser.add_argument("--mode", choices=["default", "tuned", "both"], default="both")
+    args = parser.parse_args()
+
+    modes = ["default", "tuned"] if args.mode == "both" else [args.mode]
+    results = {}
+    for mode in modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            factory, engines = (default_factory if mode == "default" else tuned_factory)(url)
+            Base.metadata.create_all(engines[0])
+            seed(factory, args.tasks)
+            results[mode] = run(factory, args.readers, args.writers, args.duration)
+            for engine in engines:
+                engine.dispose()
+
+    print(json.dumps({
+        "benchmark": "sqlite_mixed_read_write",
+        "readers": args.readers,
+        "writers": args.writers,
+        "duration_seconds": args.duration,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Real-time feed capacity: idle connections per worker.
+
+In-process mode (default) registers N subscriptions on an event hub and
+reports memory per connection plus dispatch cost for a targeted event and a
+team-wide broadcast:
+
+    python -m benchmarks.bench_stream --connections 10000
+
+Against a running server, opens N idle WebSocket connections as one user,
+then creates a task and measures how long the event takes to reach all of
+them (raise the open-files limit first, e.g. ulimit -n 65536):
+
+    python -m benchmarks.bench_stream --url http://localhost:8000 --token <access token>
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+import tracemalloc
+
+from app.core.realtime import EventHub, LocalBroker, TaskEvent
+
+
+async def run_in_process(connections: int, teams: int) -> dict:
+    hub = EventHub(LocalBroker(), max_pending=100)
+    await hub.start()
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    subscriptions = [hub.subscribe(user_id, team_ids=[user_id % teams]) for user_id in range(connections)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    targeted = TaskEvent("task.updated", 1, [connections // 2], None, {"id": 1})
+    start = time.perf_counter()
+    rounds = 10000
+    for _ in range(rounds):
+        hub.dispatch(targeted.to_json())
+    targeted_us = (time.perf_counter() - start) / rounds * 1e6
+
+    broadcast = TaskEvent("task.updated", 2, [], 0, {"id": 2})
+    start = time.perf_counter()
+    hub.dispatch(broadcast.to_json())
+    broadcast_ms = (time.perf_counter() - start) * 1000
+    recipients = sum(1 for subscription in subscriptions if subscription.pending)
+
+    await hub.stop()
+    return {
+        "benchmark": "stream_idle_connections",
+        "mode": "in-process",
+        "connections": connections,
+        "bytes_per_connection": round(allocated / connections),
+        "targeted_dispatch_us": round(targeted_us, 2),
+        "broadcast_recipients": recipients,
+        "broadcast_dispatch_ms": round(broadcast_ms, 2),
+    }
+
+
+async def run_against_server(url: str, token: str, connections: int, batch: int) -> dict:
+    import httpx
+    import websockets
+
+    ws_url = url.replace("http", "ws", 1) + f"/api/v1/stream?access_token={token}"
+    sockets = []
+    start = time.perf_counter()
+    for offset in range(0, connections, batch):
+        count = min(batch, connections - offset)
+        sockets += await asyncio.gather(*(websockets.connect(ws_url) for _ in range(count)))
+    connect_seconds = time.perf_counter() - start
+
+    async def receive_created(socket):
+        while True:
+            message = json.loads(await socket.recv())
+            if message["type"] == "task.created":
+                return time.perf_counter()
+
+    waiters = [asyncio.create_task(receive_created(socket)) for socket in sockets]
+    async with httpx.AsyncClient(base_url=url, headers={"Authorization": f"Bearer {token}"}) as client:
+        published = time.perf_counter()
+        response = await client.post("/api/v1/tasks", json={"title": "stream benchmark"})
+        response.raise_for_status()
+    received = await asyncio.gather(*waiters)
+
+    for socket in sockets:
+        await socket.close()
+    latencies = sorted(t - published for t in received)
+    return {
+        "benchmark": "stream_idle_connections",
+        "mode": "server",
+        "connections": connections,
+        "connect_seconds": round(connect_seconds, 2),
+        "fanout_p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "fanout_max_ms": round(latencies[-1] * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--teams", type=int, default=1, help="In-process mode: teams to spread connections over")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process hub")
+    parser.add_argument("--token", help="Access token for --url")
+    parser.add_argument("--batch", type=int, default=500, help="Connections opened concurrently")
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.token:
+            parser.error("--url requires --token")
+        result = asyncio.run(run_against_server(args.url.rstrip("/"), args.token, args.connections, args.batch))
+    else:
+        result = asyncio.run(run_in_process(args.connections, args.teams))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Concurrent task writes and delta sync sequence numbers.
+
+Each simulated request creates a task, which draws a sequence number in
+the flush, then keeps its transaction open for --hold-ms before committing,
+like a request that writes the activity log and publishes events after the
+task. With --allocator row every transaction updates the single sync_state
+row and holds its lock until commit, so writers queue behind each other and
+throughput stays near 1000 / --hold-ms whatever the concurrency. With
+--allocator auto, PostgreSQL takes numbers from task_change_seq and
+throughput grows with concurrency until the pool is busy. SQLite has one
+writer either way, so both allocators measure the same there.
+
+    python -m benchmarks.bench_task_writes --concurrency 1,5,10,20
+    python -m benchmarks.bench_task_writes --url postgresql://... --allocator row
+    python -m benchmarks.bench_task_writes --url postgresql://... --allocator auto
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core import changes
+from app.core.database import Base, create_db_engine
+from app.models import Task, User
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_level(session_factory, owner_id: int, concurrency: int, duration: float, hold: float) -> dict:
+    latencies, failures = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            db = session_factory()
+            try:
+                db.add(Task(title="Benchmark task", owner_id=owner_id))
+                db.flush()
+                time.sleep(hold)
+                db.commit()
+            except Exception:
+                db.rollback()
+                with lock:
+                    failures[0] += 1
+                continue
+            finally:
+                db.close()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "writes_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+        },
+        "failures": failures[0],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Database URL (default: a temporary SQLite file)")
+    parser.add_argument("--allocator", choices=["auto", "row"], default="auto",
+                        help="auto: the database's own allocator; row: the sync_state row everywhere")
+    parser.add_argument("--hold-ms", type=float, default=10.0, help="Time between the flush and the commit")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per concurrency level")
+    parser.add_argument("--concurrency", default="1,5,10,20")
+    args = parser.parse_args()
+
+    if args.allocator == "row":
+        changes.allocate_sequence = changes._allocate_from_row
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        levels = [int(concurrency) for concurrency in args.concurrency.split(",")]
+        engine = create_db_engine(url, name="bench", pool_size=max(levels), max_overflow=0, echo=False)
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        db = session_factory()
+        name = f"bench-writer-{time.time_ns()}"
+        owner = User(email=f"{name}@example.com", username=name, hashed_password="x")
+        db.add(owner)
+        db.commit()
+        owner_id = owner.id
+        db.close()
+
+        results = [run_level(session_factory, owner_id, level, args.duration, args.hold_ms / 1000) for level in levels]
+        engine.dispose()
+
+    print(json.dumps({
+        "benchmark": "concurrent_task_writes",
+        "dialect": engine.dialect.name,
+        "allocator": args.allocator,
+        "hold_ms": args.hold_ms,
+        # Throughput ceiling when every write waits for the previous commit
+        "serialized_writes_per_second": round(1000 / args.hold_ms, 1),
+        "levels": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Shared reporting for the benchmark suite: latency summaries and baseline
+comparison.
+
+A suite benchmark prints one JSON document whose "cases" map a case name to
+its numbers. Saving that document with --save-baseline and passing it back
+with --baseline on a later run compares the two case by case:
+
+- "latency_*" percentiles and "db_queries" (mean and max) regress when they
+  grow by more than --tolerance (a fraction, 0.2 = 20%) and by more than
+  --min-delta in their own unit, so sub-microsecond noise is not flagged;
+- "per_second" regresses when it drops by more than --tolerance;
+- a case missing from the current run is reported as well.
+
+Regressions are listed under "regressions" in the output and make the
+process exit with status 1, so CI can run a benchmark against a committed
+baseline.
+"""
+import argparse
+import json
+import statistics
+import sys
+from typing import Dict, List, Optional
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(values, scale: float = 1000, digits: int = 2) -> dict:
+    """Mean and p50/p95/p99 of latencies in seconds, in units of 1/scale s."""
+    return {
+        "mean": round(statistics.fmean(values) * scale, digits) if values else 0.0,
+        "p50": round(percentile(values, 0.50) * scale, digits),
+        "p95": round(percentile(values, 0.95) * scale, digits),
+        "p99": round(percentile(values, 0.99) * scale, digits),
+    }
+
+
+def add_baseline_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--baseline", help="Compare against results saved with --save-baseline")
+    parser.add_argument("--save-baseline", help="Write the results to this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown (default 0.2)")
+    parser.add_argument("--min-delta", type=float, default=0.0,
+                        help="Ignore latency and query count increases smaller than this, in their own unit")
+
+
+def _regression(case: str, metric: str, baseline: float, current: float) -> dict:
+    change = (current - baseline) / baseline if baseline else None
+    return {
+        "case": case,
+        "metric": metric,
+        "baseline": baseline,
+        "current": current,
+        "change": round(change, 3) if change is not None else None,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.2, min_delta: float = 0.0) -> List[dict]:
+    """Metrics of `current` that are worse than in `baseline` beyond the tolerance."""
+    regressions = []
+    for case, old in baseline.get("cases", {}).items():
+        new: Optional[dict] = current.get("cases", {}).get(case)
+        if new is None:
+            regressions.append({"case": case, "metric": "missing"})
+            continue
+
+        for key, old_value in old.items():
+            new_value = new.get(key)
+            if new_value is None:
+                continue
+            if key == "per_second":
+                if new_value < old_value * (1 - tolerance):
+                    regressions.append(_regression(case, key, old_value, new_value))
+            elif key.startswith("latency_") or key == "db_queries":
+                for stat in ("p50", "p95", "p99") if key.startswith("latency_") else ("mean", "max"):
+                    before, after = old_value.get(stat), new_value.get(stat)
+                    if before is None or after is None:
+                        continue
+                    if after > before * (1 + tolerance) and after - before > min_delta:
+                        regressions.append(_regression(case, f"{key}.{stat}", before, after))
+    return regressions
+
+
+def finish(result: dict, args: argparse.Namespace) -> None:
+    """Print the results, save or compare a baseline, and exit 1 on regressions."""
+    regressions: Optional[List[Dict]] = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance, args.min_delta)
+        result = {**result, "baseline": args.baseline, "regressions": regressions}
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({key: value for key, value in result.items() if key not in ("baseline", "regressions")}, f, indent=2)
+
+    print(json.dumps(result, indent=2))
+    if regressions:
+        sys.exit(1)
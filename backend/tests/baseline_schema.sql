@@ -0,0 +1,118 @@
+-- Schema Base.metadata.create_all made on SQLite with the models at the
+-- baseline, before Alembic managed it (see alembic/versions/0001).
+-- Used by tests/test_startup.py to upgrade such a database.
+
+CREATE TABLE users (
+	id INTEGER NOT NULL,
+	email VARCHAR(255) NOT NULL,
+	username VARCHAR(100) NOT NULL,
+	full_name VARCHAR(255),
+	hashed_password VARCHAR(255) NOT NULL,
+	role VARCHAR(7) NOT NULL,
+	is_active BOOLEAN NOT NULL,
+	is_verified BOOLEAN NOT NULL,
+	theme_preference VARCHAR(20) NOT NULL,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+	updated_at DATETIME,
+	last_login DATETIME,
+	PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_users_username ON users (username);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE INDEX ix_users_id ON users (id);
+CREATE TABLE teams (
+	id INTEGER NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	description TEXT,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+	updated_at DATETIME,
+	PRIMARY KEY (id)
+);
+CREATE INDEX ix_teams_id ON teams (id);
+CREATE TABLE tasks (
+	id INTEGER NOT NULL,
+	title VARCHAR(255) NOT NULL,
+	description TEXT,
+	priority VARCHAR(8) NOT NULL,
+	status VARCHAR(11) NOT NULL,
+	category VARCHAR(100),
+	tags TEXT,
+	due_date DATETIME,
+	reminder_date DATETIME,
+	completed_at DATETIME,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+	updated_at DATETIME,
+	owner_id INTEGER NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(owner_id) REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_tasks_priority ON tasks (priority);
+CREATE INDEX ix_tasks_category ON tasks (category);
+CREATE INDEX ix_tasks_status ON tasks (status);
+CREATE INDEX ix_tasks_id ON tasks (id);
+CREATE INDEX ix_tasks_title ON tasks (title);
+CREATE TABLE activity_logs (
+	id INTEGER NOT NULL,
+	action VARCHAR(100) NOT NULL,
+	entity_type VARCHAR(50) NOT NULL,
+	entity_id INTEGER,
+	description TEXT,
+	changes JSON,
+	ip_address VARCHAR(45),
+	user_agent VARCHAR(500),
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+	user_id INTEGER,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE SET NULL
+);
+CREATE INDEX ix_activity_logs_created_at ON activity_logs (created_at);
+CREATE INDEX ix_activity_logs_action ON activity_logs (action);
+CREATE INDEX ix_activity_logs_entity_type ON activity_logs (entity_type);
+CREATE INDEX ix_activity_logs_id ON activity_logs (id);
+CREATE TABLE security_events (
+	id INTEGER NOT NULL,
+	event_type VARCHAR(100) NOT NULL,
+	severity VARCHAR(20) NOT NULL,
+	description TEXT,
+	ip_address VARCHAR(45),
+	user_agent VARCHAR(500),
+	event_metadata JSON,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+	user_id INTEGER,
+	PRIMARY KEY (id),
+	FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE SET NULL
+);
+CREATE INDEX ix_security_events_event_type ON security_events (event_type);
+CREATE INDEX ix_security_events_id ON security_events (id);
+CREATE INDEX ix_security_events_created_at ON security_events (created_at);
+CREATE INDEX ix_security_events_severity ON security_events (severity);
+CREATE TABLE team_members (
+	team_id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	role VARCHAR(6) NOT NULL,
+	joined_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+	PRIMARY KEY (team_id, user_id),
+	FOREIGN KEY(team_id) REFERENCES teams (id) ON DELETE CASCADE,
+	FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE TABLE task_shares (
+	task_id INTEGER NOT NULL,
+	user_id INTEGER NOT NULL,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	PRIMARY KEY (task_id, user_id),
+	FOREIGN KEY(task_id) REFERENCES tasks (id) ON DELETE CASCADE,
+	FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE
+);
+CREATE TABLE attachments (
+	id INTEGER NOT NULL,
+	filename VARCHAR(255) NOT NULL,
+	original_filename VARCHAR(255) NOT NULL,
+	file_path VARCHAR(500) NOT NULL,
+	file_type VARCHAR(50) NOT NULL,
+	file_size BIGINT NOT NULL,
+	created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+	task_id INTEGER NOT NULL,
+	PRIMARY KEY (id),
+	FOREIGN KEY(task_id) REFERENCES tasks (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_attachments_id ON attachments (id);
@@ -8,7 +8,11 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
+from app.core.cache import cache
+from app.core.config import settings
 from app.core.database import Base, get_db
+from app.core.memberships import membership_cache
+from app.core.previews import previews
 from app.models import User
 from app.core.security import security
 
@@ -23,10 +27,33 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+@pytest.fixture(scope="session", autouse=True)
+def upload_dir(tmp_path_factory):
+    """Keep uploaded files out of the working tree."""
+    settings.UPLOAD_DIR = str(tmp_path_factory.mktemp("uploads"))
+    return settings.UPLOAD_DIR
+
+
+@pytest.fixture(scope="session", autouse=True)
+def skip_schema_check():
+    """Tests create tables on their own engine instead of running migrations."""
+    settings.DB_SCHEMA_CHECK = "off"
+
+
+@pytest.fixture(autouse=True)
+def disable_previews():
+    """Previews start worker processes; tests that need them enable them explicitly."""
+    previews.enabled = False
+    yield
+    previews.enabled = settings.PREVIEWS_ENABLED
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database session for each test."""
     Base.metadata.create_all(bind=engine)
+    membership_cache.clear()
+    cache.backend.clear()
     session = TestingSessionLocal()
     try:
         yield session
@@ -0,0 +1,242 @@
+"""
+Attachment upload tests.
+"""
+import hashlib
+import io
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.core.storage import LocalStorage, S3Storage, blob_key, collect_garbage
+from app.core.uploads import StagedFile
+from app.models import Attachment, Blob, Task
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 200
+
+
+@pytest.fixture
+def task(db_session, test_user):
+    task = Task(title="With files", owner_id=test_user.id)
+    db_session.add(task)
+    db_session.commit()
+    db_session.refresh(task)
+    return task
+
+
+def test_upload_streams_file_to_disk(client, auth_headers, task):
+    response = client.post(
+        f"/api/v1/tasks/{task.id}/attachments",
+        headers=auth_headers,
+        files={"file": ("screenshot.png", PNG, "image/png")},
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert data["original_filename"] == "screenshot.png"
+    assert data["file_size"] == len(PNG)
+    assert data["file_type"] == "image/png"
+    assert data["content_hash"] == hashlib.sha256(PNG).hexdigest()
+
+    listed = client.get(f"/api/v1/tasks/{task.id}/attachments", headers=auth_headers).json()
+    assert [a["id"] for a in listed] == [data["id"]]
+    assert not list((Path(settings.UPLOAD_DIR) / "tmp").glob("*.part"))
+
+
+def test_upload_rejects_content_not_matching_extension(client, auth_headers, task):
+    response = client.post(
+        f"/api/v1/tasks/{task.id}/attachments",
+        headers=auth_headers,
+        files={"file": ("report.pdf", PNG, "application/pdf")},
+    )
+    assert response.status_code == 415
+
+
+def test_upload_enforces_size_limit(client, auth_headers, task, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 100)
+    response = client.post(
+        f"/api/v1/tasks/{task.id}/attachments",
+        headers=auth_headers,
+        files={"file": ("screenshot.png", PNG, "image/png")},
+    )
+    assert response.status_code == 413
+
+
+def test_resumable_upload(client, auth_headers, task):
+    base = f"/api/v1/tasks/{task.id}/attachments/uploads"
+    created = client.post(base, headers=auth_headers, json={"filename": "big.png", "size": len(PNG)})
+    assert created.status_code == 201
+    upload_id = created.json()["upload_id"]
+
+    first = client.patch(f"{base}/{upload_id}", headers={**auth_headers, "Upload-Offset": "0"}, content=PNG[:100])
+    assert first.json()["offset"] == 100
+    assert client.get(f"{base}/{upload_id}", headers=auth_headers).json()["offset"] == 100
+
+    # Replaying a chunk at a stale offset is rejected
+    stale = client.patch(f"{base}/{upload_id}", headers={**auth_headers, "Upload-Offset": "0"}, content=PNG[:100])
+    assert stale.status_code == 409
+
+    last = client.patch(f"{base}/{upload_id}", headers={**auth_headers, "Upload-Offset": "100"}, content=PNG[100:])
+    data = last.json()
+    assert data["complete"] is True
+    assert data["attachment"]["content_hash"] == hashlib.sha256(PNG).hexdigest()
+    assert client.get(f"{base}/{upload_id}", headers=auth_headers).status_code == 404
+
+
+def upload(client, headers, task_id, name="screenshot.png", content=PNG):
+    response = client.post(
+        f"/api/v1/tasks/{task_id}/attachments",
+        headers=headers,
+        files={"file": (name, content, "image/png")},
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_duplicate_uploads_share_one_blob(client, auth_headers, task, db_session):
+    first = upload(client, auth_headers, task.id)
+    second = upload(client, auth_headers, task.id, name="copy.png")
+    assert first["content_hash"] == second["content_hash"]
+
+    blob = db_session.get(Blob, first["content_hash"])
+    db_session.refresh(blob)
+    assert blob.ref_count == 2
+    stored = list((Path(settings.UPLOAD_DIR) / "blobs").rglob(first["content_hash"]))
+    assert len(stored) == 1
+
+
+def test_garbage_collector_reclaims_unreferenced_blobs(client, auth_headers, task, db_session):
+    data = upload(client, auth_headers, task.id, content=PNG + b"gc")
+    digest = data["content_hash"]
+    storage = LocalStorage(Path(settings.UPLOAD_DIR))
+
+    assert client.delete(f"/api/v1/attachments/{data['id']}", headers=auth_headers).status_code == 204
+    blob = db_session.get(Blob, digest)
+    db_session.refresh(blob)
+    assert blob.ref_count == 0
+
+    # Still within the grace period
+    assert collect_garbage(db_session, storage, grace_seconds=3600) == 0
+    assert storage.exists(digest)
+
+    assert collect_garbage(db_session, storage, grace_seconds=-60) == 1
+    assert not storage.exists(digest)
+    assert db_session.get(Blob, digest) is None
+
+
+def test_garbage_collector_keeps_referenced_blobs(client, auth_headers, task, db_session):
+    data = upload(client, auth_headers, task.id, content=PNG + b"keep")
+    storage = LocalStorage(Path(settings.UPLOAD_DIR))
+    assert collect_garbage(db_session, storage, grace_seconds=-60) == 0
+    assert storage.exists(data["content_hash"])
+    assert db_session.query(Attachment).count() == 1
+
+
+class FakeS3Client:
+    """In-memory stand-in for the subset of the boto3 S3 client we use."""
+
+    class NotFound(Exception):
+        response = {"Error": {"Code": "404"}}
+
+    def __init__(self):
+        self.objects = {}
+
+    def upload_file(self, filename, bucket, key, ExtraArgs=None):
+        self.objects[(bucket, key)] = Path(filename).read_bytes()
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound()
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound()
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def get_paginator(self, operation):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = [key for bucket, key in client.objects if bucket == Bucket and key.startswith(Prefix)]
+                yield {"Contents": [{"Key": key} for key in keys]}
+
+        return Paginator()
+
+
+def test_s3_backend_stores_by_digest(tmp_path):
+    client = FakeS3Client()
+    storage = S3Storage("attachments", client=client)
+    staged_path = tmp_path / "upload.part"
+    staged_path.write_bytes(PNG)
+    digest = hashlib.sha256(PNG).hexdigest()
+    staged = StagedFile(staged_path, "a.png", "png", len(PNG), digest)
+
+    storage.put(staged)
+    assert client.objects[("attachments", blob_key(digest))] == PNG
+    assert storage.exists(digest)
+    assert not staged_path.exists()
+
+    storage.write_derived(digest, "preview-256.webp", b"preview")
+    assert storage.read_derived(digest, "preview-256.webp") == b"preview"
+    assert list(storage.iter_digests()) == [digest]
+
+    storage.delete(digest)
+    assert not storage.exists(digest)
+    assert storage.read_derived(digest, "preview-256.webp") is None
+
+
+def test_download_supports_ranges_and_etag(client, auth_headers, task):
+    data = upload(client, auth_headers, task.id, content=PNG + b"range")
+    url = f"/api/v1/attachments/{data['id']}"
+
+    full = client.get(url, headers=auth_headers)
+    assert full.status_code == 200
+    assert full.content == PNG + b"range"
+    etag = full.headers["etag"]
+    assert etag == f'"{data["content_hash"]}"'
+    assert "immutable" in full.headers["cache-control"]
+
+    partial = client.get(url, headers={**auth_headers, "Range": "bytes=0-7"})
+    assert partial.status_code == 206
+    assert partial.content == PNG[:8]
+    assert partial.headers["content-range"] == f"bytes 0-7/{len(PNG) + 5}"
+
+    suffix = client.get(url, headers={**auth_headers, "Range": "bytes=-5"})
+    assert suffix.content == b"range"
+
+    # A stale If-Range validator gets the whole file
+    stale = client.get(url, headers={**auth_headers, "Range": "bytes=0-7", "If-Range": '"other"'})
+    assert stale.status_code == 200
+
+    cached = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    unsatisfiable = client.get(url, headers={**auth_headers, "Range": "bytes=9999-"})
+    assert unsatisfiable.status_code == 416
+
+
+def test_download_x_accel_mode(client, auth_headers, task, monkeypatch):
+    data = upload(client, auth_headers, task.id)
+    monkeypatch.setattr(settings, "ATTACHMENT_DOWNLOAD_MODE", "x-accel")
+    response = client.get(f"/api/v1/attachments/{data['id']}", headers=auth_headers)
+    assert response.headers["x-accel-redirect"] == f"/protected-attachments/{blob_key(data['content_hash'])}"
+    assert response.content == b""
+
+
+def test_download_requires_task_access(client, auth_headers, task, db_session, admin_user):
+    other = Task(title="Private", owner_id=admin_user.id)
+    db_session.add(other)
+    db_session.commit()
+    attachment = Attachment(filename="x.png", original_filename="x.png", file_path="x", file_type="image/png",
+                            file_size=1, task_id=other.id)
+    db_session.add(attachment)
+    db_session.commit()
+    response = client.get(f"/api/v1/attachments/{attachment.id}", headers=auth_headers)
+    assert response.status_code == 403
@@ -0,0 +1,40 @@
+"""
+Tests for the benchmark suite's baseline comparison.
+"""
+from benchmarks.report import compare, percentile, summarize
+
+
+def result(p99=10.0, per_second=100.0, queries=3.0):
+    return {"cases": {"list_tasks": {
+        "per_second": per_second,
+        "latency_ms": {"mean": 5.0, "p50": 5.0, "p95": 8.0, "p99": p99},
+        "db_queries": {"mean": queries, "max": queries},
+    }}}
+
+
+def test_summarize_reports_percentiles_in_milliseconds():
+    values = [i / 1000 for i in range(1, 101)]
+    summary = summarize(values)
+    assert summary["p50"] == 51.0
+    assert summary["p99"] == 100.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_compare_within_tolerance_passes():
+    assert compare(result(p99=11.0, per_second=90.0), result(), tolerance=0.2) == []
+
+
+def test_compare_flags_slower_latency_lower_throughput_and_more_queries():
+    regressions = compare(result(p99=20.0, per_second=50.0, queries=13.0), result(), tolerance=0.2)
+    metrics = {regression["metric"] for regression in regressions}
+    assert metrics == {"latency_ms.p99", "per_second", "db_queries.mean", "db_queries.max"}
+    p99 = next(regression for regression in regressions if regression["metric"] == "latency_ms.p99")
+    assert (p99["baseline"], p99["current"], p99["change"]) == (10.0, 20.0, 1.0)
+
+
+def test_compare_ignores_changes_below_min_delta():
+    assert compare(result(p99=12.5), result(), tolerance=0.2, min_delta=5) == []
+
+
+def test_compare_reports_missing_cases():
+    assert compare({"cases": {}}, result()) == [{"case": "list_tasks", "metric": "missing"}]
@@ -0,0 +1,182 @@
+"""
+Application cache tests: TTL, LRU bound, tag invalidation and stampede protection.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.core.cache import Cache, MemoryBackend, RedisBackend
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio calls the cache backend makes."""
+
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+
+    def _live(self, key):
+        if key in self.expires and self.expires[key] <= time.monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return self.values.get(key)
+
+    async def get(self, key):
+        return self._live(key)
+
+    async def mget(self, keys):
+        return [self._live(key) for key in keys]
+
+    async def set(self, key, value, px=None, nx=False):
+        if nx and self._live(key) is not None:
+            return None
+        self.values[key] = str(value).encode()
+        self.expires.pop(key, None)
+        if px:
+            self.expires[key] = time.monotonic() + px / 1000
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+
+    async def incrby(self, key, amount):
+        value = int(self._live(key) or 0) + amount
+        self.values[key] = str(value).encode()
+        return value
+
+    async def incr(self, key):
+        return await self.incrby(key, 1)
+
+    async def pexpire(self, key, px):
+        self.expires[key] = time.monotonic() + px / 1000
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "redis":
+        return RedisBackend("redis://fake", client=FakeRedis())
+    return MemoryBackend()
+
+
+@pytest.mark.asyncio
+async def test_get_set_ttl_and_cached_none(backend):
+    cache = Cache(backend, default_ttl=60)
+    await cache.set("a", {"n": 1})
+    await cache.set("b", None)
+    await cache.set("short", 1, ttl=0.01)
+    await asyncio.sleep(0.02)
+    assert await cache.get_many(["a", "b", "short", "missing"]) == {"a": {"n": 1}, "b": None}
+    assert await cache.get("missing", "default") == "default"
+
+    await cache.delete("a")
+    assert await cache.get("a") is None
+    assert await cache.incr("hits") == 1
+    assert await cache.incr("hits", 5) == 6
+
+
+@pytest.mark.asyncio
+async def test_tag_invalidation_and_computation_racing_it(backend):
+    cache = Cache(backend)
+    await cache.set("task:1:view", "v1", tags=["task:1", "user:42"])
+    await cache.set("task:2:view", "v2", tags=["task:2", "user:42"])
+
+    await cache.invalidate("task:1")
+    assert await cache.get_many(["task:1:view", "task:2:view"]) == {"task:2:view": "v2"}
+    await cache.invalidate("user:42")
+    assert await cache.get("task:2:view") is None
+
+    # Invalidated while it was being computed: the result is stored but never served
+    async def compute():
+        await cache.invalidate("task:3")
+        return "outdated"
+
+    assert await cache.get_or_compute("task:3:view", compute, tags=["task:3"]) == "outdated"
+    assert await cache.get("task:3:view") is None
+    assert await cache.get_or_compute("task:3:view", lambda: "current", tags=["task:3"]) == "current"
+    assert await cache.get("task:3:view") == "current"
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_least_recently_used():
+    cache = Cache(MemoryBackend(max_entries=2))
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    await cache.get("a")
+    await cache.set("c", 3)
+    assert await cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once(backend):
+    cache = Cache(backend)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    assert await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(10))) == [1] * 10
+    assert calls == 1
+
+    # Failures reach every waiter and are not cached
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(cache.get_or_compute("f", fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert await cache.get_or_compute("f", lambda: "ok") == "ok"
+
+
+@pytest.mark.asyncio
+async def test_workers_sharing_redis_wait_for_the_first_computation():
+    redis = FakeRedis()
+    first = Cache(RedisBackend("redis://fake", client=redis))
+    second = Cache(RedisBackend("redis://fake", client=redis), lock_timeout=1)
+    calls = []
+
+    async def compute(worker):
+        calls.append(worker)
+        await asyncio.sleep(0.1)
+        return worker
+
+    results = await asyncio.gather(
+        first.get_or_compute("report", lambda: compute("first")),
+        second.get_or_compute("report", lambda: compute("second")),
+    )
+    assert results == ["first", "first"]
+    assert calls == ["first"]
+
+
+@pytest.mark.asyncio
+async def test_backend_errors_are_misses():
+    class Broken(MemoryBackend):
+        async def get_many(self, keys):
+            raise ConnectionError("down")
+
+    cache = Cache(Broken())
+    assert await cache.get("k", "default") == "default"
+    assert await cache.get_or_compute("k", lambda: 7) == 7
+
+
+def test_admin_dashboard_is_cached_until_invalidated(client, db_session, admin_user, test_user):
+    headers = {"Authorization": "Bearer " + client.post(
+        "/api/v1/auth/login", json={"username": "adminuser", "password": "adminpassword123"},
+    ).json()["access_token"]}
+    before = client.get("/api/v1/admin/dashboard", headers=headers).json()["user_stats"]
+    test_user.is_active = False
+    db_session.commit()
+    assert client.get("/api/v1/admin/dashboard", headers=headers).json()["user_stats"] == before
+
+    client.patch(f"/api/v1/admin/users/{test_user.id}/status", headers=headers, json={"is_active": True})
+    client.patch(f"/api/v1/admin/users/{test_user.id}/status", headers=headers, json={"is_active": False})
+    after = client.get("/api/v1/admin/dashboard", headers=headers).json()["user_stats"]
+    assert after["inactive_users"] == before["inactive_users"] + 1
@@ -0,0 +1,81 @@
+"""
+Tests for queued logging and request context.
+"""
+import contextvars
+import io
+import logging
+import queue
+from logging.handlers import QueueListener
+
+from prometheus_client import REGISTRY
+
+from app.core.logging_config import BoundedQueueHandler, RequestContextFilter, set_log_user, start_request_context
+
+
+def make_record(level=logging.INFO, msg="message %s", args=("value",)):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+
+def dropped():
+    return REGISTRY.get_sample_value("log_records_dropped_total") or 0
+
+
+def test_full_queue_drops_info_but_keeps_warnings():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=2))
+    before = dropped()
+    for index in range(3):
+        handler.handle(make_record(args=(index,)))
+    assert handler.queue.qsize() == 2
+    assert dropped() == before + 1
+
+    # A warning takes the place of the oldest queued record
+    handler.handle(make_record(logging.WARNING, "disk almost full", ()))
+    queued = [handler.queue.get_nowait() for _ in range(2)]
+    assert queued[0].args == (1,)
+    assert queued[1].msg == "disk almost full"
+    assert dropped() == before + 2
+
+
+def test_records_are_formatted_by_the_listener():
+    class Model:
+        def __str__(self):
+            return "<Task 7>"
+
+    handler = BoundedQueueHandler(queue.Queue())
+    record = make_record(msg="saved %s in %d ms", args=(Model(), 12))
+    handler.handle(record)
+    queued = handler.queue.get_nowait()
+    # Not formatted on the logging thread; only the object argument is frozen
+    assert queued.msg == "saved %s in %d ms"
+    assert queued.args == ("<Task 7>", 12)
+
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(logging.Formatter("%(message)s"))
+    handler.queue.put_nowait(queued)
+    listener = QueueListener(handler.queue, output)
+    listener.start()
+    listener.stop()
+    assert stream.getvalue() == "saved <Task 7> in 12 ms\n"
+
+
+def test_request_context_attached_to_records():
+    def log_in_request():
+        start_request_context("req-1", {"route": None})
+        set_log_user(42)
+        record = make_record()
+        RequestContextFilter().filter(record)
+        return record
+
+    record = contextvars.Context().run(log_in_request)
+    assert (record.request_id, record.user_id, record.route) == ("req-1", 42, None)
+
+    record = make_record()
+    contextvars.Context().run(RequestContextFilter().filter, record)
+    assert record.request_id == "-" and record.user_id is None
+
+
+def test_request_id_header(client):
+    response = client.get("/health", headers={"X-Request-ID": "abc123"})
+    assert response.headers["X-Request-ID"] == "abc123"
+    assert len(client.get("/health").headers["X-Request-ID"]) == 32
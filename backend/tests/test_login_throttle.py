@@ -0,0 +1,141 @@
+"""
+Login throttling tests: delays, lockouts and summarized failure events.
+"""
+import time
+
+import pytest
+from sqlalchemy import event
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.proxies import client_address
+from app.core.security import security
+from app.core.throttle import (
+    LoginFailureLog, login_failures, login_retry_after, record_login_failure, save_login_failures,
+)
+from app.models import SecurityEvent
+from tests.conftest import engine
+
+
+def login(client, username="testuser", password="wrongpassword"):
+    return client.post("/api/v1/auth/login", json={"username": username, "password": password})
+
+
+@pytest.fixture
+def password_checks(monkeypatch):
+    checks = []
+    verify = security.verify_password
+
+    def counted(plain, hashed):
+        checks.append(plain)
+        return verify(plain, hashed)
+
+    monkeypatch.setattr(security, "verify_password", counted)
+    login_failures.take()
+    return checks
+
+
+def test_failures_past_the_free_ones_delay_the_next_attempt(client, db_session, test_user, password_checks):
+    for _ in range(settings.LOGIN_FREE_FAILURES_PER_USERNAME + 1):
+        assert login(client).status_code == 401
+
+    # Refused before the password is checked, even the right one
+    checks = len(password_checks)
+    response = login(client, password="testpassword123")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert login(client, username="TestUser").status_code == 429
+    assert len(password_checks) == checks
+
+    # Failures are not written one row each
+    assert db_session.query(SecurityEvent).filter(SecurityEvent.event_type == "LOGIN_FAILED").count() == 0
+    assert save_login_failures(db_session, login_failures.take()) == 1
+    event = db_session.query(SecurityEvent).filter(SecurityEvent.event_type == "LOGIN_FAILED").one()
+    assert event.severity == "CRITICAL"
+    assert event.user_id == test_user.id
+    assert event.event_metadata["attempts"] == 4
+    assert event.event_metadata["throttled"] == 2
+    assert event.event_metadata["addresses"] == {"unknown": 6}  # The test client has no address
+
+
+def test_delays_double_and_success_clears_them(client, test_user, password_checks, monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_DELAY_BASE_SECONDS", 0.05)
+    for _ in range(settings.LOGIN_FREE_FAILURES_PER_USERNAME + 1):
+        assert login(client).status_code == 401
+    time.sleep(0.06)
+    assert login(client).status_code == 401
+    assert login(client).status_code == 429
+    time.sleep(0.11)
+
+    assert login(client, password="testpassword123").status_code == 200
+    assert login(client).status_code == 401
+    assert login(client).status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_delayed_addresses_hold_back_failing_usernames(monkeypatch):
+    monkeypatch.setattr(settings, "LOGIN_FREE_FAILURES_PER_IP", 2)
+    for username in ("alice", "bob", "carol"):
+        assert await login_retry_after(username, "10.0.0.1") == 0
+        await record_login_failure(username, "10.0.0.1")
+    assert await login_retry_after("carol", "10.0.0.1") == 1
+    assert await login_retry_after("dave", "10.0.0.1") == 0
+    assert await login_retry_after("carol", "10.0.0.2") == 0
+
+
+def test_failures_across_usernames_do_not_lock_out_a_shared_address(client, test_user, monkeypatch):
+    monkeypatch.setattr("app.api.v1.endpoints.auth.client_address", lambda request: "203.0.113.7")
+    for i in range(settings.LOGIN_FREE_FAILURES_PER_IP + 5):
+        assert login(client, username=f"stranger{i}").status_code == 401
+    assert login(client, username="stranger0").status_code == 429
+    assert login(client, password="testpassword123").status_code == 200
+
+
+def test_credential_stuffing_is_refused_before_the_user_query(client, test_user, password_checks, monkeypatch):
+    monkeypatch.setattr("app.api.v1.endpoints.auth.client_address", lambda request: "203.0.113.7")
+    monkeypatch.setattr(settings, "LOGIN_FREE_FAILURES_PER_IP", 2)
+    monkeypatch.setattr(settings, "LOGIN_MAX_FAILURES_PER_IP", 5)
+    for i in range(5):
+        assert login(client, username=f"stranger{i}").status_code == 401
+
+    # Further usernames, existing or not, are refused without a lookup
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        assert login(client, username="stranger99").status_code == 429
+        assert login(client, password="testpassword123").status_code == 429
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert not [statement for statement in statements if "FROM users" in statement]
+    assert password_checks == []
+
+
+def test_client_address_believes_only_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", "172.16.0.0/12")
+
+    def request(peer, forwarded=None):
+        headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+        return Request({"type": "http", "client": (peer, 1234), "headers": headers})
+
+    assert client_address(request("172.18.0.5", "198.51.100.1, 203.0.113.9")) == "203.0.113.9"
+    assert client_address(request("172.18.0.5", "203.0.113.9, 172.18.0.9")) == "203.0.113.9"
+    assert client_address(request("172.18.0.5")) == "172.18.0.5"
+    assert client_address(request("203.0.113.9", "10.0.0.1")) == "203.0.113.9"
+    monkeypatch.setattr(settings, "TRUSTED_PROXIES", "")
+    assert client_address(request("172.18.0.5", "203.0.113.9")) == "172.18.0.5"
+
+
+def test_failure_log_bounds_usernames_and_addresses(monkeypatch):
+    monkeypatch.setattr(LoginFailureLog, "MAX_USERNAMES", 2)
+    monkeypatch.setattr(LoginFailureLog, "MAX_ADDRESSES", 1)
+    log = LoginFailureLog()
+    for username in ("a", "A", "b", "c", "d"):
+        log.record(username, f"10.0.0.{ord(username.lower())}", None)
+    summaries = {summary.username: summary for summary in log.take()}
+    assert {name: summary.attempts for name, summary in summaries.items()} == {"a": 2, "b": 1, "*": 2}
+    assert summaries["*"].addresses == {"10.0.0.99": 1, "*": 1}
+    assert len(log) == 0
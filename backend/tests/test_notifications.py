@@ -0,0 +1,131 @@
+"""
+Notification delivery tests against a local SMTP server.
+"""
+import asyncio
+import socket
+
+import pytest
+
+from app.core.notifications import NotificationDispatcher, SMTPConnectionPool
+
+aiosmtpd = pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller  # noqa: E402
+
+
+class RecordingHandler:
+    """Collects delivered envelopes; optionally advertises PIPELINING."""
+
+    def __init__(self, pipelining=False):
+        self.pipelining = pipelining
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        if self.pipelining:
+            responses.insert(-1, "250-PIPELINING")
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "pipelining"])
+def smtp_server(request):
+    handler = RecordingHandler(pipelining=request.param)
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        yield handler, controller
+    finally:
+        controller.stop()
+
+
+def make_dispatcher(controller, window=0.05):
+    pool = SMTPConnectionPool(host=controller.hostname, port=controller.port, use_tls=False, size=2)
+    return NotificationDispatcher(pool, from_address="noreply@example.com", digest_window=window)
+
+
+def test_burst_is_coalesced_into_digest(smtp_server):
+    """Notifications for one recipient within a window become one email."""
+    handler, controller = smtp_server
+
+    async def scenario():
+        dispatcher = make_dispatcher(controller)
+        await dispatcher.start()
+        for i in range(3):
+            assert dispatcher.notify("alice@example.com", f"Update {i}", "body")
+        dispatcher.notify("bob@example.com", "Hello", "body")
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+
+    recipients = sorted(envelope.rcpt_tos[0] for envelope in handler.messages)
+    assert recipients == ["alice@example.com", "bob@example.com"]
+    digest = next(e for e in handler.messages if e.rcpt_tos == ["alice@example.com"])
+    assert b"3 new notifications" in digest.content
+    assert b"Update 2" in digest.content
+
+
+def test_connections_are_reused_across_batches(smtp_server):
+    """Consecutive batches share the pooled connection."""
+    handler, controller = smtp_server
+
+    async def scenario():
+        dispatcher = make_dispatcher(controller, window=0.01)
+        await dispatcher.start()
+        for i in range(3):
+            dispatcher.notify(f"user{i}@example.com", "Hi", "body")
+            await asyncio.sleep(0.1)
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+
+    assert len(handler.messages) == 3
+    assert len(handler.sessions) == 1
+
+
+def test_notify_is_noop_when_disabled():
+    """Without SMTP configuration nothing is queued."""
+    dispatcher = NotificationDispatcher(None, from_address="noreply@example.com")
+    assert dispatcher.notify("alice@example.com", "Hi", "body") is False
+
+
+def test_due_reminders_are_marked_sent_only_when_queued(smtp_server, db_session, test_user):
+    """A full queue leaves the remaining reminders for the next sweep."""
+    from datetime import datetime, timedelta
+
+    from app.core.notifications import send_due_reminders
+    from app.models import Task
+    from tests.conftest import TestingSessionLocal
+
+    handler, controller = smtp_server
+    due = datetime.utcnow() - timedelta(minutes=1)
+    tasks = [Task(title=f"Task {i}", owner_id=test_user.id, reminder_date=due + timedelta(seconds=i)) for i in range(3)]
+    db_session.add_all(tasks)
+    db_session.commit()
+
+    async def scenario():
+        pool = SMTPConnectionPool(host=controller.hostname, port=controller.port, use_tls=False, size=1)
+        dispatcher = NotificationDispatcher(pool, from_address="noreply@example.com", digest_window=0.05, max_queue=2)
+        await dispatcher.start()
+        first = await send_due_reminders(dispatcher, TestingSessionLocal)
+        await asyncio.sleep(0.2)  # Delivered, so the queue has room again
+        second = await send_due_reminders(dispatcher, TestingSessionLocal)
+        third = await send_due_reminders(dispatcher, TestingSessionLocal)
+        await dispatcher.stop()
+        return first, second, third
+
+    assert asyncio.run(scenario()) == (2, 1, 0)
+    db_session.expire_all()
+    assert all(task.reminder_sent_at is not None for task in tasks)
+    assert len(handler.messages) == 2  # One digest per sweep
+    assert b"Task 2" in handler.messages[1].content
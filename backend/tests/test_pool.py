@@ -0,0 +1,56 @@
+"""
+Tests for connection pool settings and metrics.
+"""
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import exc, text
+
+from app.core.database import create_db_engine
+
+
+def sample(name, pool):
+    return REGISTRY.get_sample_value(name, {"pool": pool}) or 0.0
+
+
+def test_pool_metrics_track_checkouts_and_timeouts(tmp_path):
+    engine = create_db_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        name="test-pool",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+        echo=False,
+    )
+    waits_before = sample("db_pool_checkout_wait_seconds_count", "test-pool")
+    timeouts_before = sample("db_pool_timeouts_total", "test-pool")
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            assert sample("db_pool_size", "test-pool") == 1
+            assert sample("db_pool_checked_out", "test-pool") == 1
+
+            # The only connection is in use, so a second checkout times out
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+
+        assert sample("db_pool_checked_out", "test-pool") == 0
+        assert sample("db_pool_timeouts_total", "test-pool") == timeouts_before + 1
+        assert sample("db_pool_checkout_wait_seconds_count", "test-pool") == waits_before + 2
+    finally:
+        engine.dispose()
+
+
+def test_pool_settings_applied(tmp_path):
+    engine = create_db_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        pool_size=3,
+        max_overflow=4,
+        pool_timeout=7,
+        pool_recycle=60,
+        echo=False,
+    )
+    assert engine.pool.size() == 3
+    assert engine.pool._max_overflow == 4
+    assert engine.pool.timeout() == 7
+    assert engine.pool._recycle == 60
+    assert engine.pool._pre_ping is False
@@ -0,0 +1,103 @@
+"""
+Attachment preview tests.
+"""
+import io
+import time
+
+import pytest
+from PIL import Image
+
+from app.core import thumbnails
+from app.core.previews import previews
+from app.models import Blob, Task
+from tests.conftest import TestingSessionLocal
+
+
+def make_png(size=(640, 480), color=(200, 40, 40)) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, "PNG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def task(db_session, test_user):
+    task = Task(title="With images", owner_id=test_user.id)
+    db_session.add(task)
+    db_session.commit()
+    db_session.refresh(task)
+    return task
+
+
+@pytest.fixture
+def enable_previews():
+    previews.enabled = True
+    previews.session_factory = TestingSessionLocal
+    yield
+    previews.session_factory = None
+
+
+def upload(client, auth_headers, task_id, content, filename="photo.png"):
+    response = client.post(
+        f"/api/v1/tasks/{task_id}/attachments",
+        headers=auth_headers,
+        files={"file": (filename, content, "application/octet-stream")},
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_render_thumbnail_fits_bounding_box():
+    data = thumbnails.render_thumbnail(make_png((1000, 500)), "image/png", 128)
+    preview = Image.open(io.BytesIO(data))
+    assert preview.format == "WEBP"
+    assert preview.size == (128, 64)
+
+
+def test_preview_generated_after_upload(client, auth_headers, task, db_session, enable_previews):
+    data = upload(client, auth_headers, task.id, make_png())
+    assert data["preview_url"] is None
+
+    deadline = time.monotonic() + 30
+    while True:
+        db_session.expire_all()
+        blob = db_session.get(Blob, data["content_hash"])
+        if blob.preview_status or time.monotonic() > deadline:
+            break
+        time.sleep(0.1)
+    assert blob.preview_status == "ready"
+
+    listed = client.get(f"/api/v1/tasks/{task.id}/attachments", headers=auth_headers).json()
+    assert listed[0]["preview_url"] == f"/api/v1/attachments/{data['id']}/preview"
+
+    tasks = client.get("/api/v1/tasks/", headers=auth_headers).json()
+    assert tasks["items"][0]["attachments"][0]["preview_url"] == listed[0]["preview_url"]
+
+    response = client.get(listed[0]["preview_url"], headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert "immutable" in response.headers["cache-control"]
+
+    cached = client.get(listed[0]["preview_url"], headers={**auth_headers, "If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+
+def test_missing_preview_is_generated_on_request(client, auth_headers, task, db_session, enable_previews):
+    previews.enabled = False
+    data = upload(client, auth_headers, task.id, make_png(color=(10, 120, 10)))
+    previews.enabled = True
+
+    response = client.get(f"/api/v1/attachments/{data['id']}/preview", headers=auth_headers)
+    assert response.status_code == 200
+    assert Image.open(io.BytesIO(response.content)).size == (256, 192)
+
+    db_session.expire_all()
+    assert db_session.get(Blob, data["content_hash"]).preview_status == "ready"
+
+
+def test_preview_unavailable_for_unsupported_type(client, auth_headers, task, enable_previews):
+    data = upload(client, auth_headers, task.id, b"%PDF-1.4\n" + b"0" * 100, filename="doc.pdf")
+    if thumbnails.supports("application/pdf"):
+        pytest.skip("PyMuPDF installed; PDFs have previews")
+
+    response = client.get(f"/api/v1/attachments/{data['id']}/preview", headers=auth_headers)
+    assert response.status_code == 404
@@ -0,0 +1,41 @@
+"""
+Query-plan regression tests: the hot queries in app.tools.explain keep
+their indexes on a seeded SQLite database.
+"""
+import pytest
+from sqlalchemy import create_engine
+
+from app.core.database import Base
+from app.tools.explain import CATALOGUE, check, diff, explain, sample_parameters
+from app.tools.seed import parse_args, seed
+
+# Plans that are known to scan; each test fails once its plan is fixed, so
+# the entry has to be removed and the improvement stays protected
+KNOWN_ISSUES = {}
+
+
+@pytest.fixture(scope="module")
+def seeded_connection(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    Base.metadata.create_all(engine)
+    seed(engine, parse_args(["--users", "1000", "--tasks", "20000", "--seed", "3", "--now", "2024-06-01T12:00:00"]))
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+@pytest.mark.parametrize("query", [
+    pytest.param(query, id=query.name, marks=pytest.mark.xfail(reason=KNOWN_ISSUES[query.name], strict=True))
+    if query.name in KNOWN_ISSUES else pytest.param(query, id=query.name)
+    for query in CATALOGUE
+])
+def test_query_plan(seeded_connection, query):
+    plan = explain(seeded_connection, query, sample_parameters(seeded_connection))
+    problems = check(query, plan)
+    assert not problems, "\n".join([f"{query.name}: {query.description}", *plan.lines, *problems])
+
+
+def test_plan_diff_is_readable():
+    text = diff("login_by_username", ["SCAN users"], ["SEARCH users USING INDEX ix_users_username (username=?)"])
+    assert "-SCAN users\n" in text
+    assert "+SEARCH users USING INDEX ix_users_username (username=?)\n" in text
@@ -0,0 +1,59 @@
+"""
+Tests for per-request SQL statistics and the N+1 detector.
+"""
+import contextvars
+import logging
+
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.query_stats import current_query_stats, start_query_stats
+from tests.conftest import engine
+
+
+def test_db_headers(client, auth_headers):
+    response = client.get("/health")
+    assert response.headers["X-DB-Queries"] == "0"
+
+    before = REGISTRY.get_sample_value(
+        "http_request_db_queries_count", {"method": "GET", "route": "/api/v1/tasks"}
+    ) or 0
+    response = client.get("/api/v1/tasks", headers=auth_headers)
+    assert response.status_code == 200
+    assert int(response.headers["X-DB-Queries"]) > 0
+    assert float(response.headers["X-DB-Time"]) > 0
+    assert REGISTRY.get_sample_value(
+        "http_request_db_queries_count", {"method": "GET", "route": "/api/v1/tasks"}
+    ) == before + 1
+
+
+def test_statements_outside_requests_are_not_counted():
+    def run():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return current_query_stats()
+
+    assert contextvars.Context().run(run) is None
+
+
+def test_repeated_statement_is_flagged(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "DB_N_PLUS_ONE_DETECTION", True)
+    monkeypatch.setattr(settings, "DB_N_PLUS_ONE_THRESHOLD", 3)
+
+    def run():
+        stats = start_query_stats("GET /example")
+        with engine.connect() as connection:
+            for task_id in range(5):
+                connection.execute(text("SELECT :id"), {"id": task_id})
+            connection.execute(text("SELECT 2"))
+        return stats
+
+    with caplog.at_level(logging.WARNING, logger="app.core.query_stats"):
+        stats = contextvars.Context().run(run)
+
+    assert stats.count == 6
+    warnings = [record.getMessage() for record in caplog.records]
+    # Logged once, when the threshold is reached
+    assert len(warnings) == 1
+    assert "executed 3 times in GET /example: SELECT ?" in warnings[0]
@@ -0,0 +1,143 @@
+"""
+Tests for read replica routing, using two SQLite files as primary and replica.
+"""
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core import replicas as replicas_module
+from app.core.database import Base, RoutingSession, create_db_engine
+from app.core.replicas import Replica, ReplicaSet
+from app.models import ReplicaHeartbeat, User
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary = create_db_engine(f"sqlite:///{tmp_path / 'primary.db'}", name="test-primary", echo=False)
+    replica = create_db_engine(f"sqlite:///{tmp_path / 'replica.db'}", name="test-replica", echo=False)
+    for engine in (primary, replica):
+        Base.metadata.create_all(engine)
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+@pytest.fixture
+def replica_set(databases):
+    primary, replica = databases
+    replica_set = ReplicaSet(primary, [Replica("replica-0", replica)], max_lag=5, read_your_writes=10)
+    replica_set.probe()
+    return replica_set
+
+
+@pytest.fixture
+def session_factory(databases, replica_set):
+    primary, _ = databases
+    return sessionmaker(class_=RoutingSession, writer=primary, reader=primary, replicas=replica_set)
+
+
+def add_user(engine, username):
+    db = sessionmaker(bind=engine)()
+    db.add(User(email=f"{username}@example.com", username=username, hashed_password="x"))
+    db.commit()
+    db.close()
+
+
+def usernames(db):
+    return {user.username for user in db.query(User).all()}
+
+
+def replicate(primary, replica):
+    """Bring the replica's heartbeat up to the primary's, as replication would."""
+    with primary.connect() as connection:
+        beat = connection.execute(select(ReplicaHeartbeat.beat)).scalar()
+    with replica.begin() as connection:
+        if not connection.execute(update(ReplicaHeartbeat).values(beat=beat)).rowcount:
+            connection.execute(ReplicaHeartbeat.__table__.insert().values(id=1, beat=beat))
+
+
+def test_read_sessions_use_the_replica(databases, session_factory):
+    primary, replica = databases
+    add_user(primary, "on-primary")
+    add_user(replica, "on-replica")
+
+    db = session_factory()
+    assert usernames(db) == {"on-primary"}
+    db.close()
+
+    db = session_factory()
+    db.info["use_replica"] = True
+    assert usernames(db) == {"on-replica"}
+    # Writes still go to the primary
+    db.add(User(email="new@example.com", username="new", hashed_password="x"))
+    db.commit()
+    db.close()
+    assert "new" in usernames(sessionmaker(bind=primary)())
+
+
+def test_user_reads_own_writes_from_primary(databases, session_factory):
+    primary, replica = databases
+    add_user(replica, "on-replica")
+
+    db = session_factory()
+    db.info["user_id"] = 42
+    db.add(User(email="writer@example.com", username="writer", hashed_password="x"))
+    db.commit()
+    db.close()
+
+    db = session_factory()
+    db.info.update(use_replica=True, user_id=42)
+    assert usernames(db) == {"writer"}
+    db.close()
+
+    db = session_factory()
+    db.info.update(use_replica=True, user_id=7)
+    assert usernames(db) == {"on-replica"}
+    db.close()
+
+
+def test_lagging_replica_falls_back_to_primary(databases, replica_set, monkeypatch):
+    primary, replica = databases
+    now = [1000.0]
+    monkeypatch.setattr(replicas_module.time, "monotonic", lambda: now[0])
+    replica_engine = replica_set.replicas[0].engine
+
+    replicate(primary, replica)
+    replica_set.probe()
+    assert replica_set.choose() is replica_engine
+
+    now[0] += 9
+    replica_set.probe()
+    assert replica_set.replicas[0].lag == 9
+    assert replica_set.choose() is None
+
+    replicate(primary, replica)
+    now[0] += 1
+    replica_set.probe()
+    assert replica_set.replicas[0].lag == 0
+    assert replica_set.choose() is replica_engine
+
+
+def test_stalled_replica_is_detected_without_task_writes(databases, replica_set, monkeypatch):
+    primary, replica = databases
+    now = [1000.0]
+    monkeypatch.setattr(replicas_module.time, "monotonic", lambda: now[0])
+    replicate(primary, replica)
+    replica_set.probe()
+    replicate(primary, replica)
+
+    # Only users change on the primary, and the replica stops replaying
+    for second in range(1, 8):
+        now[0] += 1
+        add_user(primary, f"user{second}")
+        replica_set.probe()
+    assert replica_set.replicas[0].lag == 6  # Since the first beat it missed
+    assert replica_set.choose() is None
+
+
+def test_unreachable_replica_is_skipped(databases):
+    primary, _ = databases
+    missing = create_db_engine("sqlite:////nonexistent/dir/replica.db", name="test-missing", echo=False)
+    replica_set = ReplicaSet(primary, [Replica("missing", missing)], max_lag=5, read_your_writes=10)
+    replica_set.probe()
+    assert replica_set.choose() is None
@@ -0,0 +1,90 @@
+"""
+Token revocation tests: logout, the in-memory list and syncing between workers.
+"""
+import time
+
+import pytest
+
+from app.core.cache import Cache, RedisBackend
+from app.core.revocation import ENTRY_PREFIX, SEQUENCE_KEY, BloomFilter, RevocationList
+from app.core.security import security
+from tests.test_cache import FakeRedis
+
+
+def test_logout_revokes_access_and_refresh_tokens(client, test_user):
+    tokens = client.post("/api/v1/auth/login", json={"username": "testuser", "password": "testpassword123"}).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+
+    response = client.post("/api/v1/auth/logout", headers=headers, json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["message"] == "Token has been revoked"
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+    # Other sessions of the same user are unaffected
+    other = client.post("/api/v1/auth/login", json={"username": "testuser", "password": "testpassword123"}).json()
+    assert client.get("/api/v1/users/me", headers={"Authorization": f"Bearer {other['access_token']}"}).status_code == 200
+    assert client.post("/api/v1/auth/logout").status_code == 403
+
+
+def test_tokens_have_distinct_jtis():
+    first = security.decode_token(security.create_access_token(data={"sub": 1}))
+    second = security.decode_token(security.create_access_token(data={"sub": 1}))
+    assert first["jti"] != second["jti"]
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(1000)
+    keys = [f"revoked-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"valid-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+def test_revocation_list_expiry_prune_and_resize():
+    revocations = RevocationList(capacity=4)
+    now = time.time()
+    assert not revocations.is_revoked("a") and not revocations.is_revoked(None)
+
+    revocations.add("a", now + 60)
+    revocations.add("old", now - 1)
+    assert revocations.is_revoked("a") and not revocations.is_revoked("old")
+
+    for i in range(10):
+        revocations.add(f"short-{i}", now + 0.05)
+    assert len(revocations) == 11
+    assert all(revocations.is_revoked(f"short-{i}") for i in range(10))
+
+    time.sleep(0.06)
+    assert not revocations.is_revoked("short-0")
+    assert revocations.prune() == 10
+    assert len(revocations) == 1 and revocations.is_revoked("a")
+
+
+@pytest.mark.asyncio
+async def test_workers_sync_through_the_shared_cache(monkeypatch):
+    shared = Cache(RedisBackend("redis://fake", client=FakeRedis()))
+    monkeypatch.setattr("app.core.revocation.cache", shared)
+    first, second = RevocationList(), RevocationList()
+    expires_at = time.time() + 60
+
+    await first.revoke("jti-1", expires_at)
+    assert first.is_revoked("jti-1") and not second.is_revoked("jti-1")
+    assert await second.sync() == 1
+    assert second.is_revoked("jti-1")
+
+    # A number taken but not yet written is read again at the next sync
+    number = await shared.incr(SEQUENCE_KEY)
+    assert await second.sync() == 0
+    await shared.set(f"{ENTRY_PREFIX}{number}", ["jti-2", expires_at], ttl=60)
+    assert await second.sync() == 1
+    assert second.is_revoked("jti-2")
+
+    # A new worker catches up on everything still unexpired
+    late = RevocationList()
+    assert await late.sync() == 2
+    assert late.is_revoked("jti-1") and late.is_revoked("jti-2")
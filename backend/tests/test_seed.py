@@ -0,0 +1,69 @@
+"""
+Tests for the synthetic dataset generator.
+"""
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models import ActivityLog, SyncState, Task, TeamMember, User
+from app.models.task import task_shares
+from app.tools.seed import parse_args, seed, zipf_counts
+
+
+def make_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def snapshot(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(Task.id, Task.owner_id, Task.team_id, Task.status, Task.priority, Task.due_date).order_by(Task.id)
+        ).all()
+
+
+def test_zipf_counts_are_skewed_and_sum_to_total():
+    import random
+
+    counts = zipf_counts(10000, 100, 1.0, random.Random(1))
+    assert sum(counts) == 10000
+    assert max(counts) > 10 * sorted(counts)[50]
+
+
+def test_seed_generates_consistent_rows():
+    engine = make_engine()
+    args = parse_args(["--users", "50", "--tasks", "2000", "--teams", "5", "--batch-size", "500"])
+    result = seed(engine, args)
+
+    assert result["rows"]["users"] == 50
+    assert result["rows"]["tasks"] == 2000
+    assert result["rows"]["activity_logs"] == 4000
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(Task)).scalar() == 2000
+        # Shares and memberships point at generated rows, never at the owner
+        assert connection.execute(
+            select(func.count()).select_from(task_shares.join(Task)).where(task_shares.c.user_id == Task.owner_id)
+        ).scalar() == 0
+        assert connection.execute(
+            select(func.count()).select_from(task_shares).where(task_shares.c.user_id.not_in(select(User.id)))
+        ).scalar() == 0
+        assert connection.execute(select(func.count()).select_from(TeamMember)).scalar() == result["rows"]["team_members"]
+        assert connection.execute(select(func.count(ActivityLog.id))).scalar() == 4000
+        # Sequence numbers came from sync_state and are unique
+        max_seq = connection.execute(select(func.max(Task.change_seq))).scalar()
+        assert connection.execute(select(SyncState.change_seq)).scalar() >= max_seq
+        assert connection.execute(select(func.count(func.distinct(Task.change_seq)))).scalar() == 2000
+
+
+def test_seed_is_reproducible_and_appends():
+    args = parse_args(["--users", "20", "--tasks", "300", "--seed", "7", "--now", "2024-06-01T12:00:00"])
+    first, second = make_engine(), make_engine()
+    seed(first, args)
+    seed(second, args)
+    assert snapshot(first) == snapshot(second)
+
+    seed(first, args)
+    with first.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(User)).scalar() == 40
+        assert connection.execute(select(func.count()).select_from(Task)).scalar() == 600
@@ -0,0 +1,63 @@
+"""
+Tests for the SQLite profile: pragmas, the serialized writer and read routing.
+"""
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, RoutingSession, create_db_engine, is_sqlite_file
+from app.models import User
+
+
+@pytest.fixture
+def routing_factory(tmp_path):
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    writer = create_db_engine(url, name="test-writer", pool_size=1, max_overflow=0, pool_timeout=1, echo=False)
+    reader = create_db_engine(url, name="test-reader", read_only=True, echo=False)
+    Base.metadata.create_all(writer)
+    yield sessionmaker(class_=RoutingSession, autoflush=False, writer=writer, reader=reader)
+    writer.dispose()
+    reader.dispose()
+
+
+def test_is_sqlite_file():
+    assert is_sqlite_file("sqlite:///./taskmanager.db")
+    assert not is_sqlite_file("sqlite://")
+    assert not is_sqlite_file("sqlite:///:memory:")
+    assert not is_sqlite_file("postgresql://localhost/taskmanager")
+
+
+def test_pragmas_applied(routing_factory):
+    db = routing_factory()
+    with db.writer.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    with db.reader.connect() as connection:
+        assert connection.execute(text("PRAGMA query_only")).scalar() == 1
+        with pytest.raises(OperationalError):
+            connection.execute(text("DELETE FROM users"))
+    db.close()
+
+
+def test_reads_use_reader_until_the_transaction_writes(routing_factory):
+    db = routing_factory()
+    assert db.get_bind(clause=select(User).with_for_update()) is db.writer
+    db.close()
+
+    db = routing_factory()
+    assert db.get_bind(clause=select(User)) is db.reader
+    assert db.query(User).count() == 0
+    assert not db.writing
+    db.add(User(email="writer@example.com", username="writer", hashed_password="x"))
+    db.flush()
+    # The uncommitted row is only visible on the writer connection
+    assert db.writing
+    assert db.query(User).count() == 1
+    db.commit()
+
+    assert not db.writing
+    assert db.get_bind(clause=select(User)) is db.reader
+    assert db.query(User).count() == 1
+    db.close()
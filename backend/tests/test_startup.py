@@ -0,0 +1,132 @@
+"""
+Tests for application startup: import cost, migrations and the schema check.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.core import schema
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_SCHEMA = os.path.join(BACKEND_DIR, "tests", "baseline_schema.sql")
+
+# Cold import of app.main, framework included; override for slow CI machines
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 3000))
+
+
+def run_python(code: str, *args: str, database_url: str = "sqlite:////nonexistent/startup.db"):
+    # An unreachable database: importing the app must not need one
+    env = dict(os.environ, DATABASE_URL=database_url)
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def test_import_does_not_touch_database():
+    result = run_python(
+        "import app.main, app.core.database as database; "
+        "print(database.get_engine.cache_info().currsize)"
+    )
+    assert result.stdout.strip() == "0"
+
+
+def test_import_time_budget():
+    result = run_python("import app.main", "-X", "importtime")
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, total, name = line.split("|")
+            if total.strip().isdigit():
+                cumulative[name.strip()] = int(total) / 1000
+    assert cumulative["app.main"] < IMPORT_TIME_BUDGET_MS, (
+        f"importing app.main took {cumulative['app.main']:.0f} ms "
+        f"(budget {IMPORT_TIME_BUDGET_MS:.0f} ms)"
+    )
+
+
+def test_schema_revision_is_alembic_head():
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    script = ScriptDirectory.from_config(Config(schema.ALEMBIC_INI))
+    assert script.get_current_head() == schema.SCHEMA_REVISION
+
+
+def test_migrations_match_models(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    run_python(
+        "from alembic.config import main; main(['upgrade', 'head']); main(['check'])",
+        database_url=url,
+    )
+    engine = create_engine(url)
+    assert schema.check_schema(engine, mode="error") == schema.SCHEMA_REVISION
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT change_seq FROM sync_state WHERE id = 1")).scalar() == 0
+
+
+def create_baseline(url: str) -> None:
+    """A database as create_all made it before Alembic, with a user and an overdue reminder."""
+    engine = create_engine(url)
+    with open(BASELINE_SCHEMA) as schema_file, engine.begin() as connection:
+        connection.connection.executescript(schema_file.read())
+        connection.execute(text(
+            "INSERT INTO users (id, email, username, hashed_password, role, is_active, is_verified, theme_preference) "
+            "VALUES (1, 'old@example.com', 'old', 'x', 'USER', 1, 1, 'system')"
+        ))
+        connection.execute(text(
+            "INSERT INTO tasks (id, title, priority, status, owner_id, reminder_date) "
+            "VALUES (1, 'Old task', 'LOW', 'TODO', 1, '2020-01-01 09:00:00')"
+        ))
+    engine.dispose()
+
+
+def describe(engine):
+    """Tables with their columns, indexes and foreign keys, for comparing schemas."""
+    inspector = inspect(engine)
+    return {
+        table: (
+            [(column["name"], str(column["type"]), column["nullable"]) for column in inspector.get_columns(table)],
+            sorted((index["name"], tuple(index["column_names"])) for index in inspector.get_indexes(table)),
+            sorted((tuple(fk["constrained_columns"]), fk["referred_table"]) for fk in inspector.get_foreign_keys(table)),
+        )
+        for table in inspector.get_table_names() if table != "alembic_version"
+    }
+
+
+def test_initial_revision_is_the_baseline_schema(tmp_path):
+    baseline_url, migrated_url = (f"sqlite:///{tmp_path / name}" for name in ("baseline.db", "migrated.db"))
+    create_baseline(baseline_url)
+    run_python("from alembic.config import main; main(['upgrade', '0001'])", database_url=migrated_url)
+    assert describe(create_engine(migrated_url)) == describe(create_engine(baseline_url))
+
+
+def test_create_all_database_upgrades_from_the_initial_revision(tmp_path):
+    url = f"sqlite:///{tmp_path / 'create_all.db'}"
+    create_baseline(url)
+    run_python(
+        "from alembic.config import main; main(['stamp', '0001']); main(['upgrade', 'head']); main(['check'])",
+        database_url=url,
+    )
+    engine = create_engine(url)
+    assert schema.check_schema(engine, mode="error") == schema.SCHEMA_REVISION
+    with engine.connect() as connection:
+        task = connection.execute(text("SELECT change_seq, reminder_sent_at, team_id FROM tasks")).one()
+        assert task.change_seq == 0 and task.reminder_sent_at is not None and task.team_id is None
+        assert connection.execute(text("SELECT user_id, task_id FROM task_visibility")).all() == [(1, 1)]
+
+
+def test_schema_check_modes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'unmigrated.db'}")
+    with pytest.raises(schema.SchemaMismatchError):
+        schema.check_schema(engine, mode="error")
+    assert schema.check_schema(engine, mode="warn") is None
+    assert schema.check_schema(engine, mode="off") is None
+
+    # A database that cannot be reached does not stop startup
+    unreachable = create_engine("sqlite:////nonexistent/dir/startup.db")
+    assert schema.check_schema(unreachable, mode="error") is None
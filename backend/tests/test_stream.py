@@ -0,0 +1,130 @@
+"""
+Real-time feed tests.
+"""
+import asyncio
+import time
+from collections import defaultdict
+
+import pytest
+
+from app.core.realtime import EventHub, LocalBroker, RedisBroker, Subscription, TaskEvent, hub
+
+
+def event(task_id, event_type="task.updated", user_ids=(1,), team_id=None, title="Task"):
+    return TaskEvent(event_type, task_id, list(user_ids), team_id, {"id": task_id, "title": title})
+
+
+@pytest.mark.asyncio
+async def test_subscription_coalesces_and_resyncs_when_full():
+    subscription = Subscription(user_id=1, max_pending=2)
+    subscription.push(event(1, "task.created", title="v1"))
+    subscription.push(event(1, title="v2"))
+    subscription.push(event(2))
+
+    first = await subscription.get(timeout=0.1)
+    assert first["type"] == "task.created"
+    assert first["task"]["title"] == "v2"
+    assert (await subscription.get(timeout=0.1))["task_id"] == 2
+    assert await subscription.get(timeout=0.01) is None
+
+    for task_id in range(3, 7):
+        subscription.push(event(task_id))
+    assert subscription.pending == 0
+    assert await subscription.get(timeout=0.1) == {"type": "resync"}
+    assert await subscription.get(timeout=0.01) is None
+
+
+@pytest.mark.asyncio
+async def test_hub_routes_to_users_teams_and_admins():
+    events = EventHub(LocalBroker())
+    await events.start()
+    owner = events.subscribe(1)
+    teammate = events.subscribe(2, team_ids=[10])
+    admin = events.subscribe(3, is_admin=True)
+    stranger = events.subscribe(4, team_ids=[11])
+
+    events.publish(event(5, user_ids=[1], team_id=10))
+    assert (owner.pending, teammate.pending, admin.pending, stranger.pending) == (1, 1, 1, 0)
+
+    events.unsubscribe(teammate)
+    assert events.connections == 3
+    await events.stop()
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio pub/sub calls the broker makes."""
+
+    def __init__(self):
+        self.channels = defaultdict(list)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def publish(self, channel, message):
+        for queue in self.channels[channel]:
+            queue.put_nowait({"type": "message", "channel": channel, "data": message.encode()})
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.redis.channels[channel].append(self.queue)
+        self.queue.put_nowait({"type": "subscribe", "channel": channel, "data": 1})
+
+    async def unsubscribe(self, channel):
+        self.redis.channels[channel].remove(self.queue)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_redis_broker_fans_out_across_workers():
+    redis = FakeRedis()
+    worker_a = EventHub(RedisBroker("redis://fake", client=redis))
+    worker_b = EventHub(RedisBroker("redis://fake", client=redis))
+    await worker_a.start()
+    await worker_b.start()
+    subscription = worker_b.subscribe(1)
+
+    worker_a.publish(event(42))
+    received = await subscription.get(timeout=1)
+    assert received["task_id"] == 42
+
+    await worker_a.stop()
+    await worker_b.stop()
+
+
+def test_websocket_receives_task_changes(client, db_session, test_user, auth_headers):
+    token = auth_headers["Authorization"].split()[1]
+    with client.websocket_connect(f"/api/v1/stream?access_token={token}") as websocket:
+        response = client.post("/api/v1/tasks", headers=auth_headers, json={"title": "Live"})
+        task_id = response.json()["id"]
+        message = websocket.receive_json()
+        assert message["type"] == "task.created"
+        assert message["task"]["title"] == "Live"
+
+        client.patch(f"/api/v1/tasks/{task_id}/status", headers=auth_headers, json={"status": "completed"})
+        message = websocket.receive_json()
+        assert message == {**message, "type": "task.status", "task_id": task_id}
+        assert message["task"]["status"] == "completed"
+
+        client.delete(f"/api/v1/tasks/{task_id}", headers=auth_headers)
+        assert websocket.receive_json()["type"] == "task.deleted"
+
+    deadline = time.monotonic() + 2
+    while hub.connections and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert hub.connections == 0
+
+
+def test_stream_requires_authentication(client):
+    assert client.get("/api/v1/stream").status_code == 401
+    assert client.get("/api/v1/stream", params={"access_token": "bogus"}).status_code == 401
@@ -0,0 +1,129 @@
+"""
+Delta sync tests.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.changes import purge_tombstones
+from app.core.security import security
+from app.models import Team, TeamMember, TaskTombstone, User
+
+
+@pytest.fixture
+def other_user(db_session):
+    user = User(
+        email="other@example.com",
+        username="otheruser",
+        hashed_password=security.get_password_hash("otherpassword123"),
+        is_active=True,
+    )
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def other_headers(client, other_user):
+    response = client.post("/api/v1/auth/login", json={"username": "otheruser", "password": "otherpassword123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def changes(client, headers, since=None, **params):
+    if since:
+        params["since"] = since
+    response = client.get("/api/v1/tasks/changes", headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def create(client, headers, title):
+    return client.post("/api/v1/tasks", headers=headers, json={"title": title}).json()
+
+
+def test_delta_sync_returns_only_changes(client, auth_headers):
+    ids = [create(client, auth_headers, f"Task {i}")["id"] for i in range(3)]
+    full = changes(client, auth_headers)
+    assert [item["id"] for item in full["items"]] == ids
+    assert not full["has_more"]
+
+    assert changes(client, auth_headers, full["cursor"])["items"] == []
+
+    client.put(f"/api/v1/tasks/{ids[1]}", headers=auth_headers, json={"title": "Renamed"})
+    client.delete(f"/api/v1/tasks/{ids[2]}", headers=auth_headers)
+    delta = changes(client, auth_headers, full["cursor"])
+    assert [item["title"] for item in delta["items"]] == ["Renamed"]
+    assert [tombstone["task_id"] for tombstone in delta["tombstones"]] == [ids[2]]
+
+    assert changes(client, auth_headers, delta["cursor"]) == {
+        "items": [], "tombstones": [], "cursor": delta["cursor"], "has_more": False, "reset": False,
+    }
+
+
+def test_delta_sync_pages_without_gaps(client, auth_headers):
+    ids = [create(client, auth_headers, f"Task {i}")["id"] for i in range(5)]
+    seen, cursor = [], None
+    while True:
+        page = changes(client, auth_headers, cursor, limit=2)
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            break
+    assert seen == ids
+
+
+def test_cursor_stays_below_uncommitted_numbers(client, auth_headers, monkeypatch):
+    ids = [create(client, auth_headers, f"Task {i}")["id"] for i in range(2)]
+    seqs = [item["change_seq"] for item in changes(client, auth_headers)["items"]]
+
+    # As if the second task's number came before one still being written
+    monkeypatch.setattr("app.api.v1.endpoints.tasks.change_horizon", lambda db: seqs[0])
+    early = changes(client, auth_headers)
+    assert [item["id"] for item in early["items"]] == ids[:1]
+    assert early["cursor"] == f"{seqs[0]}-{ids[0]}"
+
+    monkeypatch.undo()
+    assert [item["id"] for item in changes(client, auth_headers, early["cursor"])["items"]] == ids[1:]
+
+
+def test_unshare_sends_tombstone_to_removed_user(client, auth_headers, other_user, other_headers):
+    task = create(client, auth_headers, "Shared")
+    client.post(f"/api/v1/tasks/{task['id']}/share", headers=auth_headers, json={"email": other_user.email})
+    synced = changes(client, other_headers)
+    assert [item["id"] for item in synced["items"]] == [task["id"]]
+    owner_cursor = changes(client, auth_headers)["cursor"]
+
+    response = client.delete(f"/api/v1/tasks/{task['id']}/share/{other_user.id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["shared_with"] == []
+    assert client.get(f"/api/v1/tasks/{task['id']}", headers=other_headers).status_code == 403
+
+    delta = changes(client, other_headers, synced["cursor"])
+    assert delta["items"] == []
+    assert [tombstone["task_id"] for tombstone in delta["tombstones"]] == [task["id"]]
+    # The owner still sees the task, now without the share
+    assert [item["id"] for item in changes(client, auth_headers, owner_cursor)["items"]] == [task["id"]]
+
+
+def test_team_membership_change_requires_reset(client, db_session, auth_headers, other_user, other_headers):
+    synced = changes(client, other_headers)
+    team = Team(name="Ops")
+    db_session.add(team)
+    db_session.commit()
+    db_session.add(TeamMember(team_id=team.id, user_id=other_user.id))
+    db_session.commit()
+
+    assert changes(client, other_headers, synced["cursor"])["reset"] is True
+
+
+def test_purged_cursor_requires_reset(client, db_session, auth_headers):
+    task = create(client, auth_headers, "Doomed")
+    cursor = changes(client, auth_headers)["cursor"]
+    client.delete(f"/api/v1/tasks/{task['id']}", headers=auth_headers)
+
+    db_session.query(TaskTombstone).update({"created_at": datetime.utcnow() - timedelta(days=60)})
+    db_session.commit()
+    assert purge_tombstones(db_session, retention_days=30) == 1
+
+    assert changes(client, auth_headers, cursor)["reset"] is True
+    assert client.get("/api/v1/tasks/changes", headers=auth_headers, params={"since": "bogus"}).status_code == 400
@@ -0,0 +1,127 @@
+"""
+Materialized task visibility tests: maintenance, consistency check and rebuild.
+"""
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, delete, insert, select
+
+from app.core.config import settings
+from app.core.schema import ALEMBIC_INI
+from app.core.security import security
+from app.core.visibility import check, rebuild
+from app.models import Task, TaskStatus, Team, TeamMember, TeamRole, User
+from app.models.task import task_visibility
+from app.tools.seed import parse_args, seed
+from tests.conftest import engine
+
+
+def consistent():
+    with engine.connect() as connection:
+        return {name: count for name, (count, _) in check(connection).items()} == {
+            "missing": 0, "unexpected": 0, "stale": 0,
+        }
+
+
+def visible(db_session, user):
+    return dict(db_session.execute(
+        select(task_visibility.c.task_id, task_visibility.c.status).where(task_visibility.c.user_id == user.id)
+    ).all())
+
+
+@pytest.fixture
+def other_user(db_session):
+    user = User(
+        email="other@example.com",
+        username="otheruser",
+        hashed_password=security.get_password_hash("otherpassword123"),
+        is_active=True,
+    )
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def test_rows_follow_task_share_and_team_changes(client, db_session, auth_headers, test_user, other_user):
+    task_id = client.post("/api/v1/tasks", headers=auth_headers, json={"title": "Plan"}).json()["id"]
+    assert set(visible(db_session, test_user)) == {task_id}
+    assert visible(db_session, other_user) == {}
+
+    client.post(f"/api/v1/tasks/{task_id}/share", headers=auth_headers, json={"email": other_user.email})
+    client.patch(f"/api/v1/tasks/{task_id}/status", headers=auth_headers, json={"status": "in_progress"})
+    db_session.expire_all()
+    assert visible(db_session, other_user) == {task_id: TaskStatus.IN_PROGRESS}
+    assert consistent()
+
+    # Unshared but still on a team board the user belongs to: stays visible
+    team = Team(name="Board")
+    db_session.add(team)
+    db_session.flush()
+    db_session.add_all([
+        TeamMember(team_id=team.id, user_id=test_user.id, role=TeamRole.OWNER),
+        TeamMember(team_id=team.id, user_id=other_user.id),
+    ])
+    db_session.commit()
+    client.put(f"/api/v1/tasks/{task_id}", headers=auth_headers, json={"team_id": team.id})
+    client.delete(f"/api/v1/tasks/{task_id}/share/{other_user.id}", headers=auth_headers)
+    db_session.expire_all()
+    assert set(visible(db_session, other_user)) == {task_id}
+
+    client.delete(f"/api/v1/teams/{team.id}/members/{other_user.id}", headers=auth_headers)
+    db_session.expire_all()
+    assert visible(db_session, other_user) == {}
+    assert consistent()
+
+    client.delete(f"/api/v1/tasks/{task_id}", headers=auth_headers)
+    db_session.expire_all()
+    assert db_session.execute(select(task_visibility)).all() == []
+
+
+def test_list_filters_and_counts_use_visibility(client, db_session, auth_headers, test_user, other_user):
+    for i, status in enumerate(["todo", "todo", "completed"]):
+        client.post("/api/v1/tasks", headers=auth_headers, json={"title": f"Task {i}", "status": status})
+    db_session.add(Task(title="Someone else's", owner_id=other_user.id))
+    db_session.commit()
+
+    page = client.get("/api/v1/tasks", headers=auth_headers, params={"status": "todo"}).json()
+    assert page["total"] == 2
+    assert [item["title"] for item in page["items"]] == ["Task 1", "Task 0"]
+    assert client.get("/api/v1/tasks", headers=auth_headers, params={"search": "Task 2"}).json()["total"] == 1
+
+
+def test_check_reports_drift_and_rebuild_repairs_it(db_session, test_user, other_user):
+    tasks = [Task(title=f"Task {i}", owner_id=test_user.id) for i in range(5)]
+    db_session.add_all(tasks)
+    db_session.commit()
+    # Writes that bypass the session hooks
+    db_session.execute(delete(task_visibility).where(task_visibility.c.task_id == tasks[0].id))
+    db_session.execute(insert(task_visibility).values(
+        user_id=other_user.id, task_id=tasks[1].id, created_at=tasks[1].created_at, status="TODO", priority="LOW",
+    ))
+    db_session.execute(task_visibility.update().where(task_visibility.c.task_id == tasks[2].id).values(status="REVIEW"))
+    db_session.commit()
+
+    with engine.connect() as connection:
+        problems = check(connection)
+        assert {name: count for name, (count, _) in problems.items()} == {"missing": 1, "unexpected": 1, "stale": 1}
+        assert problems["missing"][1][0][:2] == (test_user.id, tasks[0].id)
+        assert rebuild(connection, batch_size=2) == 5
+    assert consistent()
+
+
+def test_migration_fills_the_table(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'visibility.db'}"
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "0007")
+    migrated = create_engine(url)
+    seed(migrated, parse_args(["--users", "30", "--tasks", "500", "--teams", "3", "--seed", "2"]))
+
+    command.upgrade(config, "0008")
+    with migrated.connect() as connection:
+        assert connection.execute(select(task_visibility.c.task_id).limit(1)).first() is not None
+        assert {name: count for name, (count, _) in check(connection).items()} == {
+            "missing": 0, "unexpected": 0, "stale": 0,
+        }
+    migrated.dispose()
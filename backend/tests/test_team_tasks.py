@@ -0,0 +1,84 @@
+"""
+Team task board and visibility tests.
+"""
+import pytest
+
+from app.core.security import security
+from app.models import Task, Team, TeamMember, TeamRole, User
+from app.models.task import task_shares
+
+
+@pytest.fixture
+def other_user(db_session):
+    user = User(
+        email="other@example.com",
+        username="otheruser",
+        hashed_password=security.get_password_hash("otherpassword123"),
+        is_active=True,
+    )
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def other_headers(client, other_user):
+    response = client.post("/api/v1/auth/login", json={"username": "otheruser", "password": "otherpassword123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def team(db_session, test_user):
+    team = Team(name="Platform")
+    db_session.add(team)
+    db_session.flush()
+    db_session.add(TeamMember(team_id=team.id, user_id=test_user.id, role=TeamRole.OWNER))
+    db_session.commit()
+    return team
+
+
+def test_team_membership_grants_access_to_team_tasks(client, db_session, auth_headers, other_user, other_headers, team):
+    for i in range(5):
+        response = client.post("/api/v1/tasks", headers=auth_headers, json={"title": f"Board {i}", "team_id": team.id})
+        assert response.status_code == 201
+        assert response.json()["team_id"] == team.id
+    task_id = response.json()["id"]
+
+    assert client.get("/api/v1/tasks", headers=other_headers).json()["total"] == 0
+    assert client.get(f"/api/v1/tasks/{task_id}", headers=other_headers).status_code == 403
+    assert client.get(f"/api/v1/teams/{team.id}/tasks", headers=other_headers).status_code == 403
+
+    response = client.post(
+        f"/api/v1/teams/{team.id}/members", headers=auth_headers, json={"email": other_user.email, "user_id": other_user.id}
+    )
+    assert response.status_code == 200
+
+    # One membership row, no per-task shares
+    assert db_session.execute(task_shares.select()).all() == []
+    assert client.get("/api/v1/tasks", headers=other_headers).json()["total"] == 5
+    assert client.get(f"/api/v1/tasks/{task_id}", headers=other_headers).status_code == 200
+
+    board = client.get(f"/api/v1/teams/{team.id}/tasks", headers=other_headers, params={"page_size": 2})
+    assert board.status_code == 200
+    assert board.json()["total"] == 5
+    assert len(board.json()["items"]) == 2
+
+
+def test_visibility_combines_owned_shared_and_team_tasks(client, db_session, test_user, other_user, other_headers, team):
+    db_session.add(TeamMember(team_id=team.id, user_id=other_user.id))
+    owned = Task(title="Mine", owner_id=other_user.id)
+    shared = Task(title="Shared", owner_id=test_user.id)
+    shared.shared_with.append(other_user)
+    on_board = Task(title="Team", owner_id=test_user.id, team_id=team.id)
+    private = Task(title="Private", owner_id=test_user.id)
+    db_session.add_all([owned, shared, on_board, private])
+    db_session.commit()
+
+    titles = {item["title"] for item in client.get("/api/v1/tasks", headers=other_headers).json()["items"]}
+    assert titles == {"Mine", "Shared", "Team"}
+
+
+def test_only_members_can_add_tasks_to_team(client, other_headers, team):
+    response = client.post("/api/v1/tasks", headers=other_headers, json={"title": "Sneaky", "team_id": team.id})
+    assert response.status_code == 403
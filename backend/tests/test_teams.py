@@ -0,0 +1,158 @@
+"""
+Team endpoint tests.
+"""
+import contextlib
+
+import pytest
+from sqlalchemy import event
+
+from app.core.memberships import membership_cache
+from app.core.security import security
+from app.models import Team, TeamMember, TeamRole, User
+from tests.conftest import engine
+
+
+@contextlib.contextmanager
+def count_queries(fragment=""):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if fragment in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def make_user(db_session, name):
+    user = User(
+        email=f"{name}@example.com",
+        username=name,
+        hashed_password=security.get_password_hash("password123"),
+        is_active=True,
+    )
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def login(client, username):
+    response = client.post("/api/v1/auth/login", json={"username": username, "password": "password123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def team(client, auth_headers):
+    response = client.post("/api/v1/teams", headers=auth_headers, json={"name": "Platform"})
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_membership_checks_are_cached(client, auth_headers, team):
+    client.get(f"/api/v1/teams/{team['id']}", headers=auth_headers)
+
+    with count_queries("team_members") as statements:
+        response = client.get(f"/api/v1/teams/{team['id']}/tasks", headers=auth_headers)
+    assert response.status_code == 200
+    assert statements == []
+
+
+def test_membership_changes_invalidate_cache(client, db_session, auth_headers, team):
+    member = make_user(db_session, "member")
+    member_headers = login(client, "member")
+    assert client.get(f"/api/v1/teams/{team['id']}", headers=member_headers).status_code == 403
+
+    response = client.post(
+        f"/api/v1/teams/{team['id']}/members", headers=auth_headers,
+        json={"email": member.email, "user_id": member.id},
+    )
+    assert response.status_code == 200
+    assert client.get(f"/api/v1/teams/{team['id']}", headers=member_headers).status_code == 200
+    assert client.post(
+        f"/api/v1/teams/{team['id']}/members", headers=auth_headers,
+        json={"email": member.email, "user_id": member.id},
+    ).status_code == 400
+
+    # Not an owner or admin of the team
+    outsider = make_user(db_session, "outsider")
+    assert client.post(
+        f"/api/v1/teams/{team['id']}/members", headers=member_headers,
+        json={"email": outsider.email, "user_id": outsider.id},
+    ).status_code == 403
+
+    response = client.delete(f"/api/v1/teams/{team['id']}/members/{member.id}", headers=auth_headers)
+    assert response.status_code == 204
+    assert client.get(f"/api/v1/teams/{team['id']}", headers=member_headers).status_code == 403
+
+
+def test_cache_evicts_least_recently_used():
+    membership_cache.clear()
+    original = membership_cache.maxsize
+    membership_cache.maxsize = 2
+    try:
+        membership_cache.set(1, {})
+        membership_cache.set(2, {10: TeamRole.MEMBER})
+        membership_cache.get(1)
+        membership_cache.set(3, {})
+        assert membership_cache.get(2) is None
+        assert membership_cache.get(1) == {}
+    finally:
+        membership_cache.maxsize = original
+        membership_cache.clear()
+
+
+def test_only_owner_cannot_be_removed(client, test_user, auth_headers, team):
+    response = client.delete(f"/api/v1/teams/{team['id']}/members/{test_user.id}", headers=auth_headers)
+    assert response.status_code == 400
+
+
+def add_teams(db_session, owner, teams, members_per_team, prefix="user"):
+    users = [make_user(db_session, f"{prefix}{i}") for i in range(members_per_team)]
+    for t in range(teams):
+        team = Team(name=f"Team {t}")
+        db_session.add(team)
+        db_session.flush()
+        db_session.add(TeamMember(team_id=team.id, user_id=owner.id, role=TeamRole.OWNER))
+        db_session.add_all(TeamMember(team_id=team.id, user_id=user.id) for user in users)
+    db_session.commit()
+    db_session.expire_all()
+
+
+def test_team_list_loads_members_in_fixed_queries(client, db_session, test_user, auth_headers):
+    add_teams(db_session, test_user, teams=2, members_per_team=3)
+    with count_queries() as few:
+        response = client.get("/api/v1/teams", headers=auth_headers)
+    assert len(response.json()) == 2
+
+    add_teams(db_session, test_user, teams=4, members_per_team=3, prefix="more")
+    with count_queries() as many:
+        response = client.get("/api/v1/teams", headers=auth_headers)
+    teams = response.json()
+    assert len(teams) == 6
+    assert all(len(team["members"]) == 4 for team in teams)
+    assert teams[0]["members"][0]["user"]["username"]
+    assert len(many) == len(few)
+
+    with count_queries() as without_members:
+        response = client.get("/api/v1/teams", headers=auth_headers, params={"include_members": False})
+    assert all(team["members"] == [] for team in response.json())
+    assert len(without_members) < len(many)
+
+
+def test_team_members_are_paginated(client, db_session, test_user, auth_headers):
+    add_teams(db_session, test_user, teams=1, members_per_team=5)
+    team_id = client.get("/api/v1/teams", headers=auth_headers, params={"include_members": False}).json()[0]["id"]
+
+    first = client.get(f"/api/v1/teams/{team_id}/members", headers=auth_headers, params={"page_size": 4}).json()
+    second = client.get(
+        f"/api/v1/teams/{team_id}/members", headers=auth_headers, params={"page_size": 4, "page": 2}
+    ).json()
+    assert first["total"] == 6
+    assert first["total_pages"] == 2
+    assert len(first["items"]) == 4
+    assert len(second["items"]) == 2
+    user_ids = {member["user_id"] for member in first["items"] + second["items"]}
+    assert len(user_ids) == 6
@@ -0,0 +1,117 @@
+"""
+Admin user directory tests: prefix search, filters, keyset pages and suggestions.
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.core.user_directory import UserPrefixIndex, prefix_match
+from app.models import User
+
+
+@pytest.fixture
+def directory(db_session, admin_user):
+    db_session.execute(User.__table__.insert(), [
+        {"email": "alice.smith@example.com", "username": "asmith", "full_name": "Alice Smith",
+         "hashed_password": "x", "role": "USER", "is_active": True, "last_login": datetime(2024, 5, 1)},
+        {"email": "bob@example.org", "username": "Bobby", "full_name": "Robert Alison",
+         "hashed_password": "x", "role": "AUDITOR", "is_active": True, "last_login": datetime(2024, 1, 1)},
+        {"email": "carol@example.com", "username": "carol", "full_name": None,
+         "hashed_password": "x", "role": "USER", "is_active": False, "last_login": None},
+        {"email": "dave_al@example.com", "username": "dave", "full_name": "Dave Allen",
+         "hashed_password": "x", "role": "USER", "is_active": True, "last_login": datetime(2024, 6, 1)},
+    ])
+    db_session.commit()
+
+
+@pytest.fixture
+def admin_headers(client, admin_user):
+    response = client.post("/api/v1/auth/login", json={"username": "adminuser", "password": "adminpassword123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def usernames(response):
+    assert response.status_code == 200
+    return [user["username"] for user in response.json()]
+
+
+def test_search_matches_any_column_prefix_case_insensitively(client, admin_headers, directory):
+    response = client.get("/api/v1/admin/users", params={"q": "AL"}, headers=admin_headers)
+    # alice.smith@, but not "Robert Alison" (only the first word is a prefix) or dave_al@
+    assert usernames(response) == ["asmith"]
+    assert response.headers["X-Total-Count"] == "1"
+    assert "X-Next-Cursor" not in response.headers
+
+    assert usernames(client.get("/api/v1/admin/users", params={"q": "bob"}, headers=admin_headers)) == ["Bobby"]
+    assert usernames(client.get("/api/v1/admin/users", params={"q": "rob"}, headers=admin_headers)) == ["Bobby"]
+    assert usernames(client.get("/api/v1/admin/users", params={"q": "dave_"}, headers=admin_headers)) == ["dave"]
+
+
+def test_filters(client, admin_headers, directory):
+    def search(**params):
+        return usernames(client.get("/api/v1/admin/users", params=params, headers=admin_headers))
+
+    assert search(role="auditor") == ["Bobby"]
+    assert search(is_active="false") == ["carol"]
+    assert search(last_login_after="2024-04-01T00:00:00", last_login_before="2024-06-01T00:00:00") == ["asmith"]
+    assert search(q="example.com", is_active="true") == []
+
+
+def test_keyset_pages_and_capped_total(client, admin_headers, directory, monkeypatch):
+    monkeypatch.setattr(settings, "USER_DIRECTORY_COUNT_LIMIT", 3)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor is not None else {})}
+        response = client.get("/api/v1/admin/users", params=params, headers=admin_headers)
+        seen.extend(usernames(response))
+        assert response.headers["X-Total-Count"] == "3"
+        assert response.headers["X-Total-Count-Exact"] == "false"
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == ["adminuser", "asmith", "Bobby", "carol", "dave"]
+
+
+def test_directory_requires_admin(client, auth_headers):
+    assert client.get("/api/v1/admin/users", headers=auth_headers).status_code == 403
+    assert client.get("/api/v1/admin/users/suggest", params={"q": "a"}, headers=auth_headers).status_code == 403
+
+
+def test_suggest_from_database_and_index(client, admin_headers, db_session, directory, monkeypatch):
+    response = client.get("/api/v1/admin/users/suggest", params={"q": "Ca"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 4, "username": "carol", "email": "carol@example.com", "full_name": None, "is_active": False},
+    ]
+
+    index = UserPrefixIndex()
+    index.load(db_session)
+    monkeypatch.setattr(settings, "USER_SUGGEST_INDEX_ENABLED", True)
+    monkeypatch.setattr("app.api.v1.endpoints.admin.user_prefix_index", index)
+    response = client.get("/api/v1/admin/users/suggest", params={"q": "al"}, headers=admin_headers)
+    # Any word of the full name matches, in key order: "alice...", "alison", "allen"
+    assert [user["username"] for user in response.json()] == ["asmith", "Bobby", "dave"]
+
+
+def test_prefix_index_lookup():
+    index = UserPrefixIndex()
+    assert not index.ready and index.lookup("a") == []
+    index.build([
+        (1, "ann", "ann@example.com", "Ann Annable", True),
+        (2, "anna", "x@example.com", None, True),
+        (3, "bert", "bert@example.com", "Bert Ann", False),
+    ])
+    assert index.ready and len(index) == 3
+    # Key order ("ann", "ann", "ann annable", ..., "anna"), one entry per user
+    assert [user.id for user in index.lookup("ANN")] == [1, 3, 2]
+    assert [user.id for user in index.lookup("ann", limit=2)] == [1, 3]
+    assert index.lookup("bert ")[0].full_name == "Bert Ann"
+    assert index.lookup("z") == []
+
+
+def test_prefix_match_on_postgresql_uses_escaped_like():
+    compiled = prefix_match(User.email, "Al_%", "postgresql").compile(dialect=postgresql.dialect())
+    assert str(compiled) == "lower(users.email) LIKE %(lower_1)s ESCAPE '\\\\'"
+    assert compiled.params == {"lower_1": "al\\_\\%%"}